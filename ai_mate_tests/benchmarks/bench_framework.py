@@ -0,0 +1,412 @@
+# benchmarks/bench_framework.py
+"""
+框架开销基准：在本地模拟器上测量自动化层本身的耗时
+
+覆盖 ConfigLoader 查询、ElementManager 查找、BasePage 辅助方法、DriverFactory 建立会话，
+以及 SettingsPage.stress_test_bluetooth 和配对两个完整流程。
+每个设备数（默认 1/4/16/64）启动一次模拟器，所有设备并行执行同一用例。
+
+每次操作发送到服务端的命令数与机器性能无关，多于基线即视为回归（返回非 0）。
+耗时只作提示：线程化的模拟器上绝对耗时随机器负载波动，因此每个用例的中位数先除以同一轮测得的
+校准用例（纯 Python 计算 / 单条命令往返），再与基线中同样换算的比值比较；
+--strict-timing 时耗时超出阈值也返回非 0。
+
+用法:
+    python -m ai_mate_tests.benchmarks.bench_framework                     # 与基线比较，命令数增加返回非 0
+    python -m ai_mate_tests.benchmarks.bench_framework --devices 1,4 --cases config
+    python -m ai_mate_tests.benchmarks.bench_framework --update-baseline
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "framework.json")
+
+DEFAULT_DEVICE_COUNTS = [1, 4, 16, 64]
+# 耗时（相对校准用例）允许的增幅
+DEFAULT_THRESHOLD = 1.0
+# 每次调用命令数的容差：轮询类流程在多设备时有小幅波动，多一条命令即超出
+COMMAND_TOLERANCE = 0.75
+
+CALIBRATION_CPU = "calibration.cpu"
+CALIBRATION_ROUND_TRIP = "calibration.round_trip"
+
+SETTINGS_PACKAGE = "com.android.settings"
+AI_MATE_PACKAGE = "com.transsion.xsound"
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable  # run(ctx, device_name) -> None
+    iterations: int
+    app: Optional[str] = "settings"  # 用例共享会话的应用，None 表示不需要预先建立会话
+    prepare: Optional[Callable] = None  # 每次执行前调用，不计入耗时
+    needs_appium: bool = True
+
+
+class Context:
+    """一次设备数扫描中共享的模拟器、配置与会话"""
+
+    def __init__(self, sim, config_loader, factory):
+        self.sim = sim
+        self.config_loader = config_loader
+        self.factory = factory
+        self.drivers: Dict[str, object] = {}
+        self.app = None
+
+    @property
+    def device_names(self) -> List[str]:
+        return self.config_loader.get_all_devices()
+
+    def open_sessions(self, app_name: str):
+        """为所有设备建立指定应用的会话（已是该应用时复用）"""
+        if self.app == app_name and self.drivers:
+            return
+        self.close_sessions()
+        from ai_mate_tests.utils.element_manager import ElementManager
+
+        def create(device_name):
+            driver = self.factory.get_driver(device_name, app_name)
+            driver.element_manager = ElementManager(self.config_loader, device_name)
+            return device_name, driver
+
+        with ThreadPoolExecutor(max_workers=len(self.device_names)) as executor:
+            self.drivers = dict(executor.map(create, self.device_names))
+        self.app = app_name
+
+    def close_sessions(self):
+        for driver in self.drivers.values():
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self.drivers = {}
+        self.app = None
+
+
+# ========== 用例 ==========
+
+def _case_calibration_cpu(ctx, device_name):
+    sum(i * i for i in range(1000))
+
+
+def _case_calibration_round_trip(ctx, device_name):
+    ctx.drivers[device_name].execute("getTimeouts")
+
+
+def _restart_app(ctx: Context, device_name: str, package: str):
+    driver = ctx.drivers[device_name]
+    driver.terminate_app(package)
+    driver.activate_app(package)
+
+
+def _open_bluetooth(ctx: Context, device_name: str):
+    from ai_mate_tests.pages.settings_page import SettingsPage
+    udid = ctx.config_loader.get_device_config(device_name)['udid']
+    if ctx.sim.devices[udid].current_screen != 'bluetooth':
+        _restart_app(ctx, device_name, SETTINGS_PACKAGE)
+        SettingsPage(ctx.drivers[device_name]).open_bluetooth_settings()
+
+
+def _case_config_locator(ctx, device_name):
+    ctx.config_loader.get_element_locator(device_name, "bluetooth_switch")
+
+
+def _case_config_convert(ctx, device_name):
+    ctx.config_loader.convert_locator_to_appium_format(
+        ctx.config_loader.get_element_locator(device_name, "paired_device_connected"))
+
+
+def _case_config_profile(ctx, device_name):
+    ctx.config_loader.get_capability_profile(device_name, "ai_mate")
+
+
+def _case_config_success_texts(ctx, device_name):
+    ctx.config_loader.get_success_texts(device_name)
+
+
+def _case_element_find(ctx, device_name):
+    driver = ctx.drivers[device_name]
+    driver.element_manager.find_element(driver, "bluetooth_switch")
+
+
+def _case_element_is_displayed(ctx, device_name):
+    driver = ctx.drivers[device_name]
+    driver.element_manager.is_displayed(driver, "paired_device_connected")
+
+
+def _case_element_get_text(ctx, device_name):
+    driver = ctx.drivers[device_name]
+    driver.element_manager.get_text(driver, "paired_device_connected")
+
+
+def _case_page_find_by_config(ctx, device_name):
+    from ai_mate_tests.pages.base_page import BasePage
+    BasePage(ctx.drivers[device_name]).find_element_by_config("bluetooth_switch")
+
+
+def _case_page_current_activity(ctx, device_name):
+    from ai_mate_tests.pages.base_page import BasePage
+    BasePage(ctx.drivers[device_name]).get_current_activity()
+
+
+def _case_page_source(ctx, device_name):
+    from ai_mate_tests.pages.base_page import BasePage
+    BasePage(ctx.drivers[device_name]).get_page_source()
+
+
+def _case_session_setup(ctx, device_name):
+    driver = ctx.factory.get_driver(device_name, "settings")
+    driver.quit()
+
+
+def _case_flow_bluetooth(ctx, device_name):
+    from ai_mate_tests.pages.settings_page import SettingsPage
+    SettingsPage(ctx.drivers[device_name]).stress_test_bluetooth(iterations=5)
+
+
+def _case_flow_pairing(ctx, device_name):
+    from ai_mate_tests.pages.device_page import DevicePage
+    from ai_mate_tests.pages.popup_page import PopupPage
+    from ai_mate_tests.pages.welcome_page import WelcomePage
+
+    driver = ctx.drivers[device_name]
+    popup = PopupPage(driver)
+    device = DevicePage(driver)
+    popup.handle_interference_popup()
+    WelcomePage(driver).accept_all()
+    popup.handle_interference_popup()
+    device.search_device()
+    device.pair_device()
+    if not device.is_paired_success(timeout=30):
+        raise AssertionError(f"{device_name} 配对失败")
+
+
+CASES = [
+    # 校准用例：其余用例的耗时按同一轮的校准耗时换算后再与基线比较
+    Case(CALIBRATION_CPU, _case_calibration_cpu, 200, app=None, needs_appium=False),
+    Case(CALIBRATION_ROUND_TRIP, _case_calibration_round_trip, 50),
+    Case("config.get_element_locator", _case_config_locator, 2000, app=None, needs_appium=False),
+    Case("config.convert_locator", _case_config_convert, 2000, app=None, needs_appium=False),
+    Case("config.get_capability_profile", _case_config_profile, 2000, app=None, needs_appium=False),
+    Case("config.get_success_texts", _case_config_success_texts, 2000, app=None, needs_appium=False),
+    Case("element_manager.find_element", _case_element_find, 50, prepare=_open_bluetooth),
+    Case("element_manager.is_displayed", _case_element_is_displayed, 50, prepare=_open_bluetooth),
+    Case("element_manager.get_text", _case_element_get_text, 50, prepare=_open_bluetooth),
+    Case("base_page.find_element_by_config", _case_page_find_by_config, 50, prepare=_open_bluetooth),
+    Case("base_page.get_current_activity", _case_page_current_activity, 50),
+    Case("base_page.get_page_source", _case_page_source, 50),
+    Case("driver_factory.session_setup", _case_session_setup, 3, app=None),
+    Case("flow.stress_test_bluetooth", _case_flow_bluetooth, 3,
+         prepare=lambda ctx, name: _restart_app(ctx, name, SETTINGS_PACKAGE)),
+    Case("flow.pairing", _case_flow_pairing, 3,
+         prepare=lambda ctx, name: _restart_app(ctx, name, AI_MATE_PACKAGE), app="ai_mate"),
+]
+
+
+# ========== 执行 ==========
+
+def _run_on_device(ctx: Context, case: Case, device_name: str) -> List[float]:
+    samples = []
+    for _ in range(case.iterations):
+        if case.prepare:
+            case.prepare(ctx, device_name)
+        start = time.perf_counter()
+        case.run(ctx, device_name)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_case(ctx: Context, case: Case) -> Dict[str, float]:
+    """所有设备并行执行用例，返回单次调用耗时中位数/p95 与每次调用的服务端命令数"""
+    if case.app:
+        ctx.open_sessions(case.app)
+
+    # 预热一次（首次导入、正则编译等不计入）
+    for device_name in ctx.device_names:
+        if case.prepare:
+            case.prepare(ctx, device_name)
+        case.run(ctx, device_name)
+
+    prepare_commands = 0
+    if case.prepare:
+        # prepare 阶段的命令数单独统计后扣除
+        ctx.sim.w3c.stats.reset()
+        case.prepare(ctx, ctx.device_names[0])
+        prepare_commands = sum(s['count'] for s in ctx.sim.w3c.stats.snapshot().values())
+
+    ctx.sim.w3c.stats.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(ctx.device_names)) as executor:
+        per_device = list(executor.map(lambda name: _run_on_device(ctx, case, name), ctx.device_names))
+    wall = time.perf_counter() - start
+
+    samples = sorted(s for device_samples in per_device for s in device_samples)
+    calls = len(samples)
+    commands = sum(s['count'] for s in ctx.sim.w3c.stats.snapshot().values())
+    commands -= prepare_commands * calls
+    return {
+        'median': statistics.median(samples),
+        'p95': samples[min(calls - 1, int(calls * 0.95))],
+        'wall': wall,
+        'commands_per_call': round(max(commands, 0) / calls, 2),
+    }
+
+
+def sweep(device_count: int, cases: List[Case], latency_ms: float) -> Dict[str, Dict[str, float]]:
+    """启动 device_count 台虚拟设备并执行所有用例"""
+    from ai_mate_tests.simulator.runtime import Simulator
+    from ai_mate_tests.utils import adb_channel
+    from ai_mate_tests.utils.config_loader import ConfigLoader
+    from ai_mate_tests.utils.driver_factory import DriverFactory
+
+    results = {}
+    with Simulator(devices=device_count, latency_ms=latency_ms) as sim:
+        environ = sim.environ()
+        saved = {key: os.environ.get(key) for key in environ}
+        os.environ.update(environ)
+        # 每次扫描的 adb 端口不同，丢弃上一轮的命令通道
+        adb_channel.close_all_channels()
+
+        config_loader = ConfigLoader(sim.config_path)
+        factory = DriverFactory()
+        factory.config_loader = config_loader
+        ctx = Context(sim, config_loader, factory)
+        try:
+            for case in cases:
+                results[case.name] = run_case(ctx, case)
+                _print_result(case.name, device_count, results[case.name])
+        finally:
+            ctx.close_sessions()
+            adb_channel.close_all_channels()
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return results
+
+
+def _print_result(name: str, devices: int, result: Dict[str, float]):
+    print(f"   {name:<36} x{devices:<3} 中位数 {result['median'] * 1000:9.3f} ms"
+          f"  p95 {result['p95'] * 1000:9.3f} ms  命令/次 {result['commands_per_call']:6.2f}")
+
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results: dict):
+    baseline = load_baseline()
+    baseline.update(results)
+    os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False, sort_keys=True)
+    print(f"📝 基线已更新: {BASELINE_FILE}")
+
+
+def _calibration_key(key: str) -> str:
+    """用例对应的校准用例：不需要会话的用例按纯 Python 计算，其余按单条命令往返"""
+    name, _, devices = key.partition("@")
+    case = next((case for case in CASES if case.name == name), None)
+    calibration = CALIBRATION_ROUND_TRIP if case is None or case.needs_appium else CALIBRATION_CPU
+    return f"{calibration}@{devices}"
+
+
+def _relative(key: str, results: dict) -> Optional[float]:
+    """用例中位数与同一轮校准用例中位数之比，缺少校准结果时为 None"""
+    calibration = results.get(_calibration_key(key))
+    if not calibration or not calibration['median']:
+        return None
+    return results[key]['median'] / calibration['median']
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """
+    与基线比较
+    :return: (回归, 提示)：每次调用命令数增加为回归；相对校准用例的耗时超出阈值为提示
+    """
+    failures, warnings = [], []
+    missing = [key for key in results if not baseline.get(key)]
+    if missing:
+        print(f"⚠️ 以下用例没有基线，未参与比较（--update-baseline 补充）: {', '.join(sorted(missing))}")
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if not expected:
+            continue
+        if result['commands_per_call'] > expected.get('commands_per_call', float('inf')) + COMMAND_TOLERANCE:
+            failures.append(f"{key} 每次调用命令数 {result['commands_per_call']} "
+                            f"多于基线 {expected['commands_per_call']}")
+        if key.startswith("calibration."):
+            continue
+        current, previous = _relative(key, results), _relative(key, baseline)
+        if current is None or previous is None:
+            continue
+        if current > previous * (1 + threshold):
+            warnings.append(f"{key} 中位数 {result['median'] * 1000:.3f} ms，为校准用例的 {current:.1f} 倍"
+                            f"（基线 {previous:.1f} 倍）")
+    return failures, warnings
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="框架开销基准（模拟器）")
+    parser.add_argument("--devices", default=",".join(map(str, DEFAULT_DEVICE_COUNTS)),
+                        help="逗号分隔的设备数")
+    parser.add_argument("--cases", default="", help="只运行名称包含该关键字的用例")
+    parser.add_argument("--latency-ms", type=float, default=0, help="模拟器每条命令的耗时")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="耗时（相对校准用例）允许的增幅")
+    parser.add_argument("--strict-timing", action="store_true", help="耗时超出阈值也视为回归")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果更新基线")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES if args.cases in case.name or case.name.startswith("calibration.")]
+    if importlib.util.find_spec("appium") is None:
+        print("⚠️ 未安装 Appium-Python-Client，只运行不需要会话的用例")
+        cases = [case for case in cases if not case.needs_appium]
+    if not cases:
+        print("❌ 没有可运行的用例")
+        return 1
+
+    results = {}
+    for device_count in [int(n) for n in args.devices.split(",") if n.strip()]:
+        print(f"📱 {device_count} 台虚拟设备")
+        for name, result in sweep(device_count, cases, args.latency_ms).items():
+            results[f"{name}@{device_count}"] = {k: round(v, 6) for k, v in result.items()}
+
+    if args.update_baseline:
+        save_baseline(results)
+
+    baseline = load_baseline()
+    if not baseline:
+        print(f"❌ 未找到基线 {BASELINE_FILE}，无法判断是否回归；先运行 --update-baseline 生成")
+        return 1
+
+    failures, warnings = compare(results, baseline, args.threshold)
+    if warnings:
+        print("⚠️ 耗时高于基线（相对校准用例）:")
+        for warning in warnings:
+            print(f"   - {warning}")
+        if args.strict_timing:
+            failures += warnings
+    if failures:
+        print("❌ 框架开销回归:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return 1
+
+    print("✅ 框架开销正常")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
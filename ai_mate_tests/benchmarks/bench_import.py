@@ -0,0 +1,131 @@
+# benchmarks/bench_import.py
+"""
+导入耗时基准：在全新的 Python 进程中导入框架模块，测量 xdist worker 启动时的导入开销
+
+用法:
+    python -m ai_mate_tests.benchmarks.bench_import                  # 与基线比较，超出阈值返回非 0
+    python -m ai_mate_tests.benchmarks.bench_import --update-baseline
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "import_time.json")
+
+# worker 启动时会被导入的框架模块
+MODULES = [
+    "ai_mate_tests.utils.config_loader",
+    "ai_mate_tests.utils.driver_factory",
+    "ai_mate_tests.utils.parallel_driver_manager",
+    "ai_mate_tests.pages.popup_page",
+    "ai_mate_tests.pages.settings_page",
+    "ai_mate_tests.pages.device_page",
+    "ai_mate_tests.pages.welcome_page",
+]
+
+# 只有真正创建driver（或做视觉匹配）时才允许加载的重量级模块
+HEAVY_MODULES = ["appium", "selenium", "numpy", "PIL"]
+
+# 相对基线允许的增幅，以及绝对容差（秒），避免毫秒级抖动误报
+DEFAULT_THRESHOLD = 0.3
+ABSOLUTE_TOLERANCE = 0.02
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted({{name.split('.')[0] for name in sys.modules}} & set({heavy!r}))
+print(repr((elapsed, heavy)))
+"""
+
+
+def measure_module(module: str, repeat: int = 5):
+    """在新进程中导入模块 repeat 次，返回 (导入耗时中位数, 已加载的重量级模块)"""
+    samples = []
+    heavy = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, cwd=PROJECT_ROOT
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"导入 {module} 失败:\n{result.stderr}")
+        elapsed, heavy = ast.literal_eval(result.stdout.strip().splitlines()[-1])
+        samples.append(elapsed)
+    return statistics.median(samples), heavy
+
+
+def measure_interpreter(repeat: int = 5) -> float:
+    """空解释器启动耗时，用于对照"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results: dict):
+    os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, sort_keys=True)
+    print(f"📝 基线已更新: {BASELINE_FILE}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="框架导入耗时基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块的测量次数")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="允许的相对增幅")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    args = parser.parse_args(argv)
+
+    print(f"🐍 空解释器启动: {measure_interpreter(args.repeat) * 1000:.1f} ms")
+
+    baseline = load_baseline()
+    results = {}
+    failures = []
+
+    for module in MODULES:
+        elapsed, heavy = measure_module(module, args.repeat)
+        results[module] = round(elapsed, 4)
+
+        line = f"{module:<48} {elapsed * 1000:8.1f} ms"
+        if module in baseline:
+            line += f"  (基线 {baseline[module] * 1000:.1f} ms)"
+            limit = baseline[module] * (1 + args.threshold) + ABSOLUTE_TOLERANCE
+            if elapsed > limit:
+                failures.append(f"{module} 导入耗时 {elapsed * 1000:.1f} ms 超过上限 {limit * 1000:.1f} ms")
+        print(line)
+
+        if heavy:
+            failures.append(f"{module} 导入时加载了重量级模块: {', '.join(heavy)}")
+
+    if args.update_baseline:
+        save_baseline(results)
+
+    if failures:
+        print("❌ 导入耗时回归:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return 1
+
+    print("✅ 导入耗时正常")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# benchmarks/bench_pairing.py
+"""
+眼镜配对端到端耗时基准（真机或模拟器）
+
+每台已连接设备重复 N 轮 "取消配对 -> 扫描 -> 配对"，记录各阶段耗时，
+按固件/设备输出 p50/p90/p95/max，并写入指标库（pairing.<阶段>）供跨版本比较。
+
+用法:
+    python -m ai_mate_tests.benchmarks.bench_pairing --cycles 10 --firmware 1.0.7
+    python -m ai_mate_tests.benchmarks.bench_pairing --cycles 5 --unpair-first --output pairing.json
+
+第一轮开始前设备应停留在 AI Mate 首页或扫描界面（或使用 --unpair-first 先取消配对）。
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
+
+from ai_mate_tests.utils.pairing_benchmark import (PairingCycle, format_summary, measure_pairing, reset_pairing,
+                                                   summarize)
+
+
+def run_device(manager, device_name: str, args) -> List[PairingCycle]:
+    """单台设备执行所有轮次；某一轮失败只记录，不影响后续轮次"""
+    from ai_mate_tests.pages.device_page import DevicePage
+    from ai_mate_tests.utils.metrics_store import get_metrics_store
+
+    driver = manager.get_driver(device_name)
+    udid = manager.driver_factory.config_loader.get_device_config(device_name)['udid']
+    metrics = get_metrics_store()
+    cycles = []
+
+    for cycle in range(1, args.cycles + 1):
+        try:
+            if cycle > 1 or args.unpair_first:
+                driver = reset_pairing(manager.driver_factory, driver)
+            else:
+                DevicePage(driver).open_scan()
+            phases = measure_pairing(DevicePage(driver), udid, args.scan_timeout, args.success_timeout)
+            ok = phases['success_visible'] is not None
+            result = PairingCycle(device_name, args.firmware, cycle, phases, ok, "" if ok else "未出现配对成功界面")
+        except Exception as e:
+            result = PairingCycle(device_name, args.firmware, cycle, {}, False, str(e))
+
+        for phase, value in result.phases.items():
+            if result.ok and value is not None:
+                metrics.record(f"pairing.{phase}", value, device_name)
+        status = "✅" if result.ok else f"❌ {result.error}"
+        print(f"{status} {device_name} 第 {cycle}/{args.cycles} 轮 "
+              + " ".join(f"{k}={v:.2f}s" for k, v in result.phases.items() if v is not None))
+        cycles.append(result)
+    return cycles
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="眼镜配对端到端耗时基准")
+    parser.add_argument("--cycles", type=int, default=5, help="每台设备的配对轮数")
+    parser.add_argument("--firmware", default=os.environ.get("AI_MATE_GLASSES_FIRMWARE", "unknown"),
+                        help="眼镜固件版本（默认 AI_MATE_GLASSES_FIRMWARE）")
+    parser.add_argument("--unpair-first", action="store_true", help="第一轮前也先取消配对")
+    parser.add_argument("--scan-timeout", type=float, default=30, help="等待扫描结果的时间（秒）")
+    parser.add_argument("--success-timeout", type=float, default=60, help="等待配对成功的时间（秒）")
+    parser.add_argument("--output", default=None, help="把每轮结果和统计写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    # 指标库按固件打标签
+    os.environ.setdefault("AI_MATE_GLASSES_FIRMWARE", args.firmware)
+
+    from ai_mate_tests.utils.metrics_store import flush_metrics
+    from ai_mate_tests.utils.parallel_driver_manager import ParallelDriverManager
+
+    manager = ParallelDriverManager()
+    device_names = manager.auto_create_drivers("ai_mate")
+    if not device_names:
+        print("❌ 没有可用设备")
+        return 1
+
+    cycles: List[PairingCycle] = []
+    try:
+        with ThreadPoolExecutor(max_workers=len(device_names)) as executor:
+            futures = {executor.submit(run_device, manager, name, args): name for name in device_names}
+            for future in as_completed(futures):
+                try:
+                    cycles.extend(future.result())
+                except Exception as e:
+                    print(f"❌ {futures[future]} 基准执行失败: {e}")
+    finally:
+        manager.quit_all_drivers()
+        flush_metrics()
+
+    summary = summarize(cycles)
+    failed = [c for c in cycles if not c.ok]
+    print(f"\n📊 配对耗时（{len(cycles) - len(failed)}/{len(cycles)} 轮成功，单位秒，距本轮开始）")
+    print(format_summary(summary))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'cycles': [c._asdict() for c in cycles], 'summary': summary}, f, ensure_ascii=False, indent=2)
+        print(f"📝 结果已写入: {args.output}")
+
+    return 0 if cycles and len(failed) < len(cycles) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
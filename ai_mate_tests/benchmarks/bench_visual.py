@@ -0,0 +1,122 @@
+# benchmarks/bench_visual.py
+"""
+视觉模板匹配离线验证（不需要设备，使用保存的截图，如 allure-results 中的 PNG）
+
+用法:
+    # 在截图中匹配模板，输出位置、置信度和耗时
+    python -m ai_mate_tests.benchmarks.bench_visual match --screenshot shot.png --template 对话翻译 --repeat 20
+    # 从截图裁剪模板（x,y,w,h）
+    python -m ai_mate_tests.benchmarks.bench_visual crop --screenshot shot.png --box 40,2200,900,150 --output 对话翻译.png
+    # 随机裁剪自检：定位准确率和耗时分布
+    python -m ai_mate_tests.benchmarks.bench_visual selftest allure-results/*.png --samples 100
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from ai_mate_tests.utils.pairing_benchmark import percentile
+from ai_mate_tests.utils.visual_match import VisualMatcher, resolve_template, to_gray
+
+
+def _box(value: str):
+    parts = [float(v) for v in value.split(",")]
+    if len(parts) != 4:
+        raise argparse.ArgumentTypeError("格式: x,y,w,h")
+    return tuple(int(v) if v.is_integer() and v > 1 else v for v in parts)
+
+
+def cmd_match(args) -> int:
+    matcher = VisualMatcher(threshold=args.threshold)
+    with open(args.screenshot, 'rb') as f:
+        screenshot = f.read()
+    template = resolve_template(args.template, args.device)
+
+    timings = []
+    result = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = matcher.match(screenshot, template, args.region)
+        timings.append((time.perf_counter() - start, result.elapsed))
+
+    status = "✅ 找到" if result.found else "❌ 未找到"
+    print(f"{status} {template}: 置信度 {result.confidence:.4f} 位置 ({result.x}, {result.y}) "
+          f"大小 {result.width}x{result.height} 中心 {result.center}")
+    totals = [t for t, _ in timings]
+    matches = [m for _, m in timings]
+    print(f"⏱️ {args.repeat} 次: 匹配 p50 {statistics.median(matches) * 1000:.1f}ms "
+          f"/ 含解码 p50 {statistics.median(totals) * 1000:.1f}ms")
+    return 0 if result.found else 1
+
+
+def cmd_crop(args) -> int:
+    from PIL import Image
+
+    x, y, w, h = (int(v) for v in args.box)
+    with Image.open(args.screenshot) as img:
+        img.crop((x, y, x + w, y + h)).save(args.output)
+    print(f"📝 模板已保存: {args.output} ({w}x{h})")
+    return 0
+
+
+def cmd_selftest(args) -> int:
+    """从截图随机裁剪有纹理的区域作为模板，检查能否定位回原位置"""
+    rng = random.Random(args.seed)
+    images = [to_gray(path) for path in args.screenshots]
+    matcher = VisualMatcher(threshold=args.threshold)
+
+    located, elapsed = 0, []
+    for _ in range(args.samples):
+        image = rng.choice(images)
+        while True:
+            w, h = rng.randint(40, 400), rng.randint(30, 200)
+            x, y = rng.randint(0, image.shape[1] - w), rng.randint(0, image.shape[0] - h)
+            template = image[y:y + h, x:x + w]
+            if template.std() > 8:
+                break
+        result = matcher.match(image, template)
+        elapsed.append(result.elapsed)
+        # 截图中有完全相同内容（重复的列表项等）时，置信度接近 1 的其他位置也算定位成功
+        if (result.x, result.y) == (x, y) or result.confidence > 0.99:
+            located += 1
+
+    print(f"🎯 定位成功 {located}/{args.samples} ({located / args.samples:.1%})")
+    print(f"⏱️ 匹配耗时 p50 {percentile(elapsed, 50) * 1000:.1f}ms  p90 {percentile(elapsed, 90) * 1000:.1f}ms  "
+          f"max {max(elapsed) * 1000:.1f}ms")
+    return 0 if located / args.samples >= args.min_accuracy else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="视觉模板匹配离线验证")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    match = sub.add_parser("match", help="在截图中匹配模板")
+    match.add_argument("--screenshot", required=True)
+    match.add_argument("--template", required=True, help="模板名或 PNG 路径")
+    match.add_argument("--device", default=None, help="设备名（优先使用该设备目录下的模板）")
+    match.add_argument("--region", type=_box, default=None, help="搜索区域 x,y,w,h（像素或 0~1 比例）")
+    match.add_argument("--threshold", type=float, default=0.85)
+    match.add_argument("--repeat", type=int, default=10)
+    match.set_defaults(func=cmd_match)
+
+    crop = sub.add_parser("crop", help="从截图裁剪模板")
+    crop.add_argument("--screenshot", required=True)
+    crop.add_argument("--box", type=_box, required=True, help="x,y,w,h（像素）")
+    crop.add_argument("--output", required=True)
+    crop.set_defaults(func=cmd_crop)
+
+    selftest = sub.add_parser("selftest", help="随机裁剪自检")
+    selftest.add_argument("screenshots", nargs="+")
+    selftest.add_argument("--samples", type=int, default=100)
+    selftest.add_argument("--seed", type=int, default=0)
+    selftest.add_argument("--threshold", type=float, default=0.85)
+    selftest.add_argument("--min-accuracy", type=float, default=0.9)
+    selftest.set_defaults(func=cmd_selftest)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
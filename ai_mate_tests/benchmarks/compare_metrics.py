@@ -0,0 +1,56 @@
+# benchmarks/compare_metrics.py
+"""
+运行指标回归检测：把最近一次（或指定）运行与之前的滚动基线比较
+
+用法:
+    python -m ai_mate_tests.benchmarks.compare_metrics                   # 有显著回归时返回非 0
+    python -m ai_mate_tests.benchmarks.compare_metrics --run-id <id> --window 20
+    python -m ai_mate_tests.benchmarks.compare_metrics --svg trend.svg
+"""
+import argparse
+import sys
+
+from ai_mate_tests.utils.metrics_report import compare_runs, format_comparisons, render_trend_svg
+from ai_mate_tests.utils.metrics_store import MetricsStore
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="运行指标回归检测")
+    parser.add_argument("--db", default=None, help="指标数据库路径，默认 AI_MATE_METRICS_DB 或 ai_mate_tests/metrics.db")
+    parser.add_argument("--run-id", default=None, help="要检查的运行，默认最近一次")
+    parser.add_argument("--window", type=int, default=10, help="基线包含的历史运行次数")
+    parser.add_argument("--alpha", type=float, default=0.05, help="显著性水平")
+    parser.add_argument("--min-change", type=float, default=0.05, help="判定回归的最小相对增幅")
+    parser.add_argument("--svg", default=None, help="输出趋势图 SVG 文件")
+    args = parser.parse_args(argv)
+
+    store = MetricsStore(args.db)
+    run_ids = store.run_ids()
+    if not run_ids:
+        print(f"⚠️ 指标库中没有运行记录: {store.path}")
+        return 0
+
+    run_id = args.run_id or run_ids[-1]
+    comparisons = compare_runs(store, run_id, args.window, args.alpha, args.min_change)
+    print(f"📊 运行 {run_id} 对比之前 {args.window} 次运行（共 {len(run_ids)} 次记录）")
+    if comparisons:
+        print(format_comparisons(comparisons))
+    else:
+        print("   基线样本不足，暂无可比较的指标")
+
+    if args.svg:
+        with open(args.svg, 'w', encoding='utf-8') as f:
+            f.write(render_trend_svg(store))
+        print(f"📈 趋势图已写入: {args.svg}")
+
+    regressions = [c for c in comparisons if c.regression]
+    if regressions:
+        print(f"❌ {len(regressions)} 项指标显著变慢")
+        return 1
+
+    print("✅ 未发现显著回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
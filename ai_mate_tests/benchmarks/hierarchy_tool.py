@@ -0,0 +1,117 @@
+# benchmarks/hierarchy_tool.py
+"""
+界面结构归档查看工具（不需要设备）
+
+用法:
+    # 列出快照（可按设备、Activity/包名、原因、标签、时间过滤）
+    python -m ai_mate_tests.benchmarks.hierarchy_tool list --device phone_1 --reason failure --hours 24
+    # 输出某次快照的 page source
+    python -m ai_mate_tests.benchmarks.hierarchy_tool show 42 --output dump.xml
+    # 两次快照的节点级差异
+    python -m ai_mate_tests.benchmarks.hierarchy_tool diff 41 42
+    # 导入已有的 XML（如 uiautomator dump），查看存储统计
+    python -m ai_mate_tests.benchmarks.hierarchy_tool import window_dump.xml --device phone_1
+    python -m ai_mate_tests.benchmarks.hierarchy_tool stats
+
+soak 运行的归档在 <输出目录>/hierarchy.db，用 --db 指定。
+"""
+import argparse
+import sys
+import time
+
+from ai_mate_tests.utils.hierarchy_archive import HierarchyArchive
+
+
+def cmd_list(args, archive: HierarchyArchive) -> int:
+    since = time.time() - args.hours * 3600 if args.hours else None
+    captures = archive.find(device_name=args.device, activity=args.activity, reason=args.reason,
+                            label=args.label, since=since, limit=args.limit)
+    for capture in captures:
+        print(capture.describe())
+    print(f"共 {len(captures)} 条")
+    return 0
+
+
+def cmd_show(args, archive: HierarchyArchive) -> int:
+    xml_text = archive.get(args.id)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(xml_text)
+        print(f"📝 已导出: {args.output}")
+    else:
+        print(xml_text)
+    return 0
+
+
+def cmd_diff(args, archive: HierarchyArchive) -> int:
+    diff = archive.diff(args.a, args.b, context=args.context)
+    print(diff or "✅ 两次快照的界面结构相同")
+    return 0
+
+
+def cmd_import(args, archive: HierarchyArchive) -> int:
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as f:
+            capture = archive.add(f.read(), args.device, args.activity, reason=args.reason, label=args.label or path)
+        print(f"📥 {path} -> {capture.describe()}")
+    return 0
+
+
+def cmd_stats(args, archive: HierarchyArchive) -> int:
+    stats = archive.stats()
+    ratio = stats['raw_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0
+    print(f"🗂️ {archive.path}")
+    print(f"  快照 {stats['captures']} 条，去重后 {stats['blobs']} 份（关键帧 {stats['keyframes']}）")
+    print(f"  原始 {stats['raw_bytes'] / 1024:.1f}KB -> 存储 {stats['stored_bytes'] / 1024:.1f}KB（{ratio:.1f}x）")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="界面结构归档查看工具")
+    parser.add_argument("--db", default=None, help="归档数据库路径，默认 AI_MATE_HIERARCHY_DB 或 ai_mate_tests/hierarchy.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_ = sub.add_parser("list", help="列出快照")
+    list_.add_argument("--device", default=None)
+    list_.add_argument("--activity", default=None, help="Activity 或包名，可用 % 通配")
+    list_.add_argument("--reason", default=None, help="failure / checkpoint")
+    list_.add_argument("--label", default=None)
+    list_.add_argument("--hours", type=float, default=None, help="只列出最近若干小时")
+    list_.add_argument("--limit", type=int, default=50)
+    list_.set_defaults(func=cmd_list)
+
+    show = sub.add_parser("show", help="输出快照的 page source")
+    show.add_argument("id", type=int)
+    show.add_argument("--output", default=None)
+    show.set_defaults(func=cmd_show)
+
+    diff = sub.add_parser("diff", help="对比两次快照")
+    diff.add_argument("a", type=int)
+    diff.add_argument("b", type=int)
+    diff.add_argument("--context", type=int, default=3)
+    diff.set_defaults(func=cmd_diff)
+
+    import_ = sub.add_parser("import", help="导入 XML 文件")
+    import_.add_argument("files", nargs="+")
+    import_.add_argument("--device", default=None)
+    import_.add_argument("--activity", default=None)
+    import_.add_argument("--reason", default="import")
+    import_.add_argument("--label", default=None)
+    import_.set_defaults(func=cmd_import)
+
+    stats = sub.add_parser("stats", help="存储统计")
+    stats.set_defaults(func=cmd_stats)
+
+    args = parser.parse_args(argv)
+    archive = HierarchyArchive(args.db)
+    try:
+        return args.func(args, archive)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        return 1
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# benchmarks/soak.py
+"""
+长时间稳定性（soak）运行：每台已连接设备循环执行流程，定期重建会话，进度可恢复
+
+用法:
+    python -m ai_mate_tests.benchmarks.soak --flow bluetooth --hours 8 --recycle-every 25
+    python -m ai_mate_tests.benchmarks.soak --flow pairing --iterations 200 --serial COM12:left_leg --serial COM11:right_leg
+    python -m ai_mate_tests.benchmarks.soak --resume soak_runs/20261019_220000
+
+中断（Ctrl+C、断电、进程被杀）后用 --resume 指向同一输出目录继续，沿用原来的运行参数。
+"""
+import argparse
+import datetime
+import os
+import sys
+
+from ai_mate_tests.utils.soak_runner import FLOWS, SoakConfig, SoakRunner, format_checkpoints
+
+
+def _parse_serial(values):
+    ports = {}
+    for value in values or []:
+        port, _, name = value.partition(":")
+        ports[port] = name or port
+    return ports
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="长时间稳定性（soak）运行")
+    parser.add_argument("--flow", choices=sorted(FLOWS), default="bluetooth",
+                        help="; ".join(f"{name}: {flow.description}" for name, flow in FLOWS.items()))
+    parser.add_argument("--hours", type=float, default=8, help="总运行时长（小时），0 表示只按轮数停止")
+    parser.add_argument("--iterations", type=int, default=None, help="每台设备的最大轮数")
+    parser.add_argument("--recycle-every", type=int, default=25, help="每多少轮重建一次会话")
+    parser.add_argument("--pause", type=float, default=0, help="轮次之间的停顿（秒）")
+    parser.add_argument("--max-failures", type=int, default=10, help="连续失败多少次后停止该设备")
+    parser.add_argument("--serial", action="append", metavar="PORT[:NAME]", help="采集眼镜串口日志，可重复")
+    parser.add_argument("--no-logcat", action="store_true", help="不采集 logcat")
+    parser.add_argument("--watch-config", action="store_true",
+                        help="运行中修改配置文件时自动热加载，不中断会话")
+    parser.add_argument("--log-max-mb", type=int, default=50, help="单个日志分段大小上限（MB）")
+    parser.add_argument("--log-backups", type=int, default=10, help="每路日志保留的历史分段数")
+    parser.add_argument("--hierarchy-every", type=int, default=50,
+                        help="每多少轮归档一次界面结构（失败轮次总会归档），0 表示只在失败时归档")
+    parser.add_argument("--output", default=None, help="输出目录，默认 soak_runs/<时间>")
+    parser.add_argument("--resume", metavar="DIR", default=None, help="从已有输出目录的断点继续")
+    args = parser.parse_args(argv)
+
+    if args.resume:
+        output_dir = args.resume
+        config_path = os.path.join(output_dir, "soak.json")
+        if not os.path.exists(config_path):
+            print(f"❌ {output_dir} 中没有 soak.json，无法恢复")
+            return 1
+        config = SoakConfig.load(config_path)
+        print(f"🔁 恢复 soak: {output_dir}（流程 {config.flow}）")
+    else:
+        output_dir = args.output or os.path.join(
+            "soak_runs", datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
+        config = SoakConfig(
+            flow=args.flow,
+            duration=args.hours * 3600 if args.hours > 0 else None,
+            iterations=args.iterations,
+            recycle_every=max(1, args.recycle_every),
+            pause=args.pause,
+            max_consecutive_failures=args.max_failures,
+            capture_logcat=not args.no_logcat,
+            serial_ports=_parse_serial(args.serial),
+            log_max_bytes=args.log_max_mb * 1024 * 1024,
+            log_backups=args.log_backups,
+            hierarchy_every=max(0, args.hierarchy_every),
+        )
+    if config.duration is None and config.iterations is None:
+        print("❌ 需要指定 --hours 或 --iterations")
+        return 1
+
+    from ai_mate_tests.utils.parallel_driver_manager import ParallelDriverManager
+
+    manager = ParallelDriverManager()
+    manager.driver_factory.config_loader.report_config_errors()
+    if args.watch_config:
+        manager.driver_factory.config_loader.watch()
+    device_names = [name for name in map(manager.find_device_by_udid,
+                                          (d['device_id'] for d in manager.detect_connected_devices())) if name]
+    if not device_names:
+        print("❌ 没有可用设备")
+        return 1
+
+    print(f"🚀 soak 开始: {len(device_names)} 台设备，输出目录 {output_dir}")
+    runner = SoakRunner(manager, config, output_dir)
+    try:
+        checkpoints = runner.run(device_names)
+    finally:
+        manager.quit_all_drivers()
+        manager.driver_factory.config_loader.stop_watching()
+
+    print("\n📊 soak 结果")
+    print(format_checkpoints(checkpoints))
+    print(f"🗂️ 界面结构归档: python -m ai_mate_tests.benchmarks.hierarchy_tool --db {os.path.join(output_dir, 'hierarchy.db')} list")
+    unfinished = [name for name, cp in checkpoints.items() if cp.status == "running"]
+    if unfinished:
+        print(f"⏸️ 未完成，继续运行: python -m ai_mate_tests.benchmarks.soak --resume {output_dir}")
+    return 0 if checkpoints and all(cp.status == "done" for cp in checkpoints.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
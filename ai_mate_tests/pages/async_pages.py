@@ -0,0 +1,193 @@
+# pages/async_pages.py
+"""
+页面对象的协程版本，供 AsyncDeviceOrchestrator 的流程使用
+方法与同步页面对象一一对应：多步流程直接执行同步页面模块中的流程步骤（见 flow_steps），
+这里只实现基础操作
+"""
+import asyncio
+import time
+
+from ai_mate_tests.pages.device_page import complete_pairing_flow_steps, open_scan_steps, pair_device_steps
+from ai_mate_tests.pages.flow_steps import run_steps_async
+from ai_mate_tests.pages.settings_page import bluetooth_cycle_steps, stress_test_bluetooth_steps, unpair_device_steps
+from ai_mate_tests.pages.welcome_page import accept_all_steps
+from ai_mate_tests.utils.async_w3c import AsyncW3CError
+from ai_mate_tests.utils.metrics_store import get_metrics_store
+from ai_mate_tests.utils.readiness import WaitResult, ui_fingerprint
+
+
+class AsyncBasePage:
+    def __init__(self, session):
+        self.session = session
+        self.client = session.client
+        self.element_manager = session.element_manager
+        self.device_name = session.device_name
+
+    async def click_by_config(self, element_key, timeout=5):
+        return await self.element_manager.click(element_key, timeout)
+
+    async def is_displayed_by_config(self, element_key, timeout=0):
+        return await self.element_manager.is_displayed(element_key, timeout)
+
+    async def find_element_by_config(self, element_key, timeout=5):
+        return await self.element_manager.find_element(element_key, timeout)
+
+    async def get_text_by_config(self, element_key):
+        return await self.element_manager.get_text(element_key)
+
+    async def back(self):
+        await self.client.back()
+
+    async def get_current_activity(self):
+        return await self.client.current_activity()
+
+    async def get_current_package(self):
+        return await self.client.current_package()
+
+    async def get_page_source(self):
+        return await self.client.page_source()
+
+    async def wait_until_ui_stable(self, quiet_period=0.5, timeout=5):
+        """等待界面稳定（界面指纹连续 quiet_period 秒不变），与 BasePage.wait_until_ui_stable 相同"""
+        start = time.monotonic()
+        fingerprint, since, attempts = None, start, 0
+        interval, max_interval = 0.1, max(quiet_period / 2, 0.1)
+        while True:
+            attempts += 1
+            try:
+                current = ui_fingerprint(await self.get_page_source())
+                now = time.monotonic()
+                if current != fingerprint:
+                    fingerprint, since = current, now
+                elif now - since >= quiet_period:
+                    return WaitResult("界面稳定", True, now - start, attempts)
+            except AsyncW3CError:
+                pass
+            remaining = start + timeout - time.monotonic()
+            if remaining <= 0:
+                return WaitResult("界面稳定", False, time.monotonic() - start, attempts)
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, max_interval)
+
+
+class AsyncPopupPage(AsyncBasePage):
+    async def handle_interference_popup(self, timeout=2):
+        """快速弹窗处理"""
+        try:
+            element_id = await self.find_element_by_config("popup_button", timeout)
+            coords = self.element_manager.config_loader.get_popup_close_coords(self.device_name)
+            if coords:
+                await self.element_manager.tap_coordinate(coords['x'], coords['y'])
+            else:
+                await self.client.click(element_id)
+            return True
+        except (AsyncW3CError, TimeoutError):
+            return False
+
+
+class AsyncWelcomePage(AsyncBasePage):
+    async def accept_all(self):
+        """完成欢迎流程"""
+        await run_steps_async(accept_all_steps(self))
+
+
+class AsyncDevicePage(AsyncBasePage):
+    async def open_scan(self):
+        """从首页进入添加设备（扫描）界面；已在扫描界面时不操作"""
+        await run_steps_async(open_scan_steps(self))
+
+    async def wait_scan_result(self, timeout=30):
+        """等待扫描结果中出现眼镜"""
+        return await self.find_element_by_config("device_item", timeout=timeout)
+
+    async def search_device(self):
+        await self.click_by_config("device_item")
+
+    async def pair_device(self):
+        await run_steps_async(pair_device_steps(self))
+
+    async def is_paired_success(self, timeout=20):
+        """检查配对成功：在 timeout 内轮询，任一 success_texts 出现即成功"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        interval = 0.05
+        while True:
+            try:
+                if await self.element_manager.get_success_elements():
+                    return True
+            except AsyncW3CError:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, 0.5)
+
+    async def complete_pairing_flow(self):
+        return await run_steps_async(complete_pairing_flow_steps(self))
+
+
+class AsyncSettingsPage(AsyncBasePage):
+    async def open_bluetooth_settings(self):
+        await self.click_by_config("bluetooth_option")
+
+    async def get_switch(self):
+        return await self.find_element_by_config("bluetooth_switch")
+
+    async def toggle_bluetooth(self, enable):
+        """切换蓝牙状态"""
+        switch = await self.get_switch()
+        current = await self.client.get_attribute(switch, "checked") == "true"
+
+        if enable != current:
+            start = time.monotonic()
+            await self.client.click(switch)
+            for _ in range(10):
+                if await self.client.get_attribute(switch, "checked") == str(enable).lower():
+                    get_metrics_store().record(f"bt_toggle_{'on' if enable else 'off'}",
+                                      time.monotonic() - start, self.device_name)
+                    break
+                await asyncio.sleep(0.1)
+
+    async def is_device_connected(self):
+        try:
+            await self.find_element_by_config("paired_device_connected", timeout=1)
+            return True
+        except (AsyncW3CError, TimeoutError):
+            return False
+
+    async def unpair_device(self):
+        """通过系统设置取消配对眼镜"""
+        await run_steps_async(unpair_device_steps(self))
+
+    async def bluetooth_cycle(self, i=1):
+        """一轮蓝牙开关（需已在蓝牙设置界面）"""
+        await run_steps_async(bluetooth_cycle_steps(self, i))
+
+    async def stress_test_bluetooth(self, iterations=50):
+        """蓝牙稳定性测试"""
+        await run_steps_async(stress_test_bluetooth_steps(self, iterations))
+
+
+async def bluetooth_stress_flow(session, iterations=5):
+    """蓝牙稳定性流程（对应 test_open_bluetooth 的单设备函数）"""
+    await AsyncPopupPage(session).handle_interference_popup()
+    await AsyncSettingsPage(session).stress_test_bluetooth(iterations=iterations)
+    return True
+
+
+async def pairing_flow(session):
+    """配对流程（对应 test_search_and_pair 的单设备函数）"""
+    popup = AsyncPopupPage(session)
+    device = AsyncDevicePage(session)
+
+    await popup.handle_interference_popup()
+    await AsyncWelcomePage(session).accept_all()
+    await popup.handle_interference_popup()
+
+    await device.search_device()
+    await device.pair_device()
+
+    if not await device.is_paired_success(timeout=30):
+        raise AssertionError(f"{session.device_name} 配对失败")
+    return True
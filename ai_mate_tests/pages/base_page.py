@@ -1,7 +1,16 @@
 # pages/base_page.py
-from appium.webdriver.common.appiumby import AppiumBy
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from ai_mate_tests.utils.config_loader import BY_MAPPING
+
+
+def _wait(driver, timeout):
+    """Selenium 显式等待（首次使用时才导入 Selenium）"""
+    from selenium.webdriver.support.ui import WebDriverWait
+    return WebDriverWait(driver, timeout)
+
+
+def _conditions():
+    from selenium.webdriver.support import expected_conditions
+    return expected_conditions
 
 
 class BasePage:
@@ -22,10 +31,9 @@ class BasePage:
             else:
                 # 单设备测试时，动态导入并初始化
                 try:
-                    from ai_mate_tests.utils.config_loader import ConfigLoader
+                    from ai_mate_tests.utils.config_loader import get_config_loader
                     from ai_mate_tests.utils.element_manager import ElementManager
-                    config_loader = ConfigLoader()
-                    self._element_manager = ElementManager(config_loader, self.device_name)
+                    self._element_manager = ElementManager(get_config_loader(), self.device_name)
                 except Exception as e:
                     print(f"⚠️ element_manager初始化失败: {e}")
                     print("💡 提示: 请确保config.yaml文件位于正确位置")
@@ -57,6 +65,13 @@ class BasePage:
         else:
             raise RuntimeError("element_manager未初始化，无法使用配置分离功能")
 
+    def get_cached_element_by_config(self, element_key, timeout=5):
+        """通过配置获取缓存的元素句柄（反复操作同一元素时省去查找往返）"""
+        if self.element_manager:
+            return self.element_manager.get_cached_element(self.driver, element_key, timeout)
+        else:
+            raise RuntimeError("element_manager未初始化，无法使用配置分离功能")
+
     def find_elements_by_config(self, element_key, timeout=5):
         """通过配置键名查找多个元素"""
         if self.element_manager:
@@ -93,15 +108,15 @@ class BasePage:
 
     def click_by_xpath(self, xpath):
         """通过xpath点击元素"""
-        self.click(AppiumBy.XPATH, xpath)
+        self.click(BY_MAPPING['xpath'], xpath)
 
     def click_by_accessibility_id(self, acc_id):
         """通过accessibility_id点击元素"""
-        self.click(AppiumBy.ACCESSIBILITY_ID, acc_id)
+        self.click(BY_MAPPING['accessibility_id'], acc_id)
 
     def click_by_text(self, text):
         """通过文本点击元素"""
-        self.click(AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().text("{text}")')
+        self.click(BY_MAPPING['android_uiautomator'], f'new UiSelector().text("{text}")')
 
     def is_displayed(self, by, locator):
         """检查元素是否显示"""
@@ -117,20 +132,20 @@ class BasePage:
         :param locator: 定位值
         :param timeout: 等待时间（秒）
         """
-        return WebDriverWait(self.driver, timeout).until(
-            EC.presence_of_element_located((by, locator))
+        return _wait(self.driver, timeout).until(
+            _conditions().presence_of_element_located((by, locator))
         )
 
     def find_elements(self, by, locator, timeout=5):
         """查找多个元素"""
-        return WebDriverWait(self.driver, timeout).until(
-            EC.presence_of_all_elements_located((by, locator))
+        return _wait(self.driver, timeout).until(
+            _conditions().presence_of_all_elements_located((by, locator))
         )
 
     def wait_for_element(self, by, locator, timeout=10):
         """等待元素可见"""
-        return WebDriverWait(self.driver, timeout).until(
-            EC.visibility_of_element_located((by, locator))
+        return _wait(self.driver, timeout).until(
+            _conditions().visibility_of_element_located((by, locator))
         )
 
     def input_text(self, by, locator, text):
@@ -156,13 +171,87 @@ class BasePage:
         """获取页面源码"""
         return self.driver.page_source
 
+    def archive_page_source(self, reason="checkpoint", label=None):
+        """
+        把当前界面结构存入归档（去重压缩，可按设备/Activity 查询和对比，见 utils/hierarchy_archive）
+        :return: Capture，会话失效取不到界面结构时为 None
+        """
+        from ai_mate_tests.utils.hierarchy_archive import get_hierarchy_archive
+        return get_hierarchy_archive().capture(self.driver, reason=reason, label=label or type(self).__name__)
+
     def swipe(self, start_x, start_y, end_x, end_y, duration=800):
         """滑动操作"""
-        self.driver.swipe(start_x, start_y, end_x, end_y, duration)
+        if self.element_manager:
+            self.element_manager.gestures(self.driver).swipe(start_x, start_y, end_x, end_y, duration).perform()
+        else:
+            self.driver.swipe(start_x, start_y, end_x, end_y, duration)
 
     def back(self):
         """返回操作"""
         self.driver.back()
+        if self.element_manager:
+            self.element_manager.invalidate_cache()
+
+    def wait_until_ui_stable(self, quiet_period=0.5, timeout=5):
+        """
+        等待界面稳定（界面指纹连续 quiet_period 秒不变），替代操作后的固定等待
+        :return: WaitResult，elapsed 为实际稳定耗时；超时不抛异常，由调用方根据 ok 决定
+        """
+        from ai_mate_tests.utils.readiness import get_readiness_probe
+        return get_readiness_probe().wait_hierarchy_stable(self.driver, quiet_period, timeout)
+
+    # ========== 视觉断言 ==========
+
+    def match_templates(self, templates, region=None, threshold=None):
+        """
+        截一次图匹配一个或多个参考模板（适合无障碍树查找慢或不稳定的自定义控件）
+        :param templates: 模板名或 PNG 路径（见 utils/visual_match.resolve_template），可为列表
+        :param region: 搜索区域 (x, y, w, h)，像素或屏幕比例
+        :return: MatchResult 列表，顺序与 templates 一致
+        """
+        from ai_mate_tests.utils.visual_match import get_visual_matcher, resolve_template
+
+        if isinstance(templates, str):
+            templates = [templates]
+        paths = [resolve_template(name, self.device_name) for name in templates]
+        return get_visual_matcher().match_many(self.driver.get_screenshot_as_png(), paths, region, threshold)
+
+    def wait_for_template(self, templates, timeout=10, region=None, threshold=None):
+        """
+        在 timeout 内轮询截图，任一模板匹配即返回
+        :return: 匹配到的 MatchResult；超时返回置信度最高的一次结果（found 为 False）
+        """
+        from ai_mate_tests.utils.readiness import poll_until
+
+        best = []
+
+        def _matched():
+            results = self.match_templates(templates, region, threshold)
+            result = max(results, key=lambda r: r.confidence)
+            if not best or result.found or result.confidence > best[0].confidence:
+                best[:] = [result]
+            return result.found
+
+        poll_until(_matched, timeout, name=f"{self.device_name} 视觉匹配", initial_interval=0.2)
+        return best[0]
+
+    def assert_visual(self, templates, timeout=10, region=None, threshold=None):
+        """视觉断言：超时未匹配时抛出 AssertionError（附最高置信度）"""
+        result = self.wait_for_template(templates, timeout, region, threshold)
+        if not result.found:
+            raise AssertionError(f"{self.device_name} 未在截图中找到 {templates}"
+                                 f"（最高置信度 {result.confidence:.3f} @ {result.x},{result.y}）")
+        return result
+
+    def tap_template(self, templates, timeout=10, region=None, threshold=None):
+        """点击匹配到的模板中心"""
+        result = self.assert_visual(templates, timeout, region, threshold)
+        x, y = result.center
+        if self.element_manager:
+            self.element_manager.tap_coordinate(self.driver, x, y)
+        else:
+            self.driver.tap([(x, y)])
+        return result
 
     def get_current_activity(self):
         """获取当前activity"""
@@ -1,25 +1,62 @@
 from ai_mate_tests.pages.base_page import BasePage
+from ai_mate_tests.pages.flow_steps import run_steps
+
+
+# ========== 流程步骤（与 AsyncDevicePage 共用，见 flow_steps） ==========
+
+def open_scan_steps(page):
+    if (yield page.is_displayed_by_config("add_device")):
+        yield page.click_by_config("add_device")
+
+
+def pair_device_steps(page):
+    yield page.click_by_config("pair_button")
+    yield page.wait_until_ui_stable()
+
+
+def complete_pairing_flow_steps(page):
+    yield page.search_device()
+    yield page.pair_device()
+    return (yield page.is_paired_success())
 
 
 class DevicePage(BasePage):
+    def open_scan(self):
+        """从首页进入添加设备（扫描）界面；已在扫描界面时不操作"""
+        run_steps(open_scan_steps(self))
+
+    def wait_scan_result(self, timeout=30):
+        """等待扫描结果中出现眼镜"""
+        return self.find_element_by_config("device_item", timeout=timeout)
+
     def search_device(self):
         """搜索设备"""
         self.click_by_config("device_item")
 
     def pair_device(self):
         """配对设备"""
-        self.click_by_config("pair_button")
+        run_steps(pair_device_steps(self))
 
     def is_paired_success(self, timeout=20):
-        """检查配对成功"""
-        try:
-            elements = self.element_manager.get_success_elements(self.driver)
-            return bool(elements)
-        except Exception:
+        """
+        检查配对成功：在 timeout 内轮询界面，任一 success_texts 出现即成功
+        每次轮询只获取一次 page source 并在本地匹配，不受隐式等待影响
+        """
+        from ai_mate_tests.utils.config_loader import ConfigLoader
+        from ai_mate_tests.utils.hierarchy import find_all, parse_hierarchy
+        from ai_mate_tests.utils.readiness import poll_until
+
+        locators = [ConfigLoader.convert_locator_to_appium_format(text_config)
+                    for text_config in self.element_manager.config_loader.get_success_texts(self.device_name)]
+        if not locators:
             return False
 
+        def _success():
+            root = parse_hierarchy(self.driver.page_source)
+            return any(find_all(root, by, value) for by, value in locators)
+
+        return poll_until(_success, timeout, name=f"{self.device_name} 配对成功").ok
+
     def complete_pairing_flow(self):
         """完整配对流程"""
-        self.search_device()
-        self.pair_device()
-        return self.is_paired_success()
\ No newline at end of file
+        return run_steps(complete_pairing_flow_steps(self))
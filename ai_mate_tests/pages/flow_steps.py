@@ -0,0 +1,46 @@
+# pages/flow_steps.py
+"""
+同步 / 协程页面对象共用的流程步骤
+
+多步流程（一轮蓝牙开关、取消配对、进入扫描界面等）只写一次，写成生成器：
+每一步 yield 页面对象方法的返回值，再取回该步的结果
+
+    def bluetooth_cycle_steps(page, i):
+        yield page.toggle_bluetooth(True)
+        if not (yield page.is_device_connected()):
+            raise AssertionError(...)
+
+同步页面对象的方法直接返回结果，run_steps 原样送回；
+协程页面对象的方法返回协程，run_steps_async 等待后送回（异常抛回生成器内）。
+页面对象各自实现基础操作（点击、查找、切换开关），流程只在这里改一处。
+步骤中不能直接 sleep（会阻塞事件循环），需要等待时调用页面对象的方法。
+"""
+import inspect
+from typing import Any, Generator
+
+Steps = Generator[Any, Any, Any]
+
+
+def run_steps(steps: Steps):
+    """执行同步页面对象的流程步骤，返回流程的返回值"""
+    try:
+        value = next(steps)
+        while True:
+            value = steps.send(value)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def run_steps_async(steps: Steps):
+    """执行协程页面对象的流程步骤：逐步等待，把结果或异常送回生成器"""
+    try:
+        step = next(steps)
+        while True:
+            try:
+                value = await step if inspect.isawaitable(step) else step
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(value)
+    except StopIteration as stop:
+        return stop.value
@@ -1,4 +1,3 @@
-from appium.webdriver.common.touch_action import TouchAction
 from ai_mate_tests.pages.base_page import BasePage
 
 class PopupPage(BasePage):
@@ -7,10 +6,8 @@ class PopupPage(BasePage):
         try:
             element = self.find_element_by_config("popup_button", timeout)
             if element:
-                coords = self.element_manager.config_loader.get_popup_close_coords(self.device_name)
-                if coords:
-                    TouchAction(self.driver).tap(x=coords['x'], y=coords['y']).perform()
-                else:
+                # 有配置坐标时按坐标点击关闭，否则点击弹窗按钮
+                if not self.element_manager.gestures(self.driver).tap_config_coords().perform():
                     element.click()
                 return True
         except Exception:
@@ -1,5 +1,44 @@
 import time
 from ai_mate_tests.pages.base_page import BasePage
+from ai_mate_tests.pages.flow_steps import run_steps
+
+
+def _metrics():
+    """指标库（首次记录时才导入）"""
+    from ai_mate_tests.utils.metrics_store import get_metrics_store
+    return get_metrics_store()
+
+
+# ========== 流程步骤（与 AsyncSettingsPage 共用，见 flow_steps） ==========
+
+def unpair_device_steps(page):
+    yield page.open_bluetooth_settings()
+    yield page.click_by_config("paired_device_details")
+    yield page.click_by_config("unpair_button")
+    if (yield page.is_displayed_by_config("unpair_confirm")):
+        yield page.click_by_config("unpair_confirm")
+    yield page.wait_until_ui_stable()
+
+
+def bluetooth_cycle_steps(page, i):
+    yield page.toggle_bluetooth(True)
+    if not (yield page.is_device_connected()):
+        raise AssertionError(f"第 {i} 次失败：设备未连接")
+
+    yield page.toggle_bluetooth(False)
+    yield page.toggle_bluetooth(True)
+
+    start = time.monotonic()
+    if not (yield page.is_device_connected()):
+        raise AssertionError(f"第 {i} 次失败：重新打开后未连接")
+    _metrics().record("bt_reconnect", time.monotonic() - start, page.device_name)
+
+
+def stress_test_bluetooth_steps(page, iterations):
+    yield page.open_bluetooth_settings()
+
+    for i in range(1, iterations + 1):
+        yield page.bluetooth_cycle(i)
 
 
 class SettingsPage(BasePage):
@@ -8,8 +47,8 @@ class SettingsPage(BasePage):
         self.click_by_config("bluetooth_option")
 
     def get_switch(self):
-        """获取蓝牙开关"""
-        return self.find_element_by_config("bluetooth_switch")
+        """获取蓝牙开关（缓存句柄，反复切换时不再查找）"""
+        return self.get_cached_element_by_config("bluetooth_switch")
 
     def toggle_bluetooth(self, enable):
         """切换蓝牙状态"""
@@ -17,10 +56,13 @@ class SettingsPage(BasePage):
         current = switch.get_attribute("checked") == "true"
 
         if enable != current:
+            start = time.monotonic()
             switch.click()
             # 快速状态验证
             for _ in range(10):
                 if switch.get_attribute("checked") == str(enable).lower():
+                    _metrics().record(f"bt_toggle_{'on' if enable else 'off'}",
+                                      time.monotonic() - start, self.device_name)
                     break
                 time.sleep(0.1)
 
@@ -32,17 +74,14 @@ class SettingsPage(BasePage):
         except Exception:
             return False
 
-    def stress_test_bluetooth(self, iterations=50):
-        """蓝牙稳定性测试"""
-        self.open_bluetooth_settings()
-
-        for i in range(1, iterations + 1):
-            self.toggle_bluetooth(True)
-            if not self.is_device_connected():
-                raise AssertionError(f"第 {i} 次失败：设备未连接")
+    def unpair_device(self):
+        """通过系统设置取消配对眼镜：蓝牙设置 -> 已配对设备详情 -> 取消配对（有确认框时确认）"""
+        run_steps(unpair_device_steps(self))
 
-            self.toggle_bluetooth(False)
-            self.toggle_bluetooth(True)
+    def bluetooth_cycle(self, i=1):
+        """一轮蓝牙开关：打开后已连接 -> 关闭再打开 -> 重新连接（需已在蓝牙设置界面）"""
+        run_steps(bluetooth_cycle_steps(self, i))
 
-            if not self.is_device_connected():
-                raise AssertionError(f"第 {i} 次失败：重新打开后未连接")
\ No newline at end of file
+    def stress_test_bluetooth(self, iterations=50):
+        """蓝牙稳定性测试"""
+        run_steps(stress_test_bluetooth_steps(self, iterations))
@@ -1,8 +1,17 @@
 from ai_mate_tests.pages.base_page import BasePage
+from ai_mate_tests.pages.flow_steps import run_steps
+
+
+def accept_all_steps(page):
+    """欢迎流程步骤（与 AsyncWelcomePage 共用，见 flow_steps）"""
+    # 同意协议后界面会重绘，立即使用要在点击同意之后再查找，不能合并为一次手势请求
+    yield page.click_by_config("agree_protocol")
+    yield page.click_by_config("use_now")
+    yield page.click_by_config("allow")
+    yield page.wait_until_ui_stable()
+
 
 class WelcomePage(BasePage):
     def accept_all(self):
         """完成欢迎流程"""
-        self.click_by_config("agree_protocol")
-        self.click_by_config("use_now") 
-        self.click_by_config("allow")
\ No newline at end of file
+        run_steps(accept_all_steps(self))
\ No newline at end of file
@@ -0,0 +1,50 @@
+# simulator/__main__.py
+"""
+启动模拟器
+
+用法:
+    python -m ai_mate_tests.simulator --devices 4                       # 前台运行，Ctrl+C 退出
+    python -m ai_mate_tests.simulator --devices 4 -- pytest testsplan   # 在模拟器环境中执行命令
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from ai_mate_tests.simulator.runtime import Simulator
+from ai_mate_tests.simulator.virtual_device import DEFAULT_SCENARIO
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="AI Mate 离线设备模拟器")
+    parser.add_argument("--devices", type=int, default=1, help="虚拟设备数量")
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO, help="场景文件")
+    parser.add_argument("--latency-ms", type=float, default=0, help="每条命令的模拟耗时")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="耗时抖动")
+    parser.add_argument("--failure-rate", type=float, default=0, help="命令随机失败概率")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="在模拟器环境中执行的命令（以 -- 分隔）")
+    args = parser.parse_args(argv)
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+
+    with Simulator(devices=args.devices, scenario=args.scenario, latency_ms=args.latency_ms,
+                   jitter_ms=args.jitter_ms, failure_rate=args.failure_rate, seed=args.seed) as sim:
+        env = sim.environ()
+        for key, value in env.items():
+            print(f"   {key}={value}")
+
+        if command:
+            return subprocess.call(command, env={**os.environ, **env})
+
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n🛑 模拟器已停止")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+# simulator/adb_server.py
+"""
+adb server 协议的本地替身
+
+实现 AdbClient 用到的 host 服务（version、devices、track-devices、transport）
+和设备 shell/exec 服务。shell 命令由一个很小的 Python 解释器处理，
+覆盖框架实际执行的 getprop、pidof、am、pm、dumpsys、ps、settings 以及 "| grep" 管道。
+"""
+import re
+import shlex
+import socket
+import socketserver
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from ai_mate_tests.simulator.virtual_device import VirtualDevice
+
+ADB_SERVER_VERSION = 41
+
+# AdbClient.run 包装命令的格式：(command); __rc=$?; echo; echo MARKER $__rc
+_WRAPPED_RE = re.compile(r"^\((?P<command>.*)\); __rc=\$\?; echo; echo (?P<marker>\S+) \$__rc$", re.S)
+
+
+class CommandResult(NamedTuple):
+    exit_code: int
+    output: str
+
+
+# ========== 迷你 shell ==========
+
+# 带参数的 grep 选项（-m 1、-m1、-e PATTERN 等形式）
+_GREP_VALUE_OPTIONS = set('meABC')
+
+
+def _grep(lines: List[str], args: List[str]) -> List[str]:
+    """支持 -v -i -F -E -m N -e PATTERN，其余无参数选项忽略；多余的位置参数视为文件名忽略"""
+    options: Dict[str, str] = {}
+    patterns: List[str] = []
+    positional: List[str] = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == '--':
+            positional.extend(args)
+            break
+        if not arg.startswith('-') or arg == '-':
+            positional.append(arg)
+            continue
+        # 合并的短选项，如 -iv、-m1
+        for index, flag in enumerate(arg[1:], 1):
+            if flag in _GREP_VALUE_OPTIONS:
+                value = arg[index + 1:] or (args.pop(0) if args else "")
+                if flag == 'e':
+                    patterns.append(value)
+                else:
+                    options[flag] = value
+                break
+            options[flag] = ""
+    if not patterns:
+        if not positional:
+            return lines
+        patterns.append(positional[0])
+
+    flags = re.I if 'i' in options else 0
+    regexes = [re.compile(re.escape(p) if 'F' in options else p, flags) for p in patterns]
+    invert = 'v' in options
+    matched = [line for line in lines if any(r.search(line) for r in regexes) != invert]
+    if 'm' in options:
+        matched = matched[:int(options['m'])]
+    return matched
+
+
+def _single(device: VirtualDevice, argv: List[str]) -> CommandResult:
+    """执行一条不含管道的命令"""
+    if not argv:
+        return CommandResult(0, "")
+    name, args = argv[0], argv[1:]
+
+    if name == 'echo':
+        return CommandResult(0, " ".join(args) + "\n")
+    if name in ('true', ':'):
+        return CommandResult(0, "")
+    if name == 'getprop':
+        if not args:
+            return CommandResult(0, "".join(f"[{k}]: [{v}]\n" for k, v in sorted(device.props.items())))
+        return CommandResult(0, device.props.get(args[0], "") + "\n")
+    if name == 'pidof':
+        if args and device.is_running(args[0]):
+            return CommandResult(0, f"{10000 + sum(map(ord, args[0])) % 20000}\n")
+        return CommandResult(1, "")
+    if name == 'ps':
+        lines = ["USER           PID  PPID     VSZ    RSS WCHAN            ADDR S NAME"]
+        for package in device.scenario.apps:
+            if device.is_running(package):
+                pid = 10000 + sum(map(ord, package)) % 20000
+                lines.append(f"u0_a123      {pid:>5}   700 1234567 123456 0                   0 S {package}")
+        return CommandResult(0, "\n".join(lines) + "\n")
+    if name == 'am':
+        return _am(device, args)
+    if name == 'pm':
+        return _pm(device, args)
+    if name == 'dumpsys':
+        return _dumpsys(device, args)
+    if name == 'settings':
+        return _settings(device, args)
+    if name == 'input' and args[:1] == ['tap'] and len(args) >= 3:
+        device.tap(int(float(args[1])), int(float(args[2])))
+        return CommandResult(0, "")
+    if name == 'input' and args[:2] == ['keyevent', '4']:
+        device.back()
+        return CommandResult(0, "")
+    if name == 'logcat':
+        return CommandResult(0, "")
+    return CommandResult(127, f"/system/bin/sh: {name}: inaccessible or not found\n")
+
+
+def _am(device: VirtualDevice, args: List[str]) -> CommandResult:
+    if args[:1] == ['force-stop'] and len(args) > 1:
+        device.terminate_app(args[-1])
+        return CommandResult(0, "")
+    if args[:1] in (['start'], ['start-activity']):
+        component = next((a for a in args[1:] if '/' in a), None)
+        if component is None:
+            return CommandResult(1, "Error: missing component\n")
+        try:
+            device.activate_app(component.split('/', 1)[0])
+        except ValueError as e:
+            return CommandResult(1, f"Error: {e}\n")
+        return CommandResult(0, f"Starting: Intent {{ cmp={component} }}\n")
+    return CommandResult(1, f"Unknown command: am {' '.join(args)}\n")
+
+
+def _pm(device: VirtualDevice, args: List[str]) -> CommandResult:
+    if args[:2] == ['list', 'packages']:
+        keyword = args[2] if len(args) > 2 and not args[2].startswith('-') else ""
+        packages = [p for p in device.scenario.packages if keyword in p]
+        return CommandResult(0, "".join(f"package:{p}\n" for p in packages))
+    if args[:1] in (['grant'], ['revoke']):
+        return CommandResult(0, "")
+    if args[:1] == ['clear']:
+        if len(args) > 1:
+            device.terminate_app(args[1])
+        return CommandResult(0, "Success\n")
+    return CommandResult(1, f"Unknown command: pm {' '.join(args)}\n")
+
+
+def _dumpsys(device: VirtualDevice, args: List[str]) -> CommandResult:
+    if args[:1] == ['window']:
+        package = device.current_package()
+        activity = device.current_activity()
+        component = f"{package}/{activity}"
+        return CommandResult(0, (
+            f"  mCurrentFocus=Window{{a1b2c3 u0 {component}}}\n"
+            f"  mFocusedApp=ActivityRecord{{d4e5f6 u0 {component} t42}}\n"
+        ))
+    if args[:1] == ['package'] and len(args) > 1:
+        info = device.scenario.packages.get(args[1])
+        if info is None:
+            return CommandResult(0, "")
+        return CommandResult(0, (
+            f"Packages:\n  Package [{args[1]}] (abc123):\n"
+            f"    versionCode={info.get('version_code', 1)} minSdk=24 targetSdk=35\n"
+            f"    versionName={info.get('version_name', '1.0')}\n"
+        ))
+    return CommandResult(0, "")
+
+
+def _settings(device: VirtualDevice, args: List[str]) -> CommandResult:
+    if len(args) >= 3 and args[0] == 'get':
+        return CommandResult(0, device.settings.get(f"{args[1]}/{args[2]}", "null") + "\n")
+    if len(args) >= 4 and args[0] == 'put':
+        device.settings[f"{args[1]}/{args[2]}"] = args[3]
+        return CommandResult(0, "")
+    return CommandResult(1, "usage: settings [get|put] namespace key [value]\n")
+
+
+def _split_top_level(command: str, separator: str) -> List[str]:
+    """按分隔符拆分命令，忽略引号内的分隔符"""
+    parts, current, quote = [], [], None
+    for char in command:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char == separator:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+def run_shell(device: VirtualDevice, command: str) -> CommandResult:
+    """执行 shell 命令行，支持 ";" 顺序执行和 "| grep" 管道，退出码取最后一条"""
+    outputs = []
+    result = CommandResult(0, "")
+    for statement in _split_top_level(command, ';'):
+        if not statement.strip():
+            continue
+        stages = _split_top_level(statement, '|')
+        result = _single(device, shlex.split(stages[0]))
+        for stage in stages[1:]:
+            argv = shlex.split(stage)
+            if argv[:1] != ['grep']:
+                result = CommandResult(127, f"/system/bin/sh: {argv[0]}: inaccessible or not found\n")
+                break
+            lines = _grep(result.output.splitlines(), argv[1:])
+            result = CommandResult(0 if lines else 1, "".join(line + "\n" for line in lines))
+        outputs.append(result.output)
+    return CommandResult(result.exit_code, "".join(outputs))
+
+
+def execute(device: VirtualDevice, command: str) -> str:
+    """处理 shell: 服务的命令，识别 AdbClient.run 的退出码标记"""
+    wrapped = _WRAPPED_RE.match(command)
+    if wrapped:
+        result = run_shell(device, wrapped.group('command'))
+        return f"{result.output}\n{wrapped.group('marker')} {result.exit_code}\n"
+    return run_shell(device, command).output
+
+
+# ========== 协议层 ==========
+
+class _AdbHandler(socketserver.BaseRequestHandler):
+    server: "AdbServer"
+
+    def _recv_exact(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("客户端断开")
+            data += chunk
+        return data
+
+    def _read_request(self) -> str:
+        length = int(self._recv_exact(4), 16)
+        return self._recv_exact(length).decode('utf-8')
+
+    def _okay(self, payload: Optional[str] = None):
+        data = b"OKAY"
+        if payload is not None:
+            encoded = payload.encode('utf-8')
+            data += f"{len(encoded):04x}".encode('ascii') + encoded
+        self.request.sendall(data)
+
+    def _fail(self, message: str):
+        encoded = message.encode('utf-8')
+        self.request.sendall(b"FAIL" + f"{len(encoded):04x}".encode('ascii') + encoded)
+
+    def handle(self):
+        try:
+            request = self._read_request()
+            if request == "host:version":
+                self._okay(f"{ADB_SERVER_VERSION:04x}")
+            elif request == "host:devices":
+                self._okay(self.server.device_list())
+            elif request == "host:track-devices":
+                self._okay(self.server.device_list())
+                # 保持连接直到客户端关闭；设备列表在运行期间不变
+                while self.request.recv(1024):
+                    pass
+            elif request.startswith("host:transport:"):
+                device = self.server.devices.get(request.split(":", 2)[2])
+                if device is None:
+                    self._fail(f"device '{request.split(':', 2)[2]}' not found")
+                    return
+                self._okay()
+                self._device_service(device, self._read_request())
+            else:
+                self._fail(f"unknown host service: {request}")
+        except (ConnectionError, ValueError, OSError):
+            pass
+
+    def _device_service(self, device: VirtualDevice, service: str):
+        device.simulate_latency()
+        if service.startswith("shell:"):
+            self._okay()
+            self.request.sendall(execute(device, service[len("shell:"):]).replace("\n", "\r\n").encode('utf-8'))
+        elif service.startswith("exec:"):
+            command = service[len("exec:"):]
+            self._okay()
+            if command.strip() == "screencap -p":
+                self.request.sendall(device.screenshot_png())
+            else:
+                self.request.sendall(run_shell(device, command).output.encode('utf-8'))
+        else:
+            self._fail(f"unknown device service: {service}")
+        self.request.shutdown(socket.SHUT_WR)
+
+
+class AdbServer(socketserver.ThreadingTCPServer):
+    """在后台线程中运行的假 adb server"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, devices: Dict[str, VirtualDevice], host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _AdbHandler)
+        self.devices = devices
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def device_list(self) -> str:
+        return "".join(f"{udid}\tdevice\n" for udid in self.devices)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="adb-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
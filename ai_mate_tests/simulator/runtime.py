@@ -0,0 +1,116 @@
+# simulator/runtime.py
+"""
+模拟器运行时：创建 N 台虚拟设备，启动 W3C 服务与假 adb server，并生成对应的配置文件
+
+    with Simulator(devices=4) as sim:
+        os.environ.update(sim.environ())
+        ...  # ConfigLoader / DriverFactory / pytest 照常使用
+"""
+import copy
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional
+
+import yaml
+
+from ai_mate_tests.simulator.adb_server import AdbServer
+from ai_mate_tests.simulator.virtual_device import DEFAULT_SCENARIO, Scenario, VirtualDevice
+from ai_mate_tests.simulator.w3c_server import W3CServer, W3CSimulator
+
+BASE_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils", "config.yaml")
+
+
+def simulator_udid(index: int) -> str:
+    return f"SIM-{index:04d}"
+
+
+class Simulator:
+    """
+    :param devices: 虚拟设备数量
+    :param scenario: 场景文件路径
+    :param latency_ms / jitter_ms: 每条命令的模拟耗时及抖动
+    :param failure_rate: 每条命令随机失败的概率
+    :param base_config: 复制元素定位、应用配置等内容的基础配置
+    """
+
+    def __init__(self, devices: int = 1, scenario: str = DEFAULT_SCENARIO, latency_ms: float = 0,
+                 jitter_ms: float = 0, failure_rate: float = 0, base_config: str = BASE_CONFIG,
+                 seed: Optional[int] = None, workdir: Optional[str] = None):
+        self.scenario = Scenario(scenario)
+        self.devices: Dict[str, VirtualDevice] = {}
+        for index in range(1, devices + 1):
+            udid = simulator_udid(index)
+            self.devices[udid] = VirtualDevice(
+                udid, self.scenario, latency_ms=latency_ms, jitter_ms=jitter_ms, failure_rate=failure_rate,
+                seed=None if seed is None else seed + index
+            )
+
+        self.base_config = base_config
+        self.w3c = W3CSimulator(self.devices)
+        self.w3c_server: Optional[W3CServer] = None
+        self.adb_server: Optional[AdbServer] = None
+        self._owns_workdir = workdir is None
+        self.workdir = workdir or tempfile.mkdtemp(prefix="ai_mate_sim_")
+        self.config_path = os.path.join(self.workdir, "config.yaml")
+
+    @property
+    def url(self) -> str:
+        return self.w3c_server.url
+
+    def start(self) -> "Simulator":
+        self.w3c_server = W3CServer(self.w3c).start()
+        self.adb_server = AdbServer(self.devices).start()
+        self.write_config()
+        print(f"🤖 模拟器已启动: {len(self.devices)} 台设备, W3C {self.url}, adb 端口 {self.adb_server.port}")
+        return self
+
+    def stop(self):
+        if self.w3c_server:
+            self.w3c_server.stop()
+            self.w3c_server = None
+        if self.adb_server:
+            self.adb_server.stop()
+            self.adb_server = None
+        if self._owns_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def write_config(self) -> str:
+        """以基础配置的第一台设备为模板，为每台虚拟设备生成配置"""
+        with open(self.base_config, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+
+        template = next(iter(config.get('devices', {}).values()))
+        devices, servers = {}, {}
+        for index, udid in enumerate(self.devices, 1):
+            name = f"device{index}"
+            device = copy.deepcopy(template)
+            device.update({
+                'udid': udid,
+                'device_name': name,
+                'appium_server_url': self.url,
+                'platform_version': self.devices[udid].platform_version,
+            })
+            devices[name] = device
+            servers[name] = self.url
+
+        config['devices'] = devices
+        config['appium_servers'] = servers
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+        return self.config_path
+
+    def environ(self) -> Dict[str, str]:
+        """让框架连接到模拟器所需的环境变量"""
+        return {
+            "AI_MATE_CONFIG": self.config_path,
+            "ANDROID_ADB_SERVER_ADDRESS": "127.0.0.1",
+            "ANDROID_ADB_SERVER_PORT": str(self.adb_server.port),
+            "AI_MATE_ADB_BACKEND": "server",
+        }
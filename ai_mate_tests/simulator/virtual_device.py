@@ -0,0 +1,275 @@
+# simulator/virtual_device.py
+"""
+虚拟设备：由录制的层级 dump 和场景脚本驱动的界面状态机
+"""
+import copy
+import os
+import random
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional, Tuple
+import xml.etree.ElementTree as ET
+
+import yaml
+
+from ai_mate_tests.utils.config_loader import BY_MAPPING
+from ai_mate_tests.utils.hierarchy import element_at, find_all, parse_bounds, parse_hierarchy, to_source
+
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+DEFAULT_SCENARIO = os.path.join(SCENARIO_DIR, "default.yaml")
+
+
+class StaleElement(Exception):
+    """元素所在界面已变化"""
+
+
+class Scenario:
+    """场景：界面模板、应用入口和点击状态转换（只读，多台虚拟设备共享）"""
+
+    def __init__(self, path: str = DEFAULT_SCENARIO):
+        self.path = path
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f)
+
+        base_dir = os.path.dirname(os.path.abspath(path))
+        size = data.get('screen_size', {})
+        self.width = size.get('width', 1080)
+        self.height = size.get('height', 2436)
+        self.device_props: Dict[str, str] = data.get('device_props', {})
+        self.packages: Dict[str, Dict] = data.get('packages', {})
+        self.apps: Dict[str, Dict] = data.get('apps', {})
+        self.launcher: str = data.get('launcher')
+
+        self.screens: Dict[str, Dict] = {}
+        for name, screen in data.get('screens', {}).items():
+            with open(os.path.join(base_dir, screen['file']), 'r', encoding='utf-8') as f:
+                template = parse_hierarchy(f.read())
+            package = screen.get('package', '')
+            activity = screen.get('activity', '')
+            self.screens[name] = {
+                'template': template,
+                'package': package,
+                'activity': activity,
+            }
+
+        self.transitions: List[Dict] = []
+        for transition in data.get('transitions', []):
+            on_click = transition['on_click']
+            transition = dict(transition)
+            transition['locator'] = (BY_MAPPING.get(on_click['by'], on_click['by']), on_click['value'])
+            self.transitions.append(transition)
+
+
+class VirtualDevice:
+    """
+    一台虚拟设备的界面状态
+
+    每个应用维护独立的界面栈；界面切换或节点被移除后，之前返回的元素 ID 失效（stale）。
+    latency_ms / failure_rate 模拟网络与设备耗时、偶发失败。
+    """
+
+    ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+    def __init__(self, udid: str, scenario: Scenario, model: str = None, platform_version: str = "15",
+                 latency_ms: float = 0, jitter_ms: float = 0, failure_rate: float = 0, seed: int = None):
+        self.udid = udid
+        self.scenario = scenario
+        self.platform_version = platform_version
+        self.props = dict(scenario.device_props)
+        self.props.setdefault('ro.product.model', model or f"Virtual {udid}")
+        if model:
+            self.props['ro.product.model'] = model
+        self.props['ro.build.version.release'] = platform_version
+        self.props['ro.serialno'] = udid
+
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+        self.lock = threading.RLock()
+        self.settings: Dict[str, str] = {}
+        self._stacks: Dict[str, List[Tuple[str, ET.Element]]] = {}
+        self._foreground: Optional[str] = None
+        self._elements: Dict[str, ET.Element] = {}
+        self._screenshot: Optional[bytes] = None
+        launcher = scenario.launcher
+        self._launcher = [(launcher, copy.deepcopy(scenario.screens[launcher]['template']))]
+
+    # ========== 延迟与失败注入 ==========
+
+    def simulate_latency(self):
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(delay, 0) / 1000)
+
+    def should_fail(self) -> bool:
+        return self.failure_rate > 0 and self._random.random() < self.failure_rate
+
+    # ========== 应用与界面 ==========
+
+    def _stack(self) -> List[Tuple[str, ET.Element]]:
+        if self._foreground is None or not self._stacks.get(self._foreground):
+            # 没有前台应用时显示桌面
+            self._foreground = None
+            return self._launcher
+        return self._stacks[self._foreground]
+
+    @property
+    def current_screen(self) -> str:
+        with self.lock:
+            return self._stack()[-1][0]
+
+    @property
+    def current_root(self) -> ET.Element:
+        return self._stack()[-1][1]
+
+    def current_package(self) -> str:
+        with self.lock:
+            return self.scenario.screens[self.current_screen]['package']
+
+    def current_activity(self) -> str:
+        with self.lock:
+            return self.scenario.screens[self.current_screen]['activity']
+
+    def _push(self, screen: str):
+        template = self.scenario.screens[screen]['template']
+        self._stack().append((screen, copy.deepcopy(template)))
+        self._elements.clear()
+
+    def is_running(self, package: str) -> bool:
+        with self.lock:
+            return package in self._stacks
+
+    def activate_app(self, package: str):
+        """启动或切回应用"""
+        with self.lock:
+            if package not in self.scenario.apps:
+                raise ValueError(f"应用 {package} 未安装")
+            if package not in self._stacks:
+                start = self.scenario.apps[package]['start_screen']
+                self._stacks[package] = [(start, copy.deepcopy(self.scenario.screens[start]['template']))]
+            self._foreground = package
+            self._elements.clear()
+
+    def terminate_app(self, package: str) -> bool:
+        """结束应用（等同 am force-stop）"""
+        with self.lock:
+            running = self._stacks.pop(package, None) is not None
+            if self._foreground == package:
+                self._foreground = None
+                self._elements.clear()
+            return running
+
+    def back(self):
+        with self.lock:
+            stack = self._stack()
+            if len(stack) > 1:
+                stack.pop()
+            elif self._foreground is not None:
+                self._foreground = None
+            self._elements.clear()
+
+    def page_source(self) -> str:
+        with self.lock:
+            return to_source(self.current_root)
+
+    # ========== 元素 ==========
+
+    def _register(self, element: ET.Element) -> str:
+        for element_id, registered in self._elements.items():
+            if registered is element:
+                return element_id
+        element_id = uuid.uuid4().hex
+        self._elements[element_id] = element
+        return element_id
+
+    def find(self, by: str, value: str, parent_id: str = None) -> List[str]:
+        """查找元素并返回元素 ID 列表"""
+        with self.lock:
+            root = self.get_element(parent_id) if parent_id else self.current_root
+            return [self._register(e) for e in find_all(root, by, value)]
+
+    def get_element(self, element_id: str) -> ET.Element:
+        with self.lock:
+            element = self._elements.get(element_id)
+            if element is None or not self._attached(element):
+                raise StaleElement(element_id)
+            return element
+
+    def _attached(self, element: ET.Element) -> bool:
+        return any(e is element for e in self.current_root.iter())
+
+    def element_rect(self, element_id: str) -> Dict[str, int]:
+        bounds = parse_bounds(self.get_element(element_id).get('bounds')) or (0, 0, 0, 0)
+        return {'x': bounds[0], 'y': bounds[1], 'width': bounds[2] - bounds[0], 'height': bounds[3] - bounds[1]}
+
+    # ========== 交互 ==========
+
+    def click(self, element_id: str):
+        with self.lock:
+            self._apply_click(self.get_element(element_id))
+
+    def tap(self, x: int, y: int):
+        with self.lock:
+            element = element_at(self.current_root, x, y)
+            if element is not None:
+                self._apply_click(element)
+
+    def set_text(self, element_id: str, text: str):
+        with self.lock:
+            self.get_element(element_id).set('text', text)
+
+    def _ancestors(self, element: ET.Element) -> List[ET.Element]:
+        parents = {child: parent for parent in self.current_root.iter() for child in parent}
+        chain = [element]
+        while chain[-1] in parents:
+            chain.append(parents[chain[-1]])
+        return chain
+
+    def _apply_click(self, element: ET.Element):
+        """执行场景中与被点击元素（或其祖先）匹配的第一条状态转换"""
+        screen = self.current_screen
+        chain = self._ancestors(element)
+        for transition in self.scenario.transitions:
+            if transition['screen'] != screen:
+                continue
+            targets = find_all(self.current_root, *transition['locator'])
+            target = next((e for e in chain if any(e is t for t in targets)), None)
+            if target is None:
+                continue
+
+            if transition.get('toggle'):
+                attr = transition['toggle']
+                target.set(attr, 'false' if target.get(attr) == 'true' else 'true')
+            if transition.get('remove'):
+                parents = {child: parent for parent in self.current_root.iter() for child in parent}
+                if target in parents:
+                    parents[target].remove(target)
+            if transition.get('goto'):
+                self._push(transition['goto'])
+            if transition.get('back'):
+                self.back()
+            return
+
+    # ========== 截图 ==========
+
+    def screenshot_png(self) -> bytes:
+        """纯色截图（按屏幕尺寸生成一次后缓存）"""
+        if self._screenshot is None:
+            self._screenshot = solid_png(self.scenario.width, self.scenario.height, (240, 240, 240))
+        return self._screenshot
+
+
+def solid_png(width: int, height: int, rgb: Tuple[int, int, int]) -> bytes:
+    """生成纯色 PNG"""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    row = b"\x00" + bytes(rgb) * width
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(row * height, 6)) + chunk(b"IEND", b""))
@@ -0,0 +1,431 @@
+# simulator/w3c_server.py
+"""
+W3C WebDriver / Appium 协议的本地替身服务
+
+按会话能力中的 udid 路由到虚拟设备，覆盖框架实际使用的命令：
+会话、page source、查找元素、点击、属性/文本、输入、截图、W3C actions、
+当前 Activity/包名、应用启动/结束以及常用 mobile: 扩展。
+"""
+import base64
+import json
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ai_mate_tests.simulator.virtual_device import StaleElement, VirtualDevice
+from ai_mate_tests.utils.hierarchy import get_attribute
+
+ELEMENT_KEY = VirtualDevice.ELEMENT_KEY
+
+
+class W3CError(Exception):
+    """以 W3C 错误格式返回的异常"""
+
+    def __init__(self, status: int, error: str, message: str = ""):
+        super().__init__(message or error)
+        self.status = status
+        self.error = error
+        self.message = message or error
+
+
+def _element_ref(element_id: str) -> Dict[str, str]:
+    return {ELEMENT_KEY: element_id, "ELEMENT": element_id}
+
+
+class Session:
+    def __init__(self, session_id: str, device: VirtualDevice, capabilities: Dict):
+        self.session_id = session_id
+        self.device = device
+        self.capabilities = capabilities
+        self.implicit_wait_ms = 0
+
+
+class CommandStats:
+    """按命令统计调用次数与服务端耗时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.total_time: Dict[str, float] = defaultdict(float)
+
+    def record(self, command: str, elapsed: float):
+        with self._lock:
+            self.counts[command] += 1
+            self.total_time[command] += elapsed
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: {'count': self.counts[name], 'total_time': self.total_time[name]}
+                    for name in self.counts}
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+            self.total_time.clear()
+
+
+class W3CSimulator:
+    """虚拟设备集合 + 会话管理，与 HTTP 层解耦"""
+
+    def __init__(self, devices: Dict[str, VirtualDevice]):
+        self.devices = devices
+        self.sessions: Dict[str, Session] = {}
+        self.stats = CommandStats()
+        self._lock = threading.Lock()
+        self._routes: List[Tuple[str, re.Pattern, Callable]] = []
+        self._register_routes()
+
+    # ========== 路由 ==========
+
+    def _route(self, method: str, pattern: str, handler: Callable):
+        regex = re.compile("^" + pattern.replace("{sid}", "(?P<sid>[^/]+)").replace("{eid}", "(?P<eid>[^/]+)")
+                           .replace("{name}", "(?P<name>[^/]+)") + "/?$")
+        self._routes.append((method, regex, handler))
+
+    def _register_routes(self):
+        r = self._route
+        r("GET", "/status", self.status)
+        r("POST", "/session", self.new_session)
+        r("DELETE", "/session/{sid}", self.delete_session)
+        r("GET", "/session/{sid}/timeouts", self.get_timeouts)
+        r("POST", "/session/{sid}/timeouts", self.set_timeouts)
+        r("GET", "/session/{sid}/source", self.source)
+        r("GET", "/session/{sid}/screenshot", self.screenshot)
+        r("GET", "/session/{sid}/window/rect", self.window_rect)
+        r("GET", "/session/{sid}/window/current/size", self.window_rect)
+        r("POST", "/session/{sid}/back", self.back)
+        r("POST", "/session/{sid}/element", self.find_element)
+        r("POST", "/session/{sid}/elements", self.find_elements)
+        r("POST", "/session/{sid}/element/{eid}/element", self.find_element)
+        r("POST", "/session/{sid}/element/{eid}/elements", self.find_elements)
+        r("POST", "/session/{sid}/element/{eid}/click", self.click)
+        r("POST", "/session/{sid}/element/{eid}/clear", self.clear)
+        r("POST", "/session/{sid}/element/{eid}/value", self.send_keys)
+        r("GET", "/session/{sid}/element/{eid}/text", self.text)
+        r("GET", "/session/{sid}/element/{eid}/attribute/{name}", self.attribute)
+        r("GET", "/session/{sid}/element/{eid}/displayed", self.displayed)
+        r("GET", "/session/{sid}/element/{eid}/enabled", self.enabled)
+        r("GET", "/session/{sid}/element/{eid}/selected", self.selected)
+        r("GET", "/session/{sid}/element/{eid}/rect", self.rect)
+        r("GET", "/session/{sid}/element/{eid}/name", self.tag_name)
+        r("GET", "/session/{sid}/element/{eid}/screenshot", self.screenshot)
+        r("POST", "/session/{sid}/actions", self.perform_actions)
+        r("DELETE", "/session/{sid}/actions", self.release_actions)
+        r("POST", "/session/{sid}/execute/sync", self.execute_script)
+        r("GET", "/session/{sid}/appium/device/current_activity", self.current_activity)
+        r("GET", "/session/{sid}/appium/device/current_package", self.current_package)
+        r("POST", "/session/{sid}/appium/device/activate_app", self.activate_app)
+        r("POST", "/session/{sid}/appium/device/terminate_app", self.terminate_app)
+        r("POST", "/session/{sid}/appium/device/app_state", self.app_state)
+
+    def dispatch(self, method: str, path: str, body: Dict):
+        """执行一条命令，返回 (HTTP 状态码, 响应 JSON)"""
+        for route_method, regex, handler in self._routes:
+            if route_method != method:
+                continue
+            match = regex.match(path)
+            if not match:
+                continue
+
+            params = match.groupdict()
+            session = None
+            if 'sid' in params:
+                session = self.sessions.get(params['sid'])
+                if session is None:
+                    raise W3CError(404, "invalid session id", f"会话不存在: {params['sid']}")
+                session.device.simulate_latency()
+                if method != "DELETE" and session.device.should_fail():
+                    raise W3CError(500, "unknown error", "模拟的随机失败")
+
+            start = time.perf_counter()
+            try:
+                value = handler(session, params, body) if session else handler(params, body)
+            except StaleElement as e:
+                raise W3CError(404, "stale element reference", f"元素已失效: {e}")
+            finally:
+                self.stats.record(handler.__name__, time.perf_counter() - start)
+            return 200, {"value": value}
+
+        raise W3CError(404, "unknown command", f"不支持的命令: {method} {path}")
+
+    # ========== 会话 ==========
+
+    def status(self, params, body):
+        return {"ready": True, "message": "ai_mate simulator"}
+
+    def new_session(self, params, body):
+        capabilities = dict(body.get('capabilities', {}).get('alwaysMatch', {}))
+        for first_match in body.get('capabilities', {}).get('firstMatch', [{}])[:1]:
+            capabilities.update(first_match)
+        # 去掉 appium: 前缀
+        caps = {key.split(':', 1)[-1]: value for key, value in capabilities.items()}
+
+        udid = caps.get('udid')
+        device = self.devices.get(udid)
+        if device is None:
+            raise W3CError(500, "session not created", f"没有 UDID 为 {udid} 的虚拟设备")
+
+        device.simulate_latency()
+        package = caps.get('appPackage')
+        if package:
+            device.activate_app(package)
+
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[session_id] = Session(session_id, device, caps)
+        return {"sessionId": session_id, "capabilities": {**caps, "platformName": caps.get('platformName', 'Android')}}
+
+    def delete_session(self, session, params, body):
+        with self._lock:
+            self.sessions.pop(session.session_id, None)
+        return None
+
+    def get_timeouts(self, session, params, body):
+        return {"implicit": session.implicit_wait_ms, "pageLoad": 300000, "script": 30000}
+
+    def set_timeouts(self, session, params, body):
+        # 层级在两条命令之间不会变化，隐式等待不会改变查找结果，因此只记录不等待
+        if 'implicit' in body:
+            session.implicit_wait_ms = body['implicit']
+        return None
+
+    # ========== 页面 ==========
+
+    def source(self, session, params, body):
+        return session.device.page_source()
+
+    def screenshot(self, session, params, body):
+        return base64.b64encode(session.device.screenshot_png()).decode('ascii')
+
+    def window_rect(self, session, params, body):
+        scenario = session.device.scenario
+        return {"x": 0, "y": 0, "width": scenario.width, "height": scenario.height}
+
+    def back(self, session, params, body):
+        session.device.back()
+        return None
+
+    # ========== 元素 ==========
+
+    def find_element(self, session, params, body):
+        ids = self._find(session, params, body)
+        if not ids:
+            raise W3CError(404, "no such element", f"未找到元素: {body.get('using')}={body.get('value')}")
+        return _element_ref(ids[0])
+
+    def find_elements(self, session, params, body):
+        return [_element_ref(element_id) for element_id in self._find(session, params, body)]
+
+    @staticmethod
+    def _find(session, params, body) -> List[str]:
+        using, value = body.get('using'), body.get('value')
+        if using == 'css selector':
+            # Selenium 把 By.ID / By.NAME / By.CLASS_NAME 转换成 CSS 选择器
+            match = re.fullmatch(r'\[(id|name)="(.*)"\]', value or "")
+            if match:
+                using, value = ('id' if match.group(1) == 'id' else 'accessibility id'), match.group(2)
+            elif value and value.startswith('.'):
+                using, value = 'class name', value[1:].replace('\\.', '.')
+        try:
+            return session.device.find(using, value, params.get('eid'))
+        except ValueError as e:
+            raise W3CError(400, "invalid selector", str(e))
+
+    def click(self, session, params, body):
+        session.device.click(params['eid'])
+        return None
+
+    def clear(self, session, params, body):
+        session.device.set_text(params['eid'], "")
+        return None
+
+    def send_keys(self, session, params, body):
+        text = body.get('text') or "".join(body.get('value', []))
+        element = session.device.get_element(params['eid'])
+        session.device.set_text(params['eid'], (element.get('text') or "") + text)
+        return None
+
+    def text(self, session, params, body):
+        return session.device.get_element(params['eid']).get('text') or ""
+
+    def attribute(self, session, params, body):
+        return get_attribute(session.device.get_element(params['eid']), params['name'])
+
+    def displayed(self, session, params, body):
+        session.device.get_element(params['eid'])
+        return True
+
+    def enabled(self, session, params, body):
+        return session.device.get_element(params['eid']).get('enabled') == 'true'
+
+    def selected(self, session, params, body):
+        return session.device.get_element(params['eid']).get('selected') == 'true'
+
+    def rect(self, session, params, body):
+        return session.device.element_rect(params['eid'])
+
+    def tag_name(self, session, params, body):
+        return session.device.get_element(params['eid']).tag
+
+    # ========== 手势 ==========
+
+    def perform_actions(self, session, params, body):
+        """执行 W3C actions：按时间片解析指针序列，pointerDown/Up 位置相同（或移动很小）视为点击"""
+        for source in body.get('actions', []):
+            if source.get('type') != 'pointer':
+                continue
+            x = y = 0
+            down_at: Optional[Tuple[int, int]] = None
+            for action in source.get('actions', []):
+                kind = action.get('type')
+                if kind == 'pointerMove':
+                    origin = action.get('origin', 'viewport')
+                    if isinstance(origin, dict):
+                        rect = session.device.element_rect(origin.get(ELEMENT_KEY) or origin.get('ELEMENT'))
+                        x = rect['x'] + rect['width'] // 2 + int(action.get('x', 0))
+                        y = rect['y'] + rect['height'] // 2 + int(action.get('y', 0))
+                    elif origin == 'pointer':
+                        x += int(action.get('x', 0))
+                        y += int(action.get('y', 0))
+                    else:
+                        x, y = int(action.get('x', 0)), int(action.get('y', 0))
+                elif kind == 'pointerDown':
+                    down_at = (x, y)
+                elif kind == 'pointerUp' and down_at is not None:
+                    if abs(x - down_at[0]) <= 10 and abs(y - down_at[1]) <= 10:
+                        session.device.tap(x, y)
+                    down_at = None
+        return None
+
+    def release_actions(self, session, params, body):
+        return None
+
+    # ========== 应用 ==========
+
+    def current_activity(self, session, params, body):
+        return session.device.current_activity()
+
+    def current_package(self, session, params, body):
+        return session.device.current_package()
+
+    def activate_app(self, session, params, body):
+        session.device.activate_app(body.get('appId') or body.get('bundleId'))
+        return None
+
+    def terminate_app(self, session, params, body):
+        return session.device.terminate_app(body.get('appId') or body.get('bundleId'))
+
+    def app_state(self, session, params, body):
+        package = body.get('appId') or body.get('bundleId')
+        if not session.device.is_running(package):
+            return 1
+        return 4 if session.device.current_package() == package else 3
+
+    def execute_script(self, session, params, body):
+        """常用 mobile: 扩展"""
+        script = body.get('script', '')
+        args = (body.get('args') or [{}])[0] or {}
+        device = session.device
+
+        if script == 'mobile: activateApp':
+            return self.activate_app(session, params, args)
+        if script == 'mobile: terminateApp':
+            return self.terminate_app(session, params, args)
+        if script == 'mobile: queryAppState':
+            return self.app_state(session, params, args)
+        if script == 'mobile: getCurrentActivity':
+            return device.current_activity()
+        if script == 'mobile: getCurrentPackage':
+            return device.current_package()
+        if script == 'mobile: changePermissions':
+            return None
+        if script == 'mobile: clickGesture':
+            if args.get('elementId'):
+                device.click(args['elementId'])
+            else:
+                device.tap(int(args.get('x', 0)), int(args.get('y', 0)))
+            return None
+        if script == 'mobile: pressKey' and int(args.get('keycode', 0)) == 4:
+            device.back()
+            return None
+        if script == 'mobile: shell':
+            from ai_mate_tests.simulator.adb_server import run_shell
+            command = " ".join([args.get('command', '')] + [str(a) for a in args.get('args', [])])
+            return run_shell(device, command).output
+        raise W3CError(405, "unknown method", f"不支持的脚本: {script}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体分两次写出：不关闭 Nagle 时与客户端的延迟 ACK 叠加，每条命令多出约 40ms
+    disable_nagle_algorithm = True
+    simulator: W3CSimulator = None
+    base_path = ""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self, method: str):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            body = {}
+
+        path = self.path.split('?', 1)[0]
+        if self.base_path and path.startswith(self.base_path):
+            path = path[len(self.base_path):] or "/"
+
+        try:
+            status, payload = self.simulator.dispatch(method, path, body)
+        except W3CError as e:
+            status, payload = e.status, {"value": {"error": e.error, "message": e.message, "stacktrace": ""}}
+        except Exception as e:
+            status, payload = 500, {"value": {"error": "unknown error", "message": str(e), "stacktrace": ""}}
+
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+class W3CServer:
+    """在后台线程中运行的 HTTP 服务"""
+
+    def __init__(self, simulator: W3CSimulator, host: str = "127.0.0.1", port: int = 0,
+                 base_path: str = "/wd/hub"):
+        handler = type("SimulatorHandler", (_Handler,), {"simulator": simulator, "base_path": base_path})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.base_path = base_path
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{self.base_path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="w3c-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,88 @@
+"""AdbShellChannel：用本地 sh 充当设备端 shell 的假 adb"""
+import os
+import stat
+
+import pytest
+
+from ai_mate_tests.utils.adb_channel import AdbChannelError, AdbShellChannel
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="假 adb 为 sh 脚本")
+
+# 每启动一次会话在计数文件中追加一行，忽略 -s <udid> shell -T 参数
+STUB_ADB = """#!/bin/sh
+echo spawn >> "{spawns}"
+exec sh
+"""
+
+
+@pytest.fixture
+def spawns(tmp_path):
+    return tmp_path / "spawns"
+
+
+@pytest.fixture
+def channel(tmp_path, spawns):
+    adb = tmp_path / "adb"
+    adb.write_text(STUB_ADB.format(spawns=spawns))
+    adb.chmod(adb.stat().st_mode | stat.S_IXUSR)
+    channel = AdbShellChannel("stub-device", adb_path=str(adb), timeout=5)
+    yield channel
+    channel.close()
+
+
+def spawn_count(spawns) -> int:
+    return len(spawns.read_text().splitlines()) if spawns.exists() else 0
+
+
+def test_output_framing(channel):
+    # 输出原样返回（不含为标记补充的换行）
+    assert channel.run("echo hello").output == "hello\n"
+    assert channel.run("printf 'a\\nb\\n'").output == "a\nb\n"
+    # 输出末尾没有换行时标记仍独占一行
+    assert channel.run("printf abc").output == "abc"
+    assert channel.run("true").output == ""
+    # 输出中包含标记前缀也不会提前结束
+    assert channel.run("echo __AIMATE_; printf done").output == "__AIMATE_\ndone"
+
+
+def test_exit_codes(channel):
+    assert channel.run("true").exit_code == 0
+    assert channel.run("false").exit_code == 1
+    assert channel.run("sh -c 'exit 7'").exit_code == 7
+    result = channel.run("printf partial; sh -c 'exit 3'")
+    assert result == (3, "partial")
+
+
+def test_commands_reuse_one_session(channel, spawns):
+    for i in range(5):
+        assert channel.run(f"printf {i}").output == str(i)
+    assert spawn_count(spawns) == 1
+
+
+def test_respawn_after_session_killed(channel, spawns):
+    channel.run("echo first")
+    channel._process.kill()
+    channel._process.wait()
+
+    assert channel.run("printf again").output == "again"
+    assert spawn_count(spawns) == 2
+
+
+def test_session_death_during_command(channel, spawns):
+    # 命令本身结束会话：重连重试一次后仍然断开，报告通道错误
+    with pytest.raises(AdbChannelError):
+        channel.run("exit")
+    assert spawn_count(spawns) == 2
+
+    # 下一条命令自动重连
+    assert channel.run("printf back").output == "back"
+    assert spawn_count(spawns) == 3
+
+
+def test_timeout_closes_session(channel, spawns):
+    with pytest.raises(TimeoutError):
+        channel.run("sleep 5", timeout=0.3)
+    assert not channel.connected
+
+    assert channel.run("printf ok").output == "ok"
+    assert spawn_count(spawns) == 2
@@ -0,0 +1,135 @@
+"""AdbClient 与模拟器 adb server（simulator/adb_server.py）之间的协议"""
+import socket
+import threading
+
+import pytest
+
+from ai_mate_tests.simulator.adb_server import ADB_SERVER_VERSION, AdbServer
+from ai_mate_tests.simulator.virtual_device import Scenario, VirtualDevice
+from ai_mate_tests.utils.adb_client import AdbClient, AdbProtocolError, AdbServerShell, DeviceEvent
+
+SERIALS = ["SIM-0001", "SIM-0002"]
+
+
+@pytest.fixture(scope="module")
+def server():
+    scenario = Scenario()
+    server = AdbServer({serial: VirtualDevice(serial, scenario) for serial in SERIALS}).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(server):
+    return AdbClient(port=server.port, timeout=5)
+
+
+def reply_once(response: bytes) -> int:
+    """只回复一次固定字节然后断开的服务端，返回端口"""
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def serve():
+        conn, _ = listener.accept()
+        with conn, listener:
+            conn.recv(1024)
+            conn.sendall(response)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+# ---------- 帧格式 ----------
+
+def test_version_is_length_prefixed_hex(client):
+    assert client.version() == ADB_SERVER_VERSION
+    assert client.is_available()
+
+
+def test_devices(client):
+    assert client.devices() == [(serial, "device") for serial in SERIALS]
+
+
+def test_fail_carries_length_prefixed_message(client):
+    with pytest.raises(AdbProtocolError, match="unknown host service: host:bogus"):
+        with client._connect() as sock:
+            client._request(sock, "host:bogus")
+
+
+def test_unknown_status():
+    client = AdbClient(port=reply_once(b"WHAT"), timeout=2)
+    with pytest.raises(AdbProtocolError, match="未知状态"):
+        client.version()
+
+
+def test_truncated_reply():
+    client = AdbClient(port=reply_once(b"OKAY0010abc"), timeout=2)
+    with pytest.raises(AdbProtocolError, match="连接提前关闭"):
+        client.version()
+
+
+def test_unavailable_server():
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    assert not AdbClient(port=port, timeout=1).is_available()
+
+
+# ---------- host:transport ----------
+
+def test_transport_to_unknown_device(client):
+    with pytest.raises(AdbProtocolError, match="device 'NOPE' not found"):
+        client.shell("NOPE", "echo hi")
+
+
+def test_shell_and_run(client):
+    assert client.shell(SERIALS[0], "getprop ro.serialno").strip() == SERIALS[0]
+    # 每台设备各自的 transport
+    assert client.run(SERIALS[1], "getprop ro.serialno") == (0, SERIALS[1] + "\n")
+
+
+def test_run_exit_codes(client):
+    assert client.run(SERIALS[0], "true").exit_code == 0
+    result = client.run(SERIALS[0], "no_such_command")
+    assert result.exit_code == 127
+    assert "not found" in result.output
+    # grep 没有匹配时退出码为 1
+    assert client.run(SERIALS[0], "getprop | grep no-such-prop").exit_code == 1
+
+
+def test_exec_out_is_binary(client):
+    assert client.exec_out(SERIALS[0], "screencap -p").startswith(b"\x89PNG")
+
+
+def test_server_shell_backend(server):
+    shell = AdbServerShell(SERIALS[0], AdbClient(port=server.port))
+    assert shell.run("echo hi") == (0, "hi\n")
+
+
+# ---------- host:track-devices ----------
+
+def test_track_devices_pushes_current_list(client):
+    tracker = client.track_devices()
+    try:
+        assert next(tracker) == [(serial, "device") for serial in SERIALS]
+    finally:
+        tracker.close()
+
+
+def test_track_device_events(client):
+    events = client.track_device_events()
+    try:
+        assert [next(events) for _ in SERIALS] == [DeviceEvent("added", serial, "device") for serial in SERIALS]
+    finally:
+        events.close()
+
+
+# ---------- 模拟器 shell ----------
+
+@pytest.mark.parametrize("command, output", [
+    ("dumpsys package com.transsion.xsound | grep -m 1 versionCode", "    versionCode=1020300 minSdk=24 targetSdk=35"),
+    ("dumpsys package com.transsion.xsound | grep -m1 -e versionName", "    versionName=1.2.3"),
+    ("pm list packages | grep -iF APPIUM.SETTINGS", "package:io.appium.settings"),
+    ("pm list packages appium | grep -v -m 1 server", "package:io.appium.settings"),
+])
+def test_simulator_grep_options(client, command, output):
+    assert client.run(SERIALS[0], command) == (0, output + "\n")
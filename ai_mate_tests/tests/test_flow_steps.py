@@ -0,0 +1,81 @@
+"""flow_steps：同一份流程步骤由同步和协程页面对象执行"""
+import asyncio
+
+import pytest
+
+from ai_mate_tests.pages.flow_steps import run_steps, run_steps_async
+
+
+class SyncPage:
+    def __init__(self, connected=True):
+        self.connected = connected
+        self.calls = []
+
+    def toggle(self, enable):
+        self.calls.append(("toggle", enable))
+
+    def is_connected(self):
+        self.calls.append(("is_connected",))
+        return self.connected
+
+    def fail(self):
+        raise TimeoutError("未找到元素")
+
+
+class AsyncPage(SyncPage):
+    async def toggle(self, enable):
+        await asyncio.sleep(0)
+        SyncPage.toggle(self, enable)
+
+    async def is_connected(self):
+        await asyncio.sleep(0)
+        return SyncPage.is_connected(self)
+
+    async def fail(self):
+        await asyncio.sleep(0)
+        SyncPage.fail(self)
+
+
+def cycle_steps(page):
+    yield page.toggle(True)
+    if not (yield page.is_connected()):
+        raise AssertionError("设备未连接")
+    yield page.toggle(False)
+    return "ok"
+
+
+def recovering_steps(page):
+    try:
+        yield page.fail()
+    except TimeoutError as e:
+        return f"已处理: {e}"
+
+
+def test_sync_and_async_run_the_same_steps():
+    sync_page, async_page = SyncPage(), AsyncPage()
+    assert run_steps(cycle_steps(sync_page)) == "ok"
+    assert asyncio.run(run_steps_async(cycle_steps(async_page))) == "ok"
+    assert sync_page.calls == async_page.calls == [("toggle", True), ("is_connected",), ("toggle", False)]
+
+
+def test_step_result_is_sent_back():
+    with pytest.raises(AssertionError, match="设备未连接"):
+        run_steps(cycle_steps(SyncPage(connected=False)))
+    page = AsyncPage(connected=False)
+    with pytest.raises(AssertionError, match="设备未连接"):
+        asyncio.run(run_steps_async(cycle_steps(page)))
+    assert page.calls == [("toggle", True), ("is_connected",)]
+
+
+def test_async_step_error_is_raised_inside_the_steps():
+    # 同步步骤的异常本来就在生成器内抛出；协程步骤的异常由 run_steps_async 抛回生成器，可以在步骤中处理
+    assert run_steps(recovering_steps(SyncPage())) == "已处理: 未找到元素"
+    assert asyncio.run(run_steps_async(recovering_steps(AsyncPage()))) == "已处理: 未找到元素"
+
+
+def test_unhandled_async_step_error_propagates():
+    def steps(page):
+        yield page.fail()
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(run_steps_async(steps(AsyncPage())))
@@ -0,0 +1,93 @@
+"""VisualMatcher：NumPy 生成的截图和模板"""
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai_mate_tests.utils.visual_match import VisualMatcher, ncc_map  # noqa: E402
+
+
+def textured(height, width, seed):
+    """4x4 像素块的随机纹理（缩小到金字塔上层后仍有细节）"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, size=(height // 4 + 1, width // 4 + 1)).astype(np.float32)
+    return np.kron(blocks, np.ones((4, 4), dtype=np.float32))[:height, :width]
+
+
+@pytest.fixture
+def screen():
+    return textured(480, 320, seed=1)
+
+
+@pytest.fixture
+def matcher():
+    return VisualMatcher(threshold=0.9)
+
+
+def test_exact_match_location(screen, matcher):
+    # 奇数坐标，验证逐级细化回到原始分辨率的精确位置
+    template = screen[157:221, 93:189].copy()
+    result = matcher.match(screen, template)
+    assert result.found
+    assert (result.x, result.y, result.width, result.height) == (93, 157, 96, 64)
+    assert result.confidence == pytest.approx(1.0, abs=1e-3)
+    assert result.center == (141, 189)
+
+
+def test_png_screenshot(screen, matcher):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.fromarray(screen.astype(np.uint8)).save(buffer, format="PNG")
+
+    result = matcher.match(buffer.getvalue(), screen[40:104, 200:296].copy())
+    assert result.found and (result.x, result.y) == (200, 40)
+
+
+def test_region_limits_search(screen, matcher):
+    template = screen[20:84, 20:116].copy()
+    # 同一图案在下半屏再出现一次
+    screen[300:364, 180:276] = template
+
+    anywhere = matcher.match(screen, template)
+    assert (anywhere.x, anywhere.y) in {(20, 20), (180, 300)}
+
+    lower = matcher.match(screen, template, region=(0, 240, 320, 240))
+    assert lower.found and (lower.x, lower.y) == (180, 300)  # 坐标换算回整幅截图
+
+    # 全部不大于 1 的小数为比例
+    upper = matcher.match(screen, template, region=(0.0, 0.0, 1.0, 0.5))
+    assert upper.found and (upper.x, upper.y) == (20, 20)
+
+
+def test_template_larger_than_region(screen, matcher):
+    result = matcher.match(screen, screen[0:64, 0:96].copy(), region=(0, 0, 50, 50))
+    assert not result.found
+
+
+def test_no_match_below_threshold(screen, matcher):
+    other = textured(64, 96, seed=2)
+    result = matcher.match(screen, other)
+    assert not result.found
+    assert result.confidence < 0.9
+    # 阈值可以按次覆盖
+    assert matcher.match(screen, other, threshold=-1).found
+
+
+def test_flat_windows_score_zero(matcher):
+    # 左半纯色、右半纹理：纯色窗口不产生 NaN/inf，相关系数记为 0
+    screen = np.full((200, 200), 128, dtype=np.float32)
+    screen[:, 100:] = textured(200, 100, seed=3)
+    template = screen[60:100, 130:170].copy()
+
+    scores = ncc_map(screen, template)
+    assert np.isfinite(scores).all()
+    assert (scores[:, :60] == 0).all()
+
+    result = matcher.match(screen, template)
+    assert result.found and (result.x, result.y) == (130, 60)
+
+
+def test_flat_template_rejected(matcher):
+    with pytest.raises(ValueError, match="纯色"):
+        matcher.match(np.zeros((100, 100), dtype=np.float32), np.full((20, 20), 7, dtype=np.float32))
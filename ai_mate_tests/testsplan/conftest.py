@@ -1,22 +1,64 @@
 
+import os
+
 import pytest
 import allure
-import time
 
-from ai_mate_tests.utils.parallel_driver_manager import ParallelDriverManager
+from concurrent.futures import ThreadPoolExecutor
+
+_parallel_driver_manager = None
+
+
+def get_parallel_driver_manager():
+    """延迟创建驱动管理器：只收集或全部跳过用例时不加载配置和 Appium"""
+    global _parallel_driver_manager
+    if _parallel_driver_manager is None:
+        from ai_mate_tests.utils.parallel_driver_manager import ParallelDriverManager
+        _parallel_driver_manager = ParallelDriverManager()
+    return _parallel_driver_manager
 
-parallel_driver_manager = ParallelDriverManager()
 
 def pytest_configure(config):
     """pytest 配置 - xdist 支持"""
     if hasattr(config, 'workerinput'):
         print(f"🚀 xdist worker {config.workerinput['workerid']} 启动")
+    if config.getoption("--watch-config"):
+        # 通过环境变量传给 xdist worker，各进程的 ConfigLoader 首次创建时开始监听
+        os.environ["AI_MATE_CONFIG_WATCH"] = "1"
+
+    # 增量选择：上次通过且应用版本、系统版本、相关配置和用例文件都未变化的 (用例, 设备) 跳过
+    from ai_mate_tests.utils.incremental_selection import PLUGIN_NAME, IncrementalSelection
+    config.pluginmanager.register(
+        IncrementalSelection(lambda: get_parallel_driver_manager().driver_factory.config_loader,
+                             force_full_run=config.getoption("--force-full-run")),
+        PLUGIN_NAME)
+
+
+def pytest_sessionstart(session):
+    """
+    设备准备：只在主进程（或未启用 xdist 时）执行一次，所有设备并行；
+    worker 创建会话时读取状态文件，跳过 server 安装和设备初始化
+    """
+    config = session.config
+    if hasattr(config, 'workerinput') or config.option.collectonly or config.getoption("--skip-device-prep"):
+        return
+
+    from ai_mate_tests.utils.device_prep import DevicePreparer
+
+    manager = get_parallel_driver_manager()
+    connected = {device['device_id'] for device in manager.detect_connected_devices()}
+    config_loader = manager.driver_factory.config_loader
+    device_names = [name for name in config_loader.get_all_devices()
+                    if config_loader.get_device_config(name).get('udid') in connected]
+    if device_names:
+        print(f"🛠️ 准备 {len(device_names)} 台设备...")
+        DevicePreparer(config_loader).prepare_all(device_names)
 
 @pytest.fixture(scope="function")
 def device_manager():
     """设备管理器 - 智能识别设备"""
     # 自动检测设备
-    detected_devices = parallel_driver_manager.detect_connected_devices()
+    detected_devices = get_parallel_driver_manager().detect_connected_devices()
     if detected_devices:
         print(f"🔍 检测到 {len(detected_devices)} 台设备:")
         for device in detected_devices:
@@ -29,17 +71,25 @@ def device_manager():
 def parallel_drivers(request, device_manager):
     """完整测试专用驱动 - 多设备"""
     print("🔄 准备完整测试设备...")
+    parallel_driver_manager = get_parallel_driver_manager()
 
     # 获取应用类型
     marker = request.node.get_closest_marker("app_type")
     app_type = marker.args[0] if marker else "settings"
 
-    # 清理所有驱动（完整测试需要干净环境）
+    # 清理所有驱动（完整测试需要干净环境），创建驱动时会等待应用进程退出
     parallel_driver_manager.quit_all_drivers()
-    time.sleep(1)
+
+    # 增量选择：跳过上次已通过且输入未变化的设备
+    from ai_mate_tests.utils.incremental_selection import PLUGIN_NAME
+    configured = [name for name in (parallel_driver_manager.find_device_by_udid(device['device_id'])
+                                    for device in device_manager['detected_devices']) if name]
+    up_to_date = request.config.pluginmanager.get_plugin(PLUGIN_NAME).up_to_date(request.node, configured)
+    if configured and len(up_to_date) == len(configured):
+        pytest.skip("所有设备上次已通过且输入未变化（--force-full-run 强制执行）")
 
     # 创建所有设备驱动
-    created_devices = parallel_driver_manager.auto_create_drivers(app_type)
+    created_devices = parallel_driver_manager.auto_create_drivers(app_type, exclude=up_to_date)
 
     if not created_devices:
         pytest.skip("❌ 无法创建任何设备驱动")
@@ -52,14 +102,44 @@ def parallel_drivers(request, device_manager):
             drivers[device_name] = driver
             print(f"✅ {device_name} 就绪")
 
-    # 等待稳定
-    time.sleep(2)
+    # 等待界面稳定
+    readiness = parallel_driver_manager.driver_factory.readiness
+    with ThreadPoolExecutor(max_workers=len(drivers)) as executor:
+        list(executor.map(readiness.wait_hierarchy_stable, drivers.values()))
+
+    # 心跳监控：失效会话自动重建，反复失败的设备被隔离
+    parallel_driver_manager.start_health_monitor(list(drivers))
 
     yield drivers
 
-    # 清理所有驱动
+    parallel_driver_manager.stop_health_monitor()
+
+    # 清理所有驱动，释放设备租约给其他 worker
     for device_name in drivers.keys():
         parallel_driver_manager.quit_driver(device_name)
+    parallel_driver_manager.release_leases()
+
+@pytest.fixture(scope="session", autouse=True)
+def metrics_report():
+    """会话结束时写入指标库，与历史运行比较，并把对比结果和趋势图附加到 Allure"""
+    yield
+
+    from ai_mate_tests.utils.metrics_store import flush_metrics
+    store = flush_metrics()
+    if store is None:
+        return
+
+    from ai_mate_tests.utils.metrics_report import compare_runs, format_comparisons, render_trend_svg
+    comparisons = compare_runs(store, store.run_id)
+    if comparisons:
+        report = format_comparisons(comparisons)
+        print(f"📊 指标对比（运行 {store.run_id}）:\n{report}")
+        allure.attach(report, name="指标对比", attachment_type=allure.attachment_type.TEXT)
+        regressions = [c for c in comparisons if c.regression]
+        if regressions:
+            print(f"❌ {len(regressions)} 项指标显著变慢，详见 python -m ai_mate_tests.benchmarks.compare_metrics")
+    allure.attach(render_trend_svg(store), name="指标趋势", attachment_type=allure.attachment_type.SVG)
+
 
 @pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):
@@ -71,6 +151,8 @@ def pytest_runtest_makereport(item, call):
         drivers = item.funcargs['parallel_drivers']
         if report.failed or report.outcome in ("failed", "error"):
             for device_name, driver in drivers.items():
+                # 会话可能已被健康监控重建，按设备名取当前 driver
+                driver = get_parallel_driver_manager().get_driver(device_name) or driver
                 try:
                     screenshot = driver.get_screenshot_as_png()
                     name = f"{device_name}_{report.nodeid.replace(':', '_')}"
@@ -80,4 +162,10 @@ def pytest_runtest_makereport(item, call):
 
 
 def pytest_addoption(parser):
-    parser.addoption("--app-type", action="store", default="settings", help="应用类型: settings 或 ai_mate")
\ No newline at end of file
+    parser.addoption("--app-type", action="store", default="settings", help="应用类型: settings 或 ai_mate")
+    parser.addoption("--skip-device-prep", action="store_true", default=False,
+                     help="跳过运行开始时的设备准备（server 检查、关闭动画、预授权）")
+    parser.addoption("--force-full-run", action="store_true", default=False,
+                     help="不跳过上次已通过且输入未变化的 (用例, 设备) 组合，全部执行")
+    parser.addoption("--watch-config", action="store_true", default=False,
+                     help="运行中修改 config.yaml 时自动热加载（定位器、弹窗坐标等）")
\ No newline at end of file
@@ -1,26 +1,21 @@
 import pytest
 import allure
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from ai_mate_tests.pages.settings_page import SettingsPage
 from ai_mate_tests.pages.popup_page import PopupPage
+from ai_mate_tests.utils.metrics_store import metric_timer
+from ai_mate_tests.utils.result_collector import ResultCollector
 
 
 def _run_single_device_test(driver, device_name):
-    """单设备测试函数"""
-    try:
-        settings = SettingsPage(driver)
-        popup = PopupPage(driver)
+    """单设备测试函数：失败直接抛出，由 ResultCollector 记录"""
+    settings = SettingsPage(driver)
+    popup = PopupPage(driver)
 
+    with metric_timer("flow.bluetooth_stress", device_name):
         popup.handle_interference_popup()
         settings.stress_test_bluetooth(iterations=5)
 
-        print(f"✅ {device_name} - 蓝牙测试通过")
-        return device_name, True, None
-    except Exception as e:
-        print(f"❌ {device_name} - 蓝牙测试失败: {e}")
-        raise RuntimeError(f"{device_name} 测试失败: {e}")
-
 
 @pytest.mark.app_type("settings")
 @pytest.mark.bluetooth_test
@@ -29,30 +24,13 @@ def test_bluetooth_stability(parallel_drivers):
     with allure.step("多设备并行蓝牙稳定性测试"):
         iterations = 5
         print(f"📊 开始蓝牙稳定性测试，每个设备执行 {iterations} 次测试")
-        results = {}
-
-        # 并行执行所有设备测试
-        with ThreadPoolExecutor(max_workers=len(parallel_drivers)) as executor:
-            future_to_device = {
-                executor.submit(_run_single_device_test, driver, device_name): device_name
-                for device_name, driver in parallel_drivers.items()
-            }
-
-            for future in as_completed(future_to_device):
-                device_name, success, error = future.result()
-                results[device_name] = (success, error)
-
-                # 记录到 Allure
-                if success:
-                    allure.attach(f"设备 {device_name} 测试通过", name=f"{device_name}_结果")
-                else:
-                    allure.attach(f"设备 {device_name} 测试失败: {error}", name=f"{device_name}_错误")
-
-        # 汇总结果
-        failed_devices = [name for name, (success, error) in results.items() if not success]
 
-        if failed_devices:
-            pytest.fail(f"部分设备测试失败: {', '.join(failed_devices)}")
+        # 所有设备执行完后再汇总，单台设备失败不影响其他设备的结果
+        collector = ResultCollector("蓝牙测试")
+        collector.run(parallel_drivers, _run_single_device_test)
+        collector.attach_to_allure()
 
+        if collector.failed:
+            pytest.fail(collector.failure_summary())
         else:
             print("🎉 所有设备蓝牙测试通过")
@@ -1,33 +1,44 @@
+import time
+
 import pytest
 import allure
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from ai_mate_tests.pages.device_page import DevicePage
 from ai_mate_tests.pages.popup_page import PopupPage
 from ai_mate_tests.pages.welcome_page import WelcomePage
+from ai_mate_tests.utils.metrics_store import metric_timer
+from ai_mate_tests.utils.popup_interceptor import PopupInterceptor
+from ai_mate_tests.utils.result_collector import ResultCollector
 
 
 def _run_single_pairing_test(driver, device_name):
-    """单设备配对测试函数"""
-    try:
-        welcome = WelcomePage(driver)
-        device = DevicePage(driver)
-        popup = PopupPage(driver)
-
-        popup.handle_interference_popup()
-        welcome.accept_all()
-        popup.handle_interference_popup()
-
-        device.search_device()
-        device.pair_device()
-
-        assert device.is_paired_success(timeout=30), f"{device_name} 配对失败"
-
-        print(f"✅ {device_name} - 配对成功")
-        return device_name, True, None
-    except Exception as e:
-        print(f"❌ {device_name} - 配对失败: {e}")
-        raise RuntimeError(f"{device_name} 测试失败: {e}")
-
+    """单设备配对测试函数：失败直接抛出，由 ResultCollector 记录；返回分段耗时"""
+    welcome = WelcomePage(driver)
+    device = DevicePage(driver)
+    popup = PopupPage(driver)
+    timings = {}
+
+    with metric_timer("flow.pairing", device_name):
+        # 欢迎阶段由后台拦截器处理干扰弹窗，不再在每一步前阻塞等待；
+        # 未配置 popup_dismiss 时拦截器不启动，按原方式在前后各处理一次
+        start = time.monotonic()
+        with PopupInterceptor(driver, welcome.element_manager) as interceptor:
+            if not interceptor.armed:
+                popup.handle_interference_popup()
+            welcome.accept_all()
+            if not interceptor.armed:
+                popup.handle_interference_popup()
+        timings['欢迎流程'] = time.monotonic() - start
+        for dismissal in interceptor.dismissals:
+            print(f"🧹 {device_name} - 关闭弹窗 {dismissal.locator} @({dismissal.x}, {dismissal.y})")
+
+        start = time.monotonic()
+        with metric_timer("pairing", device_name):
+            device.search_device()
+            device.pair_device()
+            assert device.is_paired_success(timeout=30), f"{device_name} 配对失败"
+        timings['配对'] = time.monotonic() - start
+
+    return timings
 
 
 @pytest.mark.app_type("ai_mate")
@@ -35,32 +46,12 @@ def _run_single_pairing_test(driver, device_name):
 def test_device_pairing_multi_device(parallel_drivers):
     """多设备并行配对测试 - xdist 兼容"""
     with allure.step("多设备并行配对测试"):
-        results = {}
-
-        # 并行执行所有设备配对
-        with ThreadPoolExecutor(max_workers=len(parallel_drivers)) as executor:
-            future_to_device = {
-                executor.submit(_run_single_pairing_test, driver, device_name): device_name
-                for device_name, driver in parallel_drivers.items()
-            }
-
-            for future in as_completed(future_to_device):
-                device_name, success, error = future.result()
-                results[device_name] = (success, error)
-
-                # 记录到 Allure
-                if success:
-                    allure.attach(f"设备 {device_name} 配对成功", name=f"{device_name}_结果")
-                else:
-                    allure.attach(f"设备 {device_name} 配对失败: {error}", name=f"{device_name}_错误")
-
-        # 汇总结果
-        failed_devices = [name for name, (success, error) in results.items() if not success]
-
-        if failed_devices:
-            pytest.fail(f"部分设备测试失败: {', '.join(failed_devices)}")
+        # 所有设备执行完后再汇总，单台设备失败不影响其他设备的结果
+        collector = ResultCollector("配对")
+        collector.run(parallel_drivers, _run_single_pairing_test)
+        collector.attach_to_allure()
 
+        if collector.failed:
+            pytest.fail(collector.failure_summary())
         else:
             print("🎉 所有设备配对成功")
-
-
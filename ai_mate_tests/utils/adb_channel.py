@@ -0,0 +1,183 @@
+# utils/adb_channel.py
+import atexit
+import logging
+import os
+import queue
+import subprocess
+import threading
+import uuid
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ShellResult(NamedTuple):
+    """一条 shell 命令的执行结果"""
+    exit_code: int
+    output: str
+
+
+class AdbChannelError(RuntimeError):
+    """adb shell 通道异常"""
+
+
+def get_adb_path() -> str:
+    """adb 可执行文件路径，可通过环境变量 ADB_PATH 指定（便于替换为假的 adb）"""
+    return os.environ.get("ADB_PATH", "adb")
+
+
+class AdbShellChannel:
+    """
+    每台设备一个常驻的 adb shell 会话，命令串行复用同一会话
+
+    每条命令后追加一行带随机标记的退出码，读取到标记即表示该命令的输出结束。
+    超时或会话断开时自动重连。
+    """
+
+    def __init__(self, udid: str, adb_path: Optional[str] = None, timeout: float = 10):
+        self.udid = udid
+        self.adb_path = adb_path or get_adb_path()
+        self.timeout = timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def _connect(self):
+        """启动 adb shell 会话及读取线程"""
+        self._process = subprocess.Popen(
+            [self.adb_path, '-s', self.udid, 'shell', '-T'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="ignore",
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(
+            target=self._read_loop,
+            args=(self._process, self._lines),
+            name=f"adb-shell-{self.udid}",
+            daemon=True,
+        ).start()
+        logger.debug(f"已建立 {self.udid} 的 adb shell 通道")
+
+    @staticmethod
+    def _read_loop(process: subprocess.Popen, lines: "queue.Queue[Optional[str]]"):
+        for line in process.stdout:
+            lines.put(line)
+        # None 表示会话已结束
+        lines.put(None)
+
+    def close(self):
+        """关闭会话"""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except Exception:
+            pass
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def run(self, command: str, timeout: Optional[float] = None) -> ShellResult:
+        """
+        在常驻会话中执行一条命令
+        :param command: 设备端 shell 命令
+        :param timeout: 超时时间（秒），超时后关闭会话，下一条命令自动重连
+        """
+        timeout = timeout or self.timeout
+        with self._lock:
+            # 会话意外断开时重连并重试一次
+            for attempt in (1, 2):
+                if not self.connected:
+                    self._connect()
+                try:
+                    return self._execute(command, timeout)
+                except (BrokenPipeError, EOFError) as e:
+                    self.close()
+                    if attempt == 2:
+                        raise AdbChannelError(f"{self.udid} adb shell 通道已断开: {e}")
+                    logger.debug(f"{self.udid} adb shell 通道断开，重连中...")
+
+    def _execute(self, command: str, timeout: float) -> ShellResult:
+        marker = f"__AIMATE_{uuid.uuid4().hex}__"
+        # 先输出一个换行，保证标记独占一行（即使命令输出末尾没有换行）
+        self._process.stdin.write(f"{command}\n__rc=$?; echo; echo {marker} $__rc\n")
+        self._process.stdin.flush()
+
+        output = []
+        while True:
+            try:
+                line = self._lines.get(timeout=timeout)
+            except queue.Empty:
+                self.close()
+                raise TimeoutError(f"{self.udid} 执行命令超时 ({timeout}s): {command}")
+
+            if line is None:
+                raise EOFError(f"会话在执行 {command} 时结束")
+            if line.startswith(marker):
+                break
+            output.append(line)
+
+        exit_code = int(line[len(marker):].strip() or -1)
+        # 去掉为标记补充的换行
+        text = "".join(output)
+        if text.endswith("\n"):
+            text = text[:-1]
+        return ShellResult(exit_code, text)
+
+
+_channels: Dict[str, AdbShellChannel] = {}
+_channels_lock = threading.Lock()
+_use_server_backend: Optional[bool] = None
+
+
+def _server_backend_enabled() -> bool:
+    """
+    选择命令后端：AI_MATE_ADB_BACKEND=server 直连 adb server，shell 使用常驻 adb shell，
+    默认 auto —— adb server 可连接时直连，否则回退为 adb shell 子进程
+    """
+    global _use_server_backend
+    if _use_server_backend is None:
+        backend = os.environ.get("AI_MATE_ADB_BACKEND", "auto")
+        if backend == "auto":
+            from ai_mate_tests.utils.adb_client import AdbClient
+            _use_server_backend = AdbClient(timeout=1).is_available()
+        else:
+            _use_server_backend = backend == "server"
+        logger.debug(f"adb 命令后端: {'adb server' if _use_server_backend else 'adb shell'}")
+    return _use_server_backend
+
+
+def get_channel(udid: str):
+    """获取（必要时创建）设备的命令通道，接口为 run(command, timeout) -> ShellResult"""
+    with _channels_lock:
+        channel = _channels.get(udid)
+        if channel is None:
+            if _server_backend_enabled():
+                from ai_mate_tests.utils.adb_client import AdbServerShell
+                channel = AdbServerShell(udid)
+            else:
+                channel = AdbShellChannel(udid)
+            _channels[udid] = channel
+        return channel
+
+
+def close_all_channels():
+    """关闭所有设备的 shell 通道"""
+    with _channels_lock:
+        for channel in _channels.values():
+            channel.close()
+        _channels.clear()
+
+
+atexit.register(close_all_channels)
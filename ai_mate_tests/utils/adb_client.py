@@ -0,0 +1,188 @@
+# utils/adb_client.py
+import os
+import socket
+import uuid
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from ai_mate_tests.utils.adb_channel import ShellResult
+
+
+class AdbProtocolError(RuntimeError):
+    """adb server 返回 FAIL 或协议数据异常"""
+
+
+class DeviceEvent(NamedTuple):
+    """设备热插拔事件，kind 为 added / removed / changed"""
+    kind: str
+    serial: str
+    state: str
+
+
+def _parse_device_list(data: bytes) -> List[Tuple[str, str]]:
+    """解析 host:devices 返回的 "serial\\tstate" 行"""
+    devices = []
+    for line in data.decode('utf-8', errors='ignore').splitlines():
+        if '\t' in line:
+            serial, state = line.split('\t', 1)
+            devices.append((serial.strip(), state.strip()))
+    return devices
+
+
+class AdbClient:
+    """
+    直接与 adb server（默认 127.0.0.1:5037）通信的纯 Python 客户端
+
+    每个请求格式为 4 位十六进制长度 + 请求内容，服务端回复 OKAY 或 FAIL + 错误信息。
+    地址可通过 ANDROID_ADB_SERVER_ADDRESS / ANDROID_ADB_SERVER_PORT 覆盖，便于连接假的 adb server。
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, timeout: float = 10):
+        self.host = host or os.environ.get("ANDROID_ADB_SERVER_ADDRESS", "127.0.0.1")
+        self.port = int(port or os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+        self.timeout = timeout
+
+    # ========== 协议基础方法 ==========
+
+    def _connect(self, timeout: Optional[float] = None) -> socket.socket:
+        return socket.create_connection((self.host, self.port), timeout=timeout or self.timeout)
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise AdbProtocolError(f"连接提前关闭，期望 {size} 字节，实际 {len(data)} 字节")
+            data += chunk
+        return data
+
+    @staticmethod
+    def _recv_all(sock: socket.socket) -> bytes:
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def _read_length_prefixed(self, sock: socket.socket) -> bytes:
+        length = int(self._recv_exact(sock, 4), 16)
+        return self._recv_exact(sock, length)
+
+    def _request(self, sock: socket.socket, payload: str):
+        """发送请求并检查 OKAY/FAIL"""
+        data = payload.encode('utf-8')
+        sock.sendall(f"{len(data):04x}".encode('ascii') + data)
+
+        status = self._recv_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            message = self._read_length_prefixed(sock).decode('utf-8', errors='ignore')
+            raise AdbProtocolError(f"{payload} 失败: {message}")
+        raise AdbProtocolError(f"{payload} 返回未知状态: {status!r}")
+
+    def _open_transport(self, serial: str, timeout: Optional[float] = None) -> socket.socket:
+        """建立到指定设备的传输通道"""
+        sock = self._connect(timeout)
+        try:
+            self._request(sock, f"host:transport:{serial}")
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    # ========== host 服务 ==========
+
+    def version(self) -> int:
+        """adb server 协议版本"""
+        with self._connect() as sock:
+            self._request(sock, "host:version")
+            return int(self._read_length_prefixed(sock), 16)
+
+    def is_available(self) -> bool:
+        """adb server 是否可连接"""
+        try:
+            self.version()
+            return True
+        except (OSError, AdbProtocolError, ValueError):
+            return False
+
+    def devices(self) -> List[Tuple[str, str]]:
+        """等同于 adb devices，返回 [(serial, state), ...]"""
+        with self._connect() as sock:
+            self._request(sock, "host:devices")
+            return _parse_device_list(self._read_length_prefixed(sock))
+
+    def track_devices(self) -> Iterator[List[Tuple[str, str]]]:
+        """
+        host:track-devices：每当设备列表变化，server 主动推送完整列表
+        生成器关闭时断开连接
+        """
+        sock = self._connect()
+        try:
+            self._request(sock, "host:track-devices")
+            sock.settimeout(None)
+            while True:
+                yield _parse_device_list(self._read_length_prefixed(sock))
+        finally:
+            sock.close()
+
+    def track_device_events(self) -> Iterator[DeviceEvent]:
+        """将 track-devices 推送的完整列表转换为增量热插拔事件"""
+        known = {}
+        for device_list in self.track_devices():
+            current = dict(device_list)
+            for serial, state in current.items():
+                if serial not in known:
+                    yield DeviceEvent('added', serial, state)
+                elif known[serial] != state:
+                    yield DeviceEvent('changed', serial, state)
+            for serial, state in known.items():
+                if serial not in current:
+                    yield DeviceEvent('removed', serial, state)
+            known = current
+
+    # ========== 设备服务 ==========
+
+    def shell(self, serial: str, command: str, timeout: Optional[float] = None) -> str:
+        """执行 shell 命令并返回输出（stdout 与 stderr 合并）"""
+        with self._open_transport(serial, timeout) as sock:
+            self._request(sock, f"shell:{command}")
+            return self._recv_all(sock).decode('utf-8', errors='ignore')
+
+    def exec_out(self, serial: str, command: str, timeout: Optional[float] = None) -> bytes:
+        """exec 服务：原始二进制输出，不经过 pty 转换（适合截图等）"""
+        with self._open_transport(serial, timeout) as sock:
+            self._request(sock, f"exec:{command}")
+            return self._recv_all(sock)
+
+    def run(self, serial: str, command: str, timeout: Optional[float] = None) -> ShellResult:
+        """执行 shell 命令并返回退出码和输出"""
+        marker = f"__AIMATE_{uuid.uuid4().hex}__"
+        # 子 shell 中执行，命令本身 exit 时也能输出退出码
+        output = self.shell(serial, f"({command}); __rc=$?; echo; echo {marker} $__rc", timeout)
+
+        text, sep, tail = output.rpartition(f"{marker} ")
+        if not sep:
+            raise AdbProtocolError(f"{serial} 命令输出缺少结束标记: {command}")
+        # shell 服务可能把换行转换成 \r\n
+        text = text.replace("\r\n", "\n")
+        if text.endswith("\n"):
+            text = text[:-1]
+        return ShellResult(int(tail.strip() or -1), text)
+
+
+class AdbServerShell:
+    """与 AdbShellChannel 接口一致的 adb server 后端，每条命令一个 socket，无子进程"""
+
+    def __init__(self, udid: str, client: Optional[AdbClient] = None, timeout: float = 10):
+        self.udid = udid
+        self.client = client or AdbClient()
+        self.timeout = timeout
+
+    def run(self, command: str, timeout: Optional[float] = None) -> ShellResult:
+        return self.client.run(self.udid, command, timeout or self.timeout)
+
+    def close(self):
+        pass
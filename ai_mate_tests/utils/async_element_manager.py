@@ -0,0 +1,145 @@
+# utils/async_element_manager.py
+import asyncio
+import time
+from typing import List, Tuple
+
+from ai_mate_tests.utils.async_w3c import AsyncW3CClient, AsyncW3CError, NoSuchElementError
+from ai_mate_tests.utils.config_loader import BY_MAPPING, ConfigLoader
+from ai_mate_tests.utils.element_manager import ElementManager
+from ai_mate_tests.utils.metrics_store import get_metrics_store
+
+
+class AsyncElementManager:
+    """
+    ElementManager 的协程版本：按配置键名定位，命令通过 AsyncW3CClient 发送
+    定位策略的解析、多策略排序和统计、配置热加载后的清除都复用同一设备的 ElementManager
+    """
+
+    def __init__(self, client: AsyncW3CClient, config_loader: ConfigLoader, device_name: str):
+        self.client = client
+        self.config_loader = config_loader
+        self.device_name = device_name
+        self.locators = ElementManager(config_loader, device_name)
+
+    async def click(self, element_key: str, timeout: float = 5) -> None:
+        """点击配置中的元素（会话隐式等待为 0，由 _poll 等待元素出现）"""
+        start = time.monotonic()
+        await self.client.click(await self.find_element(element_key, timeout))
+        get_metrics_store().record(f"step.click.{element_key}", time.monotonic() - start, self.device_name)
+
+    async def click_by_xpath(self, xpath: str, timeout: float = 5) -> None:
+        await self._click_locator(BY_MAPPING['xpath'], xpath, timeout)
+
+    async def click_by_accessibility_id(self, acc_id: str, timeout: float = 5) -> None:
+        await self._click_locator(BY_MAPPING['accessibility_id'], acc_id, timeout)
+
+    async def click_by_text(self, text: str, timeout: float = 5) -> None:
+        await self._click_locator(BY_MAPPING['android_uiautomator'], f'new UiSelector().text("{text}")', timeout)
+
+    async def _click_locator(self, by: str, locator: str, timeout: float) -> None:
+        element_id = await self._poll(lambda: self.client.find_element(by, locator), timeout, locator)
+        await self.client.click(element_id)
+
+    async def tap_coordinate(self, x: int, y: int) -> None:
+        """点击坐标"""
+        await self.client.tap(x, y)
+
+    async def is_displayed(self, element_key: str, timeout: float = 0) -> bool:
+        """
+        检查元素是否显示
+
+        :param timeout: 等待元素出现的时间（秒），默认只查找一次，与同步版本一致
+        """
+        try:
+            element_id = await self.find_element(element_key, timeout)
+            return await self.client.is_displayed(element_id)
+        except (AsyncW3CError, TimeoutError):
+            return False
+
+    async def find_element(self, element_key: str, timeout: float = 5) -> str:
+        """
+        在超时时间内轮询查找元素，返回元素 ID
+
+        :param element_key: 元素键名
+        :param timeout: 等待时间（秒）
+        """
+        strategies = self.locators._get_strategies(element_key)
+        if len(strategies) == 1:
+            by, locator = strategies[0]
+            return await self._poll(lambda: self.client.find_element(by, locator), timeout, element_key)
+        return await self._poll(lambda: self._try_strategies(element_key, strategies), timeout, element_key)
+
+    async def _try_strategies(self, element_key: str, strategies: List[Tuple[str, str]]) -> str:
+        """按排序尝试每个策略一次并记录结果和耗时（与 ElementManager._try_strategies 相同）"""
+        stats = self.locators.locator_stats
+        error = None
+        for strategy in stats.order(self.device_name, element_key, strategies):
+            start = time.monotonic()
+            try:
+                element_id = await self.client.find_element(*strategy)
+            except NoSuchElementError as e:
+                stats.record(self.device_name, element_key, strategy, False, time.monotonic() - start)
+                error = e
+                continue
+            stats.record(self.device_name, element_key, strategy, True, time.monotonic() - start)
+            return element_id
+        raise error
+
+    async def find_elements(self, element_key: str, timeout: float = 5) -> List[str]:
+        """查找多个元素，至少找到一个或超时"""
+        by, locator = self._get_locator(element_key)
+
+        async def find_non_empty():
+            elements = await self.client.find_elements(by, locator)
+            if not elements:
+                raise NoSuchElementError(404, "no such element", element_key)
+            return elements
+
+        return await self._poll(find_non_empty, timeout, element_key)
+
+    async def input_text(self, element_key: str, text: str) -> None:
+        element_id = await self.find_element(element_key)
+        await self.client.clear(element_id)
+        await self.client.send_keys(element_id, text)
+
+    async def get_text(self, element_key: str) -> str:
+        return await self.client.get_text(await self.find_element(element_key))
+
+    async def get_success_elements(self) -> List[str]:
+        """获取所有成功验证元素"""
+        found_elements = []
+        for text_config in self.config_loader.get_success_texts(self.device_name):
+            try:
+                by, value = ConfigLoader.convert_locator_to_appium_format(text_config)
+                found_elements.append(await self.client.find_element(by, value))
+            except AsyncW3CError:
+                continue
+        return found_elements
+
+    async def close_popup_by_coords(self) -> bool:
+        """通过坐标关闭弹窗"""
+        coords = self.config_loader.get_popup_close_coords(self.device_name)
+        if coords:
+            await self.tap_coordinate(coords['x'], coords['y'])
+            return True
+        return False
+
+    def _get_locator(self, element_key: str) -> tuple:
+        """获取 (定位方式, 定位值)：配置了多个策略时为当前排名第一的策略"""
+        return self.locators._get_locator(element_key)
+
+    @staticmethod
+    async def _poll(find, timeout: float, element_key: str, initial_interval: float = 0.05,
+                    max_interval: float = 0.5):
+        """找不到时按指数退避重试，期间让出事件循环"""
+        deadline = time.monotonic() + timeout
+        interval = initial_interval
+        while True:
+            try:
+                return await find()
+            except NoSuchElementError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{timeout}s 内未找到元素: {element_key}")
+                await asyncio.sleep(min(interval, remaining))
+                interval = min(interval * 1.5, max_interval)
@@ -0,0 +1,194 @@
+# utils/async_orchestrator.py
+"""
+asyncio 设备编排器：单进程、单事件循环并发驱动整机架设备
+
+    async def flow(session):
+        await AsyncSettingsPage(session).stress_test_bluetooth(iterations=5)
+
+    outcomes = run_flows(flow, app_name="settings")
+
+每台设备一个协程；同一设备的并发命令数由 per_device_limit 限制，
+同时建立的会话数由 session_setup_limit 限制（UiAutomator2 启动开销大）。
+单台设备超时、手动取消或 fail_fast 时只取消对应协程，会话都会被关闭。
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ai_mate_tests.utils.adb_channel import get_channel
+from ai_mate_tests.utils.async_element_manager import AsyncElementManager
+from ai_mate_tests.utils.async_w3c import AsyncW3CClient
+from ai_mate_tests.utils.capability_profiles import CapabilityProfile
+from ai_mate_tests.utils.config_loader import ConfigLoader, get_config_loader
+from ai_mate_tests.utils.device_prep import load_state
+from ai_mate_tests.utils.readiness import get_readiness_probe
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceSession:
+    """一台设备的会话：流程协程通过它访问命令客户端和元素管理器"""
+    device_name: str
+    app_name: str
+    profile: CapabilityProfile
+    client: AsyncW3CClient
+    element_manager: AsyncElementManager
+
+
+@dataclass
+class DeviceOutcome:
+    """单台设备的执行结果"""
+    device_name: str
+    ok: bool
+    result: Any = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+    cancelled: bool = False
+
+
+class AsyncDeviceOrchestrator:
+    """
+    :param per_device_limit: 每台设备同时进行中的命令数上限
+    :param session_setup_limit: 同时建立的会话数上限
+    :param device_timeout: 单台设备整个流程的超时（秒），None 表示不限制
+    :param fail_fast: 任一设备失败时取消其余设备
+    """
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None, per_device_limit: int = 1,
+                 session_setup_limit: int = 8, device_timeout: Optional[float] = None,
+                 fail_fast: bool = False, command_timeout: float = 60):
+        self.config_loader = config_loader or get_config_loader()
+        self.per_device_limit = per_device_limit
+        self.session_setup_limit = session_setup_limit
+        self.device_timeout = device_timeout
+        self.fail_fast = fail_fast
+        self.command_timeout = command_timeout
+        self.readiness = get_readiness_probe()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._setup_semaphore: Optional[asyncio.Semaphore] = None
+
+    # ========== 会话 ==========
+
+    def _close_app(self, profile: CapabilityProfile):
+        """新建会话前关闭应用（阻塞的 adb 调用，放在线程池执行）"""
+        get_channel(profile.udid).run(f"am force-stop {profile.app_package}")
+        self.readiness.wait_process_gone(profile.udid, profile.app_package)
+
+    async def open_session(self, device_name: str, app_name: str) -> DeviceSession:
+        profile = self.config_loader.get_capability_profile(device_name, app_name)
+        prep_state = load_state(profile.udid)
+        if prep_state is not None:
+            profile = profile.with_capabilities(prep_state.session_capabilities(profile.app_package))
+        client = AsyncW3CClient(profile.server_url, timeout=self.command_timeout,
+                                max_connections=self.per_device_limit)
+
+        if self._setup_semaphore is None:
+            self._setup_semaphore = asyncio.Semaphore(self.session_setup_limit)
+        start = time.perf_counter()
+        try:
+            async with self._setup_semaphore:
+                await asyncio.to_thread(self._close_app, profile)
+                # 耗时只统计会话创建，不含排队和关闭应用
+                start = time.perf_counter()
+                await client.new_session(profile.to_w3c_capabilities())
+
+            # 元素等待由客户端轮询完成，不占用服务端线程
+            await client.set_implicit_wait(0)
+        except BaseException:
+            # 建立过程中失败或被取消：删除可能已创建的会话
+            await asyncio.shield(client.quit())
+            raise
+        logger.info(f"✅ {device_name} 的 {app_name} 会话已建立，耗时 {time.perf_counter() - start:.2f}s")
+        return DeviceSession(device_name, app_name, profile, client,
+                             AsyncElementManager(client, self.config_loader, device_name))
+
+    @staticmethod
+    async def close_session(session: DeviceSession):
+        try:
+            await session.client.quit()
+        except Exception as e:
+            logger.warning(f"⚠️ 关闭 {session.device_name} 会话失败: {e}")
+
+    # ========== 执行 ==========
+
+    async def _run_device(self, device_name: str, app_name: str,
+                          flow: Callable[[DeviceSession], Awaitable[Any]]) -> DeviceOutcome:
+        start = time.perf_counter()
+        session = None
+        try:
+            session = await self.open_session(device_name, app_name)
+            result = await flow(session)
+            return DeviceOutcome(device_name, True, result, elapsed=time.perf_counter() - start)
+        except Exception as e:
+            logger.error(f"❌ {device_name} 执行失败: {e}")
+            return DeviceOutcome(device_name, False, error=e, elapsed=time.perf_counter() - start)
+        finally:
+            if session is not None:
+                # 取消或超时时也要关闭会话，避免 Appium 端残留
+                await asyncio.shield(self.close_session(session))
+
+    async def _run_with_timeout(self, device_name, app_name, flow) -> DeviceOutcome:
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(self._run_device(device_name, app_name, flow), self.device_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"⏰ {device_name} 超过 {self.device_timeout}s 未完成，已取消")
+            return DeviceOutcome(device_name, False, elapsed=time.perf_counter() - start, cancelled=True,
+                                 error=TimeoutError(f"{device_name} 超过 {self.device_timeout}s 未完成"))
+        except asyncio.CancelledError:
+            logger.warning(f"🛑 {device_name} 已取消")
+            raise
+
+    async def run(self, flow: Callable[[DeviceSession], Awaitable[Any]], device_names: Optional[List[str]] = None,
+                  app_name: str = "ai_mate") -> Dict[str, DeviceOutcome]:
+        """
+        在所有设备上并发执行流程协程
+        :param flow: async def flow(session: DeviceSession)
+        :return: {设备名: DeviceOutcome}
+        """
+        device_names = device_names or self.config_loader.get_all_devices()
+        start = time.perf_counter()
+        self._tasks = {
+            name: asyncio.create_task(self._run_with_timeout(name, app_name, flow), name=f"device:{name}")
+            for name in device_names
+        }
+
+        outcomes: Dict[str, DeviceOutcome] = {}
+        pending = set(self._tasks.values())
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = task.get_name().split(':', 1)[1]
+                    if task.cancelled():
+                        outcomes[name] = DeviceOutcome(name, False, error=asyncio.CancelledError(),
+                                                       elapsed=time.perf_counter() - start, cancelled=True)
+                        continue
+                    outcomes[name] = task.result()
+                    if self.fail_fast and not outcomes[name].ok:
+                        self.cancel()
+        finally:
+            if pending:
+                # run 本身被取消：取消所有设备并等待会话关闭
+                self.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            self._tasks = {}
+        passed = sum(1 for outcome in outcomes.values() if outcome.ok)
+        logger.info(f"📊 {passed}/{len(outcomes)} 台设备执行成功")
+        return outcomes
+
+    def cancel(self, device_name: Optional[str] = None):
+        """取消指定设备（或全部未完成设备）的流程"""
+        for name, task in self._tasks.items():
+            if (device_name is None or name == device_name) and not task.done():
+                task.cancel()
+
+
+def run_flows(flow: Callable[[DeviceSession], Awaitable[Any]], device_names: Optional[List[str]] = None,
+              app_name: str = "ai_mate", **orchestrator_options) -> Dict[str, DeviceOutcome]:
+    """同步入口：在新的事件循环中执行 AsyncDeviceOrchestrator.run"""
+    orchestrator = AsyncDeviceOrchestrator(**orchestrator_options)
+    return asyncio.run(orchestrator.run(flow, device_names, app_name))
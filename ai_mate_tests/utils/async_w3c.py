@@ -0,0 +1,251 @@
+# utils/async_w3c.py
+"""
+基于 asyncio 的 W3C WebDriver / Appium 命令客户端
+
+只依赖标准库：asyncio streams 实现 HTTP/1.1 keep-alive 连接池，
+一个事件循环即可同时驱动大量设备，不再需要每台设备一个阻塞线程。
+"""
+import asyncio
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+
+class AsyncW3CError(Exception):
+    """服务端返回的 W3C 错误"""
+
+    def __init__(self, status: int, error: str, message: str = ""):
+        super().__init__(f"{error}: {message}" if message else error)
+        self.status = status
+        self.error = error
+        self.message = message
+
+
+class NoSuchElementError(AsyncW3CError):
+    pass
+
+
+class StaleElementError(AsyncW3CError):
+    pass
+
+
+_ERRORS = {
+    "no such element": NoSuchElementError,
+    "stale element reference": StaleElementError,
+}
+
+
+class _HttpPool:
+    """到同一 Appium 服务的 HTTP/1.1 长连接池"""
+
+    def __init__(self, url: str, max_connections: int = 8, timeout: float = 60):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.ssl = parts.scheme == "https"
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._limit = asyncio.Semaphore(max_connections)
+
+    async def _open(self):
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl or None),
+                                      self.timeout)
+
+    async def request(self, method: str, path: str, payload: Optional[dict] = None) -> Tuple[int, bytes]:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b""
+        head = (f"{method} {self.base_path}{path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                "Accept: application/json\r\n"
+                "Connection: keep-alive\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode('ascii')
+
+        async with self._limit:
+            # 复用的空闲连接可能已被服务端关闭，失败时换新连接重试一次
+            for attempt in range(2):
+                reused = bool(self._idle)
+                reader, writer = self._idle.pop() if reused else await self._open()
+                try:
+                    writer.write(head + body)
+                    await writer.drain()
+                    status, data, keep_alive = await asyncio.wait_for(self._read_response(reader), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    # 超时或取消时连接状态未知，直接丢弃
+                    writer.close()
+                    raise
+                if keep_alive:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, data
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bytes, bool]:
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readuntil(b"\r\n")
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(chunks)
+        elif 'content-length' in headers:
+            data = await reader.readexactly(int(headers['content-length']))
+        else:
+            data = await reader.read()
+            return status, data, False
+
+        keep_alive = headers.get('connection', '').lower() != 'close'
+        return status, data, keep_alive
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class AsyncW3CClient:
+    """
+    单个会话的异步命令客户端，覆盖 ElementManager 用到的操作
+
+    :param server_url: Appium 服务地址，如 http://localhost:4723/wd/hub
+    """
+
+    def __init__(self, server_url: str, timeout: float = 60, max_connections: int = 4):
+        self.server_url = server_url
+        self._pool = _HttpPool(server_url, max_connections=max_connections, timeout=timeout)
+        self.session_id: Optional[str] = None
+        self.capabilities: Dict[str, Any] = {}
+
+    # ========== 基础 ==========
+
+    async def command(self, method: str, path: str, payload: Optional[dict] = None) -> Any:
+        """发送命令并返回 value；path 中的 {sid} 替换为当前会话"""
+        if '{sid}' in path:
+            if self.session_id is None:
+                raise RuntimeError("会话尚未建立")
+            path = path.replace('{sid}', self.session_id)
+        status, data = await self._pool.request(method, path, payload)
+        try:
+            value = json.loads(data.decode('utf-8')).get('value') if data else None
+        except ValueError:
+            raise AsyncW3CError(status, "unknown error", data[:200].decode('utf-8', errors='ignore'))
+
+        if status >= 400 or (isinstance(value, dict) and 'error' in value):
+            error = value.get('error', 'unknown error') if isinstance(value, dict) else 'unknown error'
+            message = value.get('message', '') if isinstance(value, dict) else str(value)
+            raise _ERRORS.get(error, AsyncW3CError)(status, error, message)
+        return value
+
+    async def new_session(self, capabilities: Dict[str, Any]) -> str:
+        value = await self.command("POST", "/session", {"capabilities": capabilities})
+        self.session_id = value['sessionId']
+        self.capabilities = value.get('capabilities', {})
+        return self.session_id
+
+    async def quit(self):
+        """结束会话并关闭连接（可重复调用）"""
+        try:
+            if self.session_id is not None:
+                await self.command("DELETE", "/session/{sid}")
+        finally:
+            self.session_id = None
+            await self._pool.close()
+
+    async def set_implicit_wait(self, seconds: float):
+        await self.command("POST", "/session/{sid}/timeouts", {"implicit": int(seconds * 1000)})
+
+    # ========== 元素 ==========
+
+    async def find_element(self, by: str, value: str) -> str:
+        """返回元素 ID"""
+        result = await self.command("POST", "/session/{sid}/element", {"using": by, "value": value})
+        return result[ELEMENT_KEY]
+
+    async def find_elements(self, by: str, value: str) -> List[str]:
+        result = await self.command("POST", "/session/{sid}/elements", {"using": by, "value": value})
+        return [item[ELEMENT_KEY] for item in result]
+
+    async def click(self, element_id: str):
+        await self.command("POST", f"/session/{{sid}}/element/{element_id}/click", {})
+
+    async def clear(self, element_id: str):
+        await self.command("POST", f"/session/{{sid}}/element/{element_id}/clear", {})
+
+    async def send_keys(self, element_id: str, text: str):
+        await self.command("POST", f"/session/{{sid}}/element/{element_id}/value",
+                           {"text": text, "value": list(text)})
+
+    async def get_text(self, element_id: str) -> str:
+        return await self.command("GET", f"/session/{{sid}}/element/{element_id}/text")
+
+    async def get_attribute(self, element_id: str, name: str) -> Optional[str]:
+        return await self.command("GET", f"/session/{{sid}}/element/{element_id}/attribute/{name}")
+
+    async def is_displayed(self, element_id: str) -> bool:
+        return bool(await self.command("GET", f"/session/{{sid}}/element/{element_id}/displayed"))
+
+    async def get_rect(self, element_id: str) -> Dict[str, int]:
+        return await self.command("GET", f"/session/{{sid}}/element/{element_id}/rect")
+
+    # ========== 手势与设备 ==========
+
+    async def perform_actions(self, actions: List[dict]):
+        await self.command("POST", "/session/{sid}/actions", {"actions": actions})
+
+    async def tap(self, x: int, y: int, duration_ms: int = 100):
+        """W3C 指针动作点击坐标"""
+        await self.perform_actions([{
+            "type": "pointer", "id": "finger1", "parameters": {"pointerType": "touch"},
+            "actions": [
+                {"type": "pointerMove", "duration": 0, "x": int(x), "y": int(y), "origin": "viewport"},
+                {"type": "pointerDown", "button": 0},
+                {"type": "pause", "duration": duration_ms},
+                {"type": "pointerUp", "button": 0},
+            ],
+        }])
+
+    async def back(self):
+        await self.command("POST", "/session/{sid}/back", {})
+
+    async def page_source(self) -> str:
+        return await self.command("GET", "/session/{sid}/source")
+
+    async def screenshot_png(self) -> bytes:
+        return base64.b64decode(await self.command("GET", "/session/{sid}/screenshot"))
+
+    async def execute_script(self, script: str, *args) -> Any:
+        return await self.command("POST", "/session/{sid}/execute/sync", {"script": script, "args": list(args)})
+
+    async def current_activity(self) -> str:
+        return await self.execute_script("mobile: getCurrentActivity")
+
+    async def current_package(self) -> str:
+        return await self.execute_script("mobile: getCurrentPackage")
+
+    async def activate_app(self, package: str):
+        await self.execute_script("mobile: activateApp", {"appId": package})
+
+    async def terminate_app(self, package: str) -> bool:
+        return bool(await self.execute_script("mobile: terminateApp", {"appId": package}))
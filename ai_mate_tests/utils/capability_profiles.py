@@ -0,0 +1,169 @@
+# utils/capability_profiles.py
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Tuple
+
+# 设备配置必填字段
+REQUIRED_DEVICE_FIELDS = ['udid', 'platform_name', 'platform_version', 'device_name']
+
+# 针对不同应用的特定配置（等待Activity和时长来自 config.yaml 的 app_configs）
+APP_CAPABILITIES = {
+    "settings": {
+        "autoGrantPermissions": True,
+        "noReset": True,
+        "fullReset": False,
+        "newCommandTimeout": 300,
+        "uiautomator2ServerLaunchTimeout": 120000,
+        "uiautomator2ServerInstallTimeout": 120000,
+        # 禁用动画以确保稳定启动
+        "disableWindowAnimation": True,
+    },
+    "ai_mate": {
+        "autoGrantPermissions": True,
+        "noReset": True,  # 系统应用使用no_reset
+        "fullReset": False,
+        "newCommandTimeout": 300,
+        "uiautomator2ServerLaunchTimeout": 90000,
+        "uiautomator2ServerInstallTimeout": 90000,
+        # 性能优化
+        "skipDeviceInitialization": True,
+        "disableWindowAnimation": True,
+    },
+}
+
+# 按 UDID 的设备特殊配置（传音设备）
+DEVICE_CAPABILITIES = {
+    "11467253AU000413": {
+        "disableAndroidWatchers": True,
+        "skipDeviceInitialization": True,
+        "skipServerInstallation": True,
+        "ignoreUnimportantViews": True,
+    },
+}
+
+# 设备配置中可覆盖应用默认值的字段
+DEVICE_OVERRIDE_FIELDS = {
+    'uiautomator2_server_launch_timeout': 'uiautomator2ServerLaunchTimeout',
+    'uiautomator2_server_install_timeout': 'uiautomator2ServerInstallTimeout',
+}
+
+# W3C 标准能力，其余能力需要 appium: 前缀
+W3C_STANDARD_CAPABILITIES = {
+    'platformName', 'browserName', 'browserVersion', 'acceptInsecureCerts', 'pageLoadStrategy',
+    'proxy', 'setWindowRect', 'timeouts', 'strictFileInteractability', 'unhandledPromptBehavior',
+}
+
+
+def to_camel_case(snake_str: str) -> str:
+    """将下划线命名法转换为驼峰命名法"""
+    components = snake_str.split('_')
+    return components[0] + ''.join(x.title() for x in components[1:])
+
+
+@dataclass(frozen=True)
+class CapabilityProfile:
+    """预编译、不可变的 (设备, 应用) 驱动能力配置"""
+    device_name: str
+    app_name: str
+    udid: str
+    server_url: str
+    app_package: str
+    capabilities: Mapping[str, Any]
+
+    def to_options(self):
+        """生成 UiAutomator2Options"""
+        from appium.options.android import UiAutomator2Options
+        return UiAutomator2Options().load_capabilities(dict(self.capabilities))
+
+    def with_capabilities(self, extra: Mapping[str, Any]) -> "CapabilityProfile":
+        """返回追加（覆盖）了部分能力的新配置，原配置不变"""
+        if not extra:
+            return self
+        return replace(self, capabilities=MappingProxyType({**self.capabilities, **extra}))
+
+    def to_w3c_capabilities(self) -> Dict[str, Any]:
+        """生成 W3C 新建会话请求中的 capabilities（非标准能力加 appium: 前缀）"""
+        always_match = {}
+        for key, value in self.capabilities.items():
+            always_match[key if key in W3C_STANDARD_CAPABILITIES or ':' in key else f"appium:{key}"] = value
+        return {'alwaysMatch': always_match, 'firstMatch': [{}]}
+
+
+def _validate_device(device_name: str, device_config: Dict[str, Any]) -> List[str]:
+    errors = []
+    for field in REQUIRED_DEVICE_FIELDS:
+        if not device_config.get(field):
+            errors.append(f"设备 {device_name} 缺少必要字段: {field}")
+    if not device_config.get('elements'):
+        errors.append(f"设备 {device_name} 没有配置元素")
+    return errors
+
+
+def _build_capabilities(device_config: Dict[str, Any], app_name: str, app_config: Dict[str, Any],
+                        driver_options: Dict[str, Any]) -> Dict[str, Any]:
+    """按优先级合并：驱动选项 < 应用配置 < 设备覆盖项 < 按 UDID 的特殊配置"""
+    capabilities = {to_camel_case(key): value for key, value in driver_options.items()}
+
+    capabilities.update(APP_CAPABILITIES.get(app_name, {}))
+    if app_config.get('app_wait_activity'):
+        capabilities['appWaitActivity'] = app_config['app_wait_activity']
+    if app_config.get('app_wait_duration'):
+        capabilities['appWaitDuration'] = app_config['app_wait_duration']
+
+    for field, camel_key in DEVICE_OVERRIDE_FIELDS.items():
+        if device_config.get(field) is not None:
+            capabilities[camel_key] = device_config[field]
+
+    capabilities.update(DEVICE_CAPABILITIES.get(device_config['udid'], {}))
+
+    capabilities.update({
+        'platformName': device_config['platform_name'],
+        'platformVersion': str(device_config['platform_version']),
+        'deviceName': device_config['device_name'],
+        'automationName': device_config.get('automation_name', 'UiAutomator2'),
+        'udid': device_config['udid'],
+        'appPackage': app_config['app_package'],
+        'appActivity': app_config['app_activity'],
+    })
+    return capabilities
+
+
+def compile_profiles(config_loader) -> Tuple[Dict[Tuple[str, str], CapabilityProfile], Dict[str, List[str]]]:
+    """
+    为所有 (设备, 应用) 组合编译能力配置
+    :return: (profiles, errors)，errors 以设备名（或 "app_configs"）为键
+    """
+    config = config_loader.config or {}
+    devices = config.get('devices', {}) or {}
+    app_configs = config.get('app_configs', {}) or {}
+    driver_options = config.get('driver_options', {}) or {}
+
+    profiles = {}
+    errors: Dict[str, List[str]] = {}
+
+    for app_name, app_config in app_configs.items():
+        for field in ('app_package', 'app_activity'):
+            if not app_config.get(field):
+                errors.setdefault('app_configs', []).append(f"应用 {app_name} 缺少必要字段: {field}")
+
+    for device_name, device_config in devices.items():
+        device_errors = _validate_device(device_name, device_config or {})
+        if device_errors:
+            errors[device_name] = device_errors
+            continue
+
+        server_url = config_loader.get_appium_server_url(device_name)
+        for app_name, app_config in app_configs.items():
+            if not app_config.get('app_package') or not app_config.get('app_activity'):
+                continue
+            capabilities = _build_capabilities(device_config, app_name, app_config, driver_options)
+            profiles[(device_name, app_name)] = CapabilityProfile(
+                device_name=device_name,
+                app_name=app_name,
+                udid=device_config['udid'],
+                server_url=server_url,
+                app_package=app_config['app_package'],
+                capabilities=MappingProxyType(capabilities),
+            )
+
+    return profiles, errors
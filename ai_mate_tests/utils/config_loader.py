@@ -1,12 +1,69 @@
 # utils/config_loader.py
-import yaml
 import os
-from typing import Dict, Any, List, Optional
-from appium.webdriver.common.appiumby import AppiumBy
+import threading
+import weakref
+from typing import Dict, Any, Callable, List, NamedTuple, Optional, Set, Tuple
+
+from ai_mate_tests.utils.capability_profiles import CapabilityProfile, compile_profiles
+
+# 定位方式映射，取值与 AppiumBy 常量一致（避免导入配置时加载 Appium/Selenium）
+BY_MAPPING = {
+    'xpath': 'xpath',  # AppiumBy.XPATH
+    'accessibility_id': 'accessibility id',  # AppiumBy.ACCESSIBILITY_ID
+    'android_uiautomator': '-android uiautomator',  # AppiumBy.ANDROID_UIAUTOMATOR
+    'class_name': 'class name',  # AppiumBy.CLASS_NAME
+    'id': 'id',  # AppiumBy.ID
+}
+
+# 元素配置中不是定位器的特殊键
+_NON_LOCATOR_KEYS = {'success_texts', 'popup_close_coords', 'popup_dismiss'}
+
+
+# 设备配置中的连接参数：不影响用例行为，不计入 device 段摘要
+# （模拟器每次启动使用随机端口，计入时每次重新运行都会被判为配置变化）
+_DEVICE_CONNECTION_KEYS = {'appium_server_url', 'app_wait_duration'}
+
+
+# 访问记录（增量选择用）：记录期间被读取的配置段 (设备名或 None, 段名)，
+# 段名为 device / element:<元素键> / page:<页面> / app:<应用> / driver_options，见 ConfigLoader.section_digest
+_accessed: Optional[Set[Tuple[Optional[str], str]]] = None
+
+
+def start_access_tracking():
+    global _accessed
+    _accessed = set()
+
+
+def stop_access_tracking() -> Set[Tuple[Optional[str], str]]:
+    global _accessed
+    accessed, _accessed = _accessed, None
+    return accessed or set()
+
+
+def _touch(device_name: Optional[str], section: str):
+    accessed = _accessed
+    if accessed is not None:
+        accessed.add((device_name, section))
+
+
+class _ConfigState(NamedTuple):
+    """一份已校验的配置及其编译结果；热加载时整体替换，读者不会看到新旧混合的状态"""
+    config: Dict[str, Any]
+    profiles: Dict[Tuple[str, str], CapabilityProfile]
+    errors: Dict[str, List[str]]
 
 
 class ConfigLoader:
-    def __init__(self, config_path: str = None):
+    def __init__(self, config_path: str = None, config: Optional[Dict[str, Any]] = None):
+        """
+        :param config_path: 配置文件路径，None 时按环境变量 AI_MATE_CONFIG 或默认位置查找
+        :param config: 已读取的配置（见 from_config），None 时从 config_path 读取
+        """
+        # 环境变量 AI_MATE_CONFIG 可指定配置文件（如模拟器生成的配置）
+        if config_path is None and os.environ.get("AI_MATE_CONFIG"):
+            config_path = os.environ["AI_MATE_CONFIG"]
+            print(f"✅ 使用环境变量 AI_MATE_CONFIG 指定的配置文件: {config_path}")
+
         # 如果没有指定路径，尝试多个可能的位置
         if config_path is None:
             # 尝试从项目根目录开始查找
@@ -30,7 +87,32 @@ class ConfigLoader:
         else:
             self.config_path = config_path
 
-        self.config = self._load_config()
+        self._errors_reported = False
+        self.version = 1  # 每次热加载成功加一
+        self._reload_lock = threading.Lock()
+        self._listeners: List[Callable[[], Optional[Callable]]] = []
+        self._watcher = None
+
+        self._state = _ConfigState(self._load_config() if config is None else config, {}, {})
+        # 加载时一次性编译所有 (设备, 应用) 的能力配置
+        self._state = _ConfigState(self.config, *compile_profiles(self))
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], config_path: Optional[str] = None) -> "ConfigLoader":
+        """用已读取的配置构造（不读取文件），热加载时在这样的候选对象上编译"""
+        return cls(config_path, config=config)
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self._state.config
+
+    @property
+    def config_errors(self) -> Dict[str, List[str]]:
+        return self._state.errors
+
+    @property
+    def _profiles(self) -> Dict[Tuple[str, str], CapabilityProfile]:
+        return self._state.profiles
 
     def _load_config(self) -> Dict[str, Any]:
         """加载YAML配置文件"""
@@ -45,6 +127,8 @@ class ConfigLoader:
                 f"请确保config.yaml文件位于正确位置"
             )
 
+        import yaml
+
         try:
             with open(self.config_path, 'r', encoding='utf-8') as file:
                 config = yaml.safe_load(file)
@@ -54,6 +138,123 @@ class ConfigLoader:
             print(f"❌ 配置文件加载失败: {e}")
             raise
 
+    # ========== 热加载 ==========
+
+    def reload(self) -> bool:
+        """
+        重新读取配置文件：校验通过后整体替换配置和能力配置，并通知监听者
+        （ElementManager 清除定位缓存，已有会话不受影响，新会话使用新的能力配置）；
+        校验失败时保留当前配置
+        :return: 是否已切换到新配置
+        """
+        import yaml
+
+        with self._reload_lock:
+            try:
+                with open(self.config_path, 'r', encoding='utf-8') as file:
+                    config = yaml.safe_load(file)
+            except (OSError, yaml.YAMLError) as e:
+                print(f"❌ 配置热加载失败，保留当前配置: {e}")
+                return False
+
+            problems = self.validate_config(config)
+            if not problems:
+                # 在候选对象上编译，当前配置在替换前保持不变
+                candidate = type(self).from_config(config, self.config_path)
+                profiles, errors = candidate._profiles, candidate.config_errors
+                # 原来有效的设备不能因为本次修改变为无效
+                problems = [f"[{name}] {error}" for name, device_errors in errors.items()
+                            if name not in self.config_errors for error in device_errors]
+            if problems:
+                print("❌ 配置热加载被拒绝，保留当前配置:")
+                for problem in problems:
+                    print(f"   - {problem}")
+                return False
+
+            self._state = _ConfigState(config, profiles, errors)
+            self.version += 1
+            print(f"🔄 配置已热加载（版本 {self.version}）: {self.config_path}")
+
+        self._notify_reload()
+        return True
+
+    @classmethod
+    def validate_config(cls, config) -> List[str]:
+        """检查配置结构和所有定位器，返回问题列表（为空表示有效）"""
+        if not isinstance(config, dict):
+            return ["配置文件顶层必须是映射"]
+        devices = config.get('devices') or {}
+        if not isinstance(devices, dict):
+            return ["devices 必须是映射"]
+
+        problems = []
+        for device_name, device_config in devices.items():
+            elements = (device_config or {}).get('elements') or {}
+            if not isinstance(elements, dict):
+                problems.append(f"[{device_name}] elements 必须是映射")
+                continue
+            for page, page_elements in elements.items():
+                if not isinstance(page_elements, dict):
+                    problems.append(f"[{device_name}] 页面 {page} 必须是映射")
+                    continue
+                for key, element_config in page_elements.items():
+                    try:
+                        cls._validate_element(key, element_config)
+                    except (ValueError, TypeError, AttributeError) as e:
+                        problems.append(f"[{device_name}] {page}.{key}: {e}")
+        return problems
+
+    @classmethod
+    def _validate_element(cls, key: str, element_config):
+        if key == 'popup_close_coords':
+            if not all(isinstance(element_config.get(axis), int) for axis in ('x', 'y')):
+                raise ValueError(f"坐标必须是整数: {element_config}")
+            return
+        if key in ('success_texts', 'popup_dismiss'):
+            locators = element_config
+        elif key in _NON_LOCATOR_KEYS:
+            return
+        else:
+            locators = cls._element_strategies(element_config)
+        for locator in locators:
+            cls.convert_locator_to_appium_format(locator)
+
+    def add_reload_listener(self, callback: Callable[["ConfigLoader"], None]):
+        """
+        注册热加载回调 callback(config_loader)；绑定方法只保存弱引用，
+        对象（如会话结束后的 ElementManager）被回收后自动移除
+        """
+        if hasattr(callback, '__self__'):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback
+        with self._reload_lock:
+            self._listeners.append(ref)
+
+    def _notify_reload(self):
+        with self._reload_lock:
+            self._listeners = [ref for ref in self._listeners if ref() is not None]
+            callbacks = [ref() for ref in self._listeners]
+        for callback in callbacks:
+            if callback is None:
+                continue
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"⚠️ 配置热加载回调失败: {e}")
+
+    def watch(self, interval: float = 1.0):
+        """监听配置文件变化并自动热加载（重复调用只启动一次）"""
+        if self._watcher is None:
+            from ai_mate_tests.utils.config_watcher import ConfigWatcher
+            self._watcher = ConfigWatcher(self.config_path, self.reload, interval=interval).start()
+        return self._watcher
+
+    def stop_watching(self):
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.stop()
+
     def get_appium_servers(self) -> Dict[str, str]:
         """获取所有Appium服务器地址"""
         return self.config.get('appium_servers', {})
@@ -107,8 +308,34 @@ class ConfigLoader:
         components = snake_str.split('_')
         return components[0] + ''.join(x.title() for x in components[1:])
 
+    def get_capability_profile(self, device_name: str, app_name: str) -> CapabilityProfile:
+        """获取预编译的 (设备, 应用) 能力配置"""
+        _touch(device_name, "device")
+        _touch(None, f"app:{app_name}")
+        _touch(None, "driver_options")
+        profile = self._profiles.get((device_name, app_name))
+        if profile is not None:
+            return profile
+
+        if device_name in self.config_errors:
+            raise ValueError(f"设备 {device_name} 配置验证失败: {'; '.join(self.config_errors[device_name])}")
+        if not self.get_app_config(app_name):
+            raise ValueError(f"应用配置 {app_name} 不存在")
+        raise ValueError(f"设备 {device_name} 不在配置中")
+
+    def report_config_errors(self) -> bool:
+        """汇总打印整个设备组的配置错误（只打印一次），返回配置是否全部有效"""
+        if self.config_errors and not self._errors_reported:
+            print("❌ 配置校验发现以下问题:")
+            for name, errors in self.config_errors.items():
+                for error in errors:
+                    print(f"   - [{name}] {error}")
+        self._errors_reported = True
+        return not self.config_errors
+
     def get_appium_server_url(self, device_name: str) -> str:
         """获取指定设备的Appium服务器URL"""
+        _touch(device_name, "device")
         # 首先检查设备配置中是否有独立的appium_server_url
         device_config = self.get_device_config(device_name)
         if 'appium_server_url' in device_config:
@@ -129,6 +356,7 @@ class ConfigLoader:
 
     def get_element_locator(self, device_name: str, element_key: str) -> Dict[str, Any]:
         """获取指定设备的元素定位配置（自动搜索所有页面）"""
+        _touch(device_name, f"element:{element_key}")
         elements = self.get_device_elements(device_name)
 
         if not elements:
@@ -137,7 +365,8 @@ class ConfigLoader:
         # 遍历所有页面查找元素
         for page, page_elements in elements.items():
             if element_key in page_elements:
-                element_config = page_elements[element_key]
+                # 配置了多个定位策略时返回第一个
+                element_config = self._element_strategies(page_elements[element_key])[0]
                 return {
                     'by': element_config.get('by'),
                     'value': element_config.get('value'),
@@ -146,8 +375,29 @@ class ConfigLoader:
 
         raise ValueError(f"元素 {element_key} 在设备 {device_name} 中未找到")
 
+    def get_element_strategies(self, device_name: str, element_key: str) -> List[Dict[str, Any]]:
+        """
+        获取元素的全部定位策略（按配置顺序）
+        元素可配置单个 by/value，或在 strategies 下配置多个备选定位
+        """
+        _touch(device_name, f"element:{element_key}")
+        for page_elements in self.get_device_elements(device_name).values():
+            if element_key in page_elements:
+                return [{'by': strategy.get('by'), 'value': strategy.get('value')}
+                        for strategy in self._element_strategies(page_elements[element_key])]
+
+        raise ValueError(f"元素 {element_key} 在设备 {device_name} 中未找到")
+
+    @staticmethod
+    def _element_strategies(element_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        strategies = element_config.get('strategies')
+        if strategies:
+            return list(strategies)
+        return [element_config]
+
     def get_element_by_page(self, device_name: str, page: str, element_key: str) -> Dict[str, Any]:
         """按页面获取元素定位配置"""
+        _touch(device_name, f"element:{element_key}")
         elements = self.get_device_elements(device_name)
 
         if not elements:
@@ -158,7 +408,7 @@ class ConfigLoader:
         if element_key not in page_elements:
             raise ValueError(f"元素 {element_key} 在页面 {page} 中未找到")
 
-        element_config = page_elements[element_key]
+        element_config = self._element_strategies(page_elements[element_key])[0]
         return {
             'by': element_config.get('by'),
             'value': element_config.get('value')
@@ -166,6 +416,7 @@ class ConfigLoader:
 
     def get_success_texts(self, device_name: str) -> List[Dict[str, str]]:
         """获取成功验证文本配置"""
+        _touch(device_name, "element:success_texts")
         elements = self.get_device_elements(device_name)
 
         if not elements:
@@ -180,6 +431,7 @@ class ConfigLoader:
 
     def get_popup_close_coords(self, device_name: str) -> Optional[Dict[str, int]]:
         """获取弹窗关闭坐标"""
+        _touch(device_name, "element:popup_close_coords")
         elements = self.get_device_elements(device_name)
 
         if not elements:
@@ -193,13 +445,23 @@ class ConfigLoader:
 
         return None
 
+    def get_popup_dismiss_locators(self, device_name: str) -> List[Dict[str, Any]]:
+        """
+        获取弹窗拦截器识别的弹窗定位列表（popup_page.popup_dismiss）
+        只使用显式配置：popup_button 过于宽泛，不能用来在后台自动点击，未配置时返回空列表
+        """
+        page_elements = self.get_page_elements(device_name, 'popup_page')
+        return list(page_elements.get('popup_dismiss') or [])
+
     def get_app_config(self, app_name: str) -> Dict[str, str]:
         """获取应用配置"""
+        _touch(None, f"app:{app_name}")
         app_configs = self.config.get('app_configs', {})
         return app_configs.get(app_name, {})
 
     def get_driver_options(self) -> Dict[str, Any]:
         """获取驱动选项"""
+        _touch(None, "driver_options")
         return self.config.get('driver_options', {})
 
     def get_all_pages_for_device(self, device_name: str) -> List[str]:
@@ -209,9 +471,34 @@ class ConfigLoader:
 
     def get_page_elements(self, device_name: str, page: str) -> Dict[str, Any]:
         """获取指定设备指定页面的所有元素"""
+        _touch(device_name, f"page:{page}")
         elements = self.get_device_elements(device_name)
         return elements.get(page, {})
 
+    def section_digest(self, device_name: Optional[str], section: str) -> str:
+        """配置段内容的摘要（段名见 start_access_tracking 的说明），段不存在时也有固定摘要"""
+        import hashlib
+        import json
+
+        kind, _, name = section.partition(":")
+        device_config = self.config.get('devices', {}).get(device_name) or {}
+        elements = device_config.get('elements') or {}
+        if kind == "device":
+            # udid、系统版本和能力配置；元素单独按段记录，连接地址和超时不属于用例输入
+            value = {k: v for k, v in device_config.items()
+                     if k != 'elements' and k not in _DEVICE_CONNECTION_KEYS and not k.endswith('_timeout')}
+        elif kind == "element":
+            value = [page_elements[name] for page_elements in elements.values()
+                     if isinstance(page_elements, dict) and name in page_elements]
+        elif kind == "page":
+            value = elements.get(name)
+        elif kind == "app":
+            value = self.config.get('app_configs', {}).get(name)
+        else:
+            value = self.config.get(kind)
+        data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
     def validate_device_config(self, device_name: str) -> bool:
         """验证设备配置是否完整"""
         try:
@@ -238,24 +525,16 @@ class ConfigLoader:
     @staticmethod
     def convert_locator_to_appium_format(locator_config: Dict[str, Any]) -> tuple:
         """将定位配置转换为Appium格式 (by, value) - 静态方法"""
-        by_mapping = {
-            'xpath': AppiumBy.XPATH,
-            'accessibility_id': AppiumBy.ACCESSIBILITY_ID,
-            'android_uiautomator': AppiumBy.ANDROID_UIAUTOMATOR,
-            'class_name': AppiumBy.CLASS_NAME,
-            'id': AppiumBy.ID
-        }
-
         by_type = locator_config.get('by')
         value = locator_config.get('value')
 
         if not by_type or not value:
             raise ValueError(f"无效的定位配置: {locator_config}")
 
-        if by_type not in by_mapping:
+        if by_type not in BY_MAPPING:
             raise ValueError(f"不支持的定位方式: {by_type}")
 
-        return by_mapping[by_type], value
+        return BY_MAPPING[by_type], value
 
     def print_device_info(self, device_name: str):
         """打印设备配置信息"""
@@ -275,25 +554,47 @@ class ConfigLoader:
         print("==============================\n")
 
 
-# 创建全局实例
-config_loader = ConfigLoader()
+# 全局实例延迟到首次使用时创建，导入模块（如 pytest 收集用例）时不读取配置
+_config_loader: Optional[ConfigLoader] = None
+_config_loader_lock = threading.Lock()
+
+
+def get_config_loader() -> ConfigLoader:
+    """获取全局 ConfigLoader 实例"""
+    global _config_loader
+    if _config_loader is None:
+        with _config_loader_lock:
+            if _config_loader is None:
+                _config_loader = ConfigLoader()
+                # 环境变量 AI_MATE_CONFIG_WATCH=1 时修改配置文件即热加载
+                if os.environ.get("AI_MATE_CONFIG_WATCH", "0") not in ("0", "false", "no"):
+                    _config_loader.watch()
+    return _config_loader
+
+
+def __getattr__(name):
+    # 兼容 from ai_mate_tests.utils.config_loader import config_loader
+    if name == "config_loader":
+        return get_config_loader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # 便捷函数
 def get_driver_options():
-    return config_loader.get_driver_options()
+    return get_config_loader().get_driver_options()
 
 
 def get_app_config(app_name):
-    return config_loader.get_app_config(app_name)
+    return get_config_loader().get_app_config(app_name)
 
 
 def get_all_devices():
-    return config_loader.get_all_devices()
+    return get_config_loader().get_all_devices()
 
 
 def validate_all_devices():
     """验证所有设备配置"""
+    config_loader = get_config_loader()
     devices = get_all_devices()
     results = {}
 
@@ -304,4 +605,4 @@ def validate_all_devices():
         else:
             print(f"❌ 设备 {device} 配置验证失败")
 
-    return results
\ No newline at end of file
+    return results
@@ -0,0 +1,129 @@
+# utils/config_watcher.py
+"""
+配置文件变化监听
+
+安装了 watchdog 时使用系统文件变化通知（监听所在目录，编辑器"写临时文件再改名"
+的保存方式也能收到），否则退化为定时检查修改时间和大小。
+编辑器保存常分多次写入，收到变化后等待 debounce 秒内没有新变化、
+且文件内容确实改变时才回调一次。
+"""
+import hashlib
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(path: str) -> Optional[str]:
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _stat(path: str):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+class ConfigWatcher:
+    """
+    :param path: 配置文件路径
+    :param on_change: 文件内容变化后调用（无参数）
+    :param interval: 无 watchdog 时的检查间隔（秒）
+    :param debounce: 最后一次变化后等待的时间（秒）
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], object], interval: float = 1.0,
+                 debounce: float = 0.5):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.mode = "poll"
+        self._digest = _digest(self.path)
+        self._stat = _stat(self.path)
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+
+    def start(self) -> "ConfigWatcher":
+        self._stop.clear()
+        self._observer = self._start_observer()
+        self.mode = "notify" if self._observer is not None else "poll"
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"👀 监听配置文件变化（{self.mode}）: {self.path}")
+        return self
+
+    def _start_observer(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = {getattr(event, 'src_path', None), getattr(event, 'dest_path', None)}
+                if watcher.path in {os.path.abspath(p) for p in paths if p}:
+                    watcher._changed.set()
+
+        observer = Observer()
+        observer.schedule(_Handler(), os.path.dirname(self.path), recursive=False)
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._observer is not None:
+                self._changed.wait(self.interval)
+            else:
+                self._stop.wait(self.interval)
+                stat = _stat(self.path)
+                if stat != self._stat:
+                    self._stat = stat
+                    self._changed.set()
+            if not self._changed.is_set() or self._stop.is_set():
+                continue
+
+            # 去抖：等到 debounce 秒内没有新的变化
+            self._changed.clear()
+            while self._stop.wait(self.debounce) is False:
+                stat = _stat(self.path)
+                if not self._changed.is_set() and stat == self._stat:
+                    break
+                self._stat = stat
+                self._changed.clear()
+            if not self._stop.is_set():
+                self._check()
+
+    def _check(self):
+        digest = _digest(self.path)
+        if digest is None or digest == self._digest:
+            return
+        self._digest = digest
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.warning(f"⚠️ 配置变化处理失败: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._changed.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
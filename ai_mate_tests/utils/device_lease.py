@@ -0,0 +1,146 @@
+# utils/device_lease.py
+"""
+设备租约：跨进程独占设备
+
+pytest-xdist 的多个 worker（以及同机运行的其他测试进程）各自检测到的是同一批设备，
+不加协调时会同时在一台手机上创建会话、互相打断。
+每台设备对应租约目录下的一个锁文件，持有文件锁即独占该设备：
+  - 使用操作系统文件锁（POSIX fcntl / Windows msvcrt），进程退出或崩溃时自动释放，不会残留
+  - lease_devices 一次租用当前空闲的设备，空闲设备不足 min_count 台时全部放回并等待重试
+    （不持有部分设备等待，两个进程不会各占一半互相等待；重试间隔带随机抖动，避免同步碰撞）
+
+    leases = lease_devices(udids, timeout=600)
+    try:
+        ...
+    finally:
+        release_all(leases)
+
+  - 环境变量 AI_MATE_LEASE_DIR 指定租约目录，默认系统临时目录下的 ai_mate_leases
+  - 环境变量 AI_MATE_LEASE_TIMEOUT 指定等待空闲设备的默认超时（秒），默认 600
+"""
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 600.0
+
+
+def lease_dir() -> str:
+    return os.environ.get("AI_MATE_LEASE_DIR") or os.path.join(tempfile.gettempdir(), "ai_mate_leases")
+
+
+def default_timeout() -> float:
+    return float(os.environ.get("AI_MATE_LEASE_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+def _lock_file(fd: int) -> bool:
+    """非阻塞加锁，已被其他进程持有时返回 False"""
+    if os.name == 'nt':
+        import msvcrt
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    import fcntl
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock_file(fd: int):
+    if os.name == 'nt':
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class DeviceLease:
+    """一台设备的租约（同一进程内不可重入）"""
+
+    def __init__(self, udid: str):
+        self.udid = udid
+        # 无线调试的 serial 形如 192.168.1.5:5555，文件名中替换掉特殊字符
+        self.path = os.path.join(lease_dir(), re.sub(r'[^\w.-]', '_', udid) + ".lock")
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        os.makedirs(lease_dir(), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if not _lock_file(fd):
+            os.close(fd)
+            return False
+        # 记录持有者，排查设备被谁占用时查看
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()} {os.environ.get('PYTEST_XDIST_WORKER', '')} {time.time():.0f}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            _unlock_file(fd)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        if not self.try_acquire():
+            raise TimeoutError(f"设备 {self.udid} 已被其他进程占用")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def lease_devices(udids: Iterable[str], timeout: Optional[float] = None, min_count: int = 1,
+                  poll_interval: float = 2.0) -> List[DeviceLease]:
+    """
+    租用 udids 中当前空闲的设备；空闲设备不足 min_count 台时释放已租到的并等待重试
+    :return: 租到的设备（超时时为空列表）
+    """
+    udids = list(udids)
+    if not udids:
+        return []
+    timeout = default_timeout() if timeout is None else timeout
+    min_count = min(min_count, len(udids))
+    deadline = time.monotonic() + timeout
+    waited = False
+
+    while True:
+        leases = [lease for lease in map(DeviceLease, udids) if lease.try_acquire()]
+        if len(leases) >= min_count:
+            if waited:
+                logger.info(f"🔓 等待后租到 {len(leases)}/{len(udids)} 台设备")
+            return leases
+        release_all(leases)
+        if time.monotonic() >= deadline:
+            logger.warning(f"⏰ {timeout:.0f}s 内没有租到空闲设备（需要 {min_count} 台）")
+            return []
+        if not waited:
+            logger.info(f"⏳ 设备被其他进程占用，等待空闲（最多 {timeout:.0f}s）...")
+            waited = True
+        time.sleep(poll_interval * random.uniform(0.5, 1.5))
+
+
+def release_all(leases: Iterable[DeviceLease]):
+    for lease in leases:
+        lease.release()
@@ -0,0 +1,224 @@
+# utils/device_prep.py
+"""
+运行开始时的设备准备（每台设备一次，设备间并行）
+
+原来每次创建会话都由 Appium 重复：安装/启动 UiAutomator2 server、设备初始化
+（安装 io.appium.settings、关闭动画）、autoGrantPermissions 授权。
+准备阶段通过 adb 一次完成并把结果写入状态文件，之后创建会话时按状态文件追加：
+  - skipServerInstallation     UiAutomator2 server 已安装，且版本与 Appium uiautomator2 驱动自带的 server 一致
+                               （驱动升级后版本不一致，或无法确定任一版本时，仍由会话安装）
+  - skipDeviceInitialization   io.appium.settings 已安装且动画已关闭
+  - disableWindowAnimation=False  动画已关闭，避免会话结束时被 Appium 恢复
+  - autoGrantPermissions=False    应用运行时权限已预先授予
+
+  - 环境变量 AI_MATE_PREP_DIR 指定状态文件目录，默认系统临时目录下的 ai_mate_prep
+  - 状态文件超过 AI_MATE_PREP_MAX_AGE 秒（默认 12 小时）视为过期
+  - 驱动自带的 server 版本从 APPIUM_HOME（默认 ~/.appium）下的 appium-uiautomator2-server 读取，
+    Appium 不在本机时用环境变量 AI_MATE_UIA2_SERVER_VERSION 指定
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ai_mate_tests.utils.adb_channel import get_channel
+
+logger = logging.getLogger(__name__)
+
+UIA2_SERVER_PACKAGES = ["io.appium.uiautomator2.server", "io.appium.uiautomator2.server.test"]
+APPIUM_SETTINGS_PACKAGE = "io.appium.settings"
+ANIMATION_SETTINGS = ["window_animation_scale", "transition_animation_scale", "animator_duration_scale"]
+
+DEFAULT_MAX_AGE = 12 * 3600
+
+_RUNTIME_PERMISSION = re.compile(r"^\s*([\w.]+): granted=false", re.MULTILINE)
+_VERSION_NAME = re.compile(r"versionName=(\S+)")
+
+
+def state_dir() -> str:
+    return os.environ.get("AI_MATE_PREP_DIR") or os.path.join(tempfile.gettempdir(), "ai_mate_prep")
+
+
+@lru_cache(maxsize=1)
+def expected_server_version() -> Optional[str]:
+    """已安装的 Appium uiautomator2 驱动会安装的 server 版本；无法确定时为 None"""
+    version = os.environ.get("AI_MATE_UIA2_SERVER_VERSION")
+    if version:
+        return version
+    appium_home = os.environ.get("APPIUM_HOME") or os.path.join(os.path.expanduser("~"), ".appium")
+    modules = os.path.join(appium_home, "node_modules")
+    for path in (os.path.join(modules, "appium-uiautomator2-driver", "node_modules", "appium-uiautomator2-server"),
+                 os.path.join(modules, "appium-uiautomator2-server")):
+        try:
+            with open(os.path.join(path, "package.json"), 'r', encoding='utf-8') as f:
+                return json.load(f).get('version')
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+@dataclass
+class PrepState:
+    """一台设备的准备结果"""
+    udid: str
+    device_name: str
+    prepared_at: float = 0.0
+    server_installed: bool = False
+    server_version: Optional[str] = None
+    settings_installed: bool = False
+    animations_disabled: bool = False
+    permissions_granted: Dict[str, bool] = field(default_factory=dict)  # 包名 -> 是否已授权
+    app_versions: Dict[str, Optional[str]] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(state_dir(), f"{self.udid}.json")
+
+    def session_capabilities(self, app_package: Optional[str] = None) -> Dict[str, Any]:
+        """根据准备结果可以安全追加的会话能力"""
+        capabilities: Dict[str, Any] = {}
+        # 状态文件可能早于驱动升级，使用时再确认一次版本
+        if self.server_installed and self.server_version and self.server_version == expected_server_version():
+            capabilities['skipServerInstallation'] = True
+        if self.settings_installed and self.animations_disabled:
+            capabilities['skipDeviceInitialization'] = True
+        if self.animations_disabled:
+            capabilities['disableWindowAnimation'] = False
+        if app_package and self.permissions_granted.get(app_package):
+            capabilities['autoGrantPermissions'] = False
+        return capabilities
+
+    def save(self):
+        os.makedirs(state_dir(), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(self), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def load_state(udid: str, max_age: Optional[float] = None) -> Optional[PrepState]:
+    """读取设备的准备状态；不存在或已过期时返回 None"""
+    if max_age is None:
+        max_age = float(os.environ.get("AI_MATE_PREP_MAX_AGE", DEFAULT_MAX_AGE))
+    path = os.path.join(state_dir(), f"{udid}.json")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = PrepState(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+    if time.time() - state.prepared_at > max_age:
+        return None
+    return state
+
+
+class DevicePreparer:
+    """
+    :param config_loader: ConfigLoader，提供设备 UDID 与应用配置
+    """
+
+    def __init__(self, config_loader):
+        self.config_loader = config_loader
+
+    def prepare_all(self, device_names: Optional[List[str]] = None) -> Dict[str, PrepState]:
+        """所有设备并行准备"""
+        device_names = device_names if device_names is not None else self.config_loader.get_all_devices()
+        if not device_names:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(device_names)) as executor:
+            states = dict(zip(device_names, executor.map(self.prepare, device_names)))
+        for device_name, state in states.items():
+            status = "✅" if not state.errors else "⚠️"
+            logger.info(f"{status} {device_name} 设备准备: server={state.server_installed} "
+                        f"settings={state.settings_installed} 动画关闭={state.animations_disabled} "
+                        f"授权={state.permissions_granted} 版本={state.app_versions}"
+                        + (f" 错误={state.errors}" if state.errors else ""))
+        return states
+
+    def prepare(self, device_name: str) -> PrepState:
+        """准备一台设备；每一步独立，失败只影响对应的会话能力"""
+        udid = self.config_loader.get_device_config(device_name)['udid']
+        state = PrepState(udid=udid, device_name=device_name)
+        channel = get_channel(udid)
+
+        steps = [
+            ("server", lambda: self._check_server(channel, state)),
+            ("animations", lambda: self._disable_animations(channel, state)),
+            ("permissions", lambda: self._grant_permissions(channel, state)),
+        ]
+        for name, step in steps:
+            try:
+                step()
+            except Exception as e:
+                state.errors.append(f"{name}: {e}")
+
+        state.prepared_at = time.time()
+        try:
+            state.save()
+        except OSError as e:
+            logger.warning(f"⚠️ {device_name} 准备状态保存失败: {e}")
+        return state
+
+    # ========== 步骤 ==========
+
+    @staticmethod
+    def _installed(channel, package: str) -> bool:
+        output = channel.run(f"pm list packages {package}", timeout=10).output
+        return f"package:{package}" in output.split()
+
+    def _check_server(self, channel, state: PrepState):
+        """
+        UiAutomator2 server（版本与驱动一致）与 io.appium.settings 是否已安装
+        （未安装或版本不一致时由会话安装）
+        """
+        state.settings_installed = self._installed(channel, APPIUM_SETTINGS_PACKAGE)
+        if not all(self._installed(channel, p) for p in UIA2_SERVER_PACKAGES):
+            return
+        output = channel.run(f"dumpsys package {UIA2_SERVER_PACKAGES[0]} | grep -m 1 versionName", timeout=10).output
+        match = _VERSION_NAME.search(output)
+        state.server_version = match.group(1) if match else None
+        expected = expected_server_version()
+        state.server_installed = state.server_version is not None and state.server_version == expected
+        if not state.server_installed:
+            logger.info(f"ℹ️ {state.device_name} UiAutomator2 server 版本 {state.server_version} "
+                        f"与驱动 {expected or '未知'} 不一致，由会话重新安装")
+
+    @staticmethod
+    def _disable_animations(channel, state: PrepState):
+        commands = "; ".join(f"settings put global {name} 0" for name in ANIMATION_SETTINGS)
+        channel.run(commands, timeout=10)
+        values = channel.run("; ".join(f"settings get global {name}" for name in ANIMATION_SETTINGS),
+                             timeout=10).output.split()
+        state.animations_disabled = len(values) == len(ANIMATION_SETTINGS) and all(
+            float(v) == 0 for v in values)
+
+    def _grant_permissions(self, channel, state: PrepState):
+        """按 app_configs.grant_permissions 预先授予运行时权限，并记录应用版本"""
+        for app_name, app_config in self.config_loader.config.get('app_configs', {}).items():
+            package = app_config.get('app_package')
+            if not package:
+                continue
+            dump = channel.run(f"dumpsys package {package}", timeout=15).output
+            match = _VERSION_NAME.search(dump)
+            state.app_versions[package] = match.group(1) if match else None
+
+            permissions = app_config.get('grant_permissions')
+            if not permissions or not match:
+                continue
+            if permissions == "all":
+                permissions = sorted(set(_RUNTIME_PERMISSION.findall(dump)))
+            failed = []
+            for permission in permissions:
+                result = channel.run(f"pm grant {package} {permission}", timeout=10)
+                if result.exit_code != 0:
+                    failed.append(permission)
+            # 部分权限不可授予（非运行时权限等）时保留 autoGrantPermissions
+            state.permissions_granted[package] = not failed
+            if failed:
+                state.errors.append(f"{package} 授权失败: {', '.join(failed)}")
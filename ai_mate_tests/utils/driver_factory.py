@@ -1,12 +1,14 @@
 # utils/driver_factory.py
-from appium import webdriver
-from appium.options.android import UiAutomator2Options
-
 import logging
+import threading
 import time
-import subprocess
+from collections import deque
 
-from ai_mate_tests.utils.config_loader import ConfigLoader
+from ai_mate_tests.utils.adb_channel import get_channel
+from ai_mate_tests.utils.config_loader import get_config_loader
+from ai_mate_tests.utils.device_prep import load_state
+from ai_mate_tests.utils.metrics_store import get_metrics_store
+from ai_mate_tests.utils.readiness import get_readiness_probe
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -15,8 +17,12 @@ logger = logging.getLogger(__name__)
 
 class DriverFactory:
     def __init__(self):
-        self.config_loader = ConfigLoader()
+        self.config_loader = get_config_loader()
         self._created_drivers = {}  # 跟踪已创建的drivers
+        self.switch_timings = deque(maxlen=1000)  # 应用切换耗时记录（只保留最近的，长时间运行内存不增长）
+        self.readiness = get_readiness_probe()
+        # 由 ParallelDriverManager 设置：重建的会话通过管理器创建，登记到管理器并带上 element_manager
+        self.manager = None
 
     def get_driver(self, device_name: str, app_name: str = "ai_mate"):
         """
@@ -24,100 +30,26 @@ class DriverFactory:
         :param device_name: 设备名称，如 "device1", "device2"
         :param app_name: 应用名称，"ai_mate" 或 "settings"
         """
-        # 验证设备配置
-        if not self.config_loader.validate_device_config(device_name):
-            raise ValueError(f"设备 {device_name} 配置验证失败")
-
-        # 获取设备配置
-        device_config = self.config_loader.get_device_capabilities(device_name)
-        appium_server_url = self.config_loader.get_appium_server_url(device_name)
-
-        # 创建Options对象
-        options = UiAutomator2Options()
-
-        # 基础设备配置
-        options.platform_name = device_config["platformName"]
-        options.platform_version = device_config["platformVersion"]
-        options.device_name = device_config["deviceName"]
-        options.automation_name = device_config["automationName"]
-        options.udid = device_config["udid"]
-
-        # 应用配置
-        app_config = self.config_loader.get_app_config(app_name)
-        if not app_config:
-            raise ValueError(f"应用配置 {app_name} 不存在")
-
-        options.app_package = app_config["app_package"]
-        options.app_activity = app_config["app_activity"]
-
-        # 针对不同应用的特定配置 - 主要修改点1：为AI Mate应用添加特殊配置
-        if app_name == "settings":
-            # 为设置应用添加特定配置
-            options.auto_grant_permissions = True
-            options.no_reset = True
-            options.full_reset = False
-            # 增加超时设置
-            options.new_command_timeout = 300
-            options.uiautomator2_server_launch_timeout = 120000
-            options.uiautomator2_server_install_timeout = 120000
-            options.app_wait_duration = 45000
-            # 使用通配符匹配Activity
-            options.app_wait_activity = "*.Settings,com.android.settings.*,com.transsion.*"
-            # 禁用动画以确保稳定启动
-            options.disable_window_animation = True
-        elif app_name == "ai_mate":
-            # AI Mate应用的特殊配置 - 主要修改点2：针对com.transsion.xsound优化
-            options.auto_grant_permissions = True
-            options.no_reset = True  # 系统应用使用no_reset
-            options.full_reset = False
-            # 增加超时设置
-            options.new_command_timeout = 300
-            options.uiautomator2_server_launch_timeout = 90000
-            options.uiautomator2_server_install_timeout = 90000
-            options.app_wait_duration = 30000
-            # 使用通配符匹配Activity
-            options.app_wait_activity = "com.transsion.xsound.*"
-            # 性能优化
-            options.skip_device_initialization = True
-            options.disable_window_animation = True
-
-        # 超时配置
-        options.uiautomator2_server_launch_timeout = device_config.get(
-            "uiautomator2ServerLaunchTimeout",
-            options.uiautomator2_server_launch_timeout
-        )
-        options.uiautomator2_server_install_timeout = device_config.get(
-            "uiautomator2ServerInstallTimeout",
-            options.uiautomator2_server_install_timeout
-        )
-
-        # 其他驱动选项
-        driver_options = self.config_loader.get_driver_options()
-        for key, value in driver_options.items():
-            try:
-                camel_key = self._to_camel_case(key)
-                setattr(options, camel_key, value)
-            except AttributeError as e:
-                logger.debug(f"无法设置驱动选项 {key}: {e}")
-
-        # 对于传音设备的特殊处理
-        if device_config["udid"] == "11467253AU000413":
-            logger.debug("检测到传音设备，应用特殊配置...")
-            # 增加更多启动选项
-            options.disable_android_watchers = True
-            options.skip_device_initialization = True
-            options.skip_server_installation = True
-            options.ignore_unimportant_views = True
+        # 预编译的能力配置（加载配置时已完成校验和合并）
+        profile = self.config_loader.get_capability_profile(device_name, app_name)
+        # 本次运行已完成设备准备时跳过 server 安装、设备初始化和重复授权
+        prep_state = load_state(profile.udid)
+        if prep_state is not None:
+            profile = profile.with_capabilities(prep_state.session_capabilities(profile.app_package))
+        appium_server_url = profile.server_url
+        options = profile.to_options()
 
         logger.info(f"创建 {device_name} 的 {app_name} 应用driver")
 
         try:
             # 主要修改点3：统一应用关闭逻辑，支持AI Mate应用
             if app_name in ["settings", "ai_mate"]:
-                self._ensure_app_closed(device_config["udid"], app_config["app_package"])
-                time.sleep(2)
+                self._ensure_app_closed(profile.udid, profile.app_package)
+                self.readiness.wait_process_gone(profile.udid, profile.app_package)
 
-            # 创建driver
+            # 创建driver（Appium 客户端在首次创建会话时才导入）
+            from appium import webdriver
+            session_start = time.perf_counter()
             driver = webdriver.Remote(
                 command_executor=appium_server_url,
                 options=options
@@ -126,6 +58,13 @@ class DriverFactory:
             # 设置隐式等待
             driver.implicitly_wait(15)
 
+            # 会话创建耗时及设备标签（系统版本、AI Mate 应用版本）写入指标库
+            metrics = get_metrics_store()
+            metrics.record(f"session_create.{app_name}", time.perf_counter() - session_start, device_name)
+            metrics.tag_device(device_name, udid=profile.udid,
+                               os_version=profile.capabilities.get('platformVersion'),
+                               package=self.config_loader.get_app_config("ai_mate").get("app_package"))
+
             # 保存设备信息
             driver.device_name = device_name
             driver.app_name = app_name
@@ -146,17 +85,13 @@ class DriverFactory:
             logger.error(f"❌ 创建 {device_name} 的 {app_name} 应用driver失败: {e}")
 
             # 主要修改点4：统一调试逻辑，支持AI Mate应用
-            self._debug_app_issue(device_config["udid"], app_config["app_package"], app_name)
+            self._debug_app_issue(profile.udid, profile.app_package, app_name)
             raise
 
     def _ensure_app_closed(self, udid, package_name):
         """确保应用已关闭 - 主要修改点5：统一应用关闭方法"""
         try:
-            subprocess.run(
-                f"adb -s {udid} shell am force-stop {package_name}",
-                shell=True,
-                capture_output=True
-            )
+            get_channel(udid).run(f"am force-stop {package_name}")
             logger.debug(f"已强制停止 {package_name} 应用")
         except Exception as e:
             logger.debug(f"停止 {package_name} 应用时出错: {e}")
@@ -166,45 +101,144 @@ class DriverFactory:
         logger.info(f"🔧 调试 {app_name} 应用启动问题...")
 
         try:
+            channel = get_channel(udid)
+
             # 检查当前Activity
-            result = subprocess.run(
-                f"adb -s {udid} shell dumpsys window windows | grep -E 'mCurrentFocus|mFocusedApp'",
-                shell=True,
-                capture_output=True,
-                text=True
-            )
-            logger.info(f"当前窗口焦点: {result.stdout}")
+            result = channel.run("dumpsys window windows | grep -E 'mCurrentFocus|mFocusedApp'")
+            logger.info(f"当前窗口焦点: {result.output}")
 
             # 检查应用进程
-            result = subprocess.run(
-                f"adb -s {udid} shell ps | grep {package_name}",
-                shell=True,
-                capture_output=True,
-                text=True
-            )
-            logger.info(f"{app_name} 应用进程: {result.stdout}")
+            result = channel.run(f"ps -A | grep {package_name}")
+            logger.info(f"{app_name} 应用进程: {result.output}")
 
         except Exception as e:
             logger.debug(f"调试过程中出错: {e}")
 
-    def _to_camel_case(self, snake_str):
-        """将下划线命名法转换为驼峰命名法"""
-        components = snake_str.split('_')
-        return components[0] + ''.join(x.title() for x in components[1:])
-
-    # 以下方法保持不变
-    def switch_application(self, driver, new_app_name: str):
+    def switch_application(self, driver, new_app_name: str, allow_restart: bool = True):
+        """
+        在当前会话内切换应用（terminate/activate），不重建 UiAutomator2 会话
+        :param driver: 当前driver
+        :param new_app_name: 目标应用名称，"ai_mate" 或 "settings"
+        :param allow_restart: 会话内切换失败时是否回退为重建会话
+        :return: 切换后的driver；回退为重建会话时是新的driver，调用方应改用返回值
+        """
         device_name = getattr(driver, 'device_name', 'unknown')
-        logger.info(f"{device_name}: 切换应用到 {new_app_name}")
+        old_app_name = getattr(driver, 'app_name', None)
+        logger.info(f"{device_name}: 切换应用 {old_app_name} -> {new_app_name}")
 
+        app_config = self.config_loader.get_app_config(new_app_name)
+        if not app_config:
+            raise ValueError(f"应用配置 {new_app_name} 不存在")
+
+        start = time.perf_counter()
         try:
-            driver.quit()
-            new_driver = self.get_driver(device_name, new_app_name)
+            # 关闭旧应用（同一应用时相当于重新启动）
+            old_config = self.config_loader.get_app_config(old_app_name) if old_app_name else {}
+            if old_config.get("app_package"):
+                driver.terminate_app(old_config["app_package"])
+
+            # 旧界面的元素句柄全部失效
+            if hasattr(driver, 'element_manager'):
+                driver.element_manager.invalidate_cache()
+
+            self._apply_app_profile(driver, new_app_name, app_config)
+            driver.activate_app(app_config["app_package"])
+            self._wait_for_app_activity(driver, app_config)
+
+            driver.app_name = new_app_name
+            if device_name in self._created_drivers:
+                self._created_drivers[device_name]['app_name'] = new_app_name
+
+            elapsed = time.perf_counter() - start
+            self._record_switch(device_name, old_app_name, new_app_name, "in_session", elapsed)
+            logger.info(f"✅ {device_name}: 会话内切换到 {new_app_name} 完成，耗时 {elapsed:.2f}s")
+            return driver
+
+        except Exception as e:
+            logger.warning(f"{device_name}: 会话内切换到 {new_app_name} 失败: {e}")
+            if not allow_restart:
+                raise
+
+        # 回退：重建会话
+        start = time.perf_counter()
+        try:
+            new_driver = self._restart_session(driver, device_name, new_app_name)
+            elapsed = time.perf_counter() - start
+            self._record_switch(device_name, old_app_name, new_app_name, "restart", elapsed)
+            logger.info(f"🔁 {device_name}: 重建会话切换到 {new_app_name}，耗时 {elapsed:.2f}s")
             return new_driver
         except Exception as e:
             logger.error(f"{device_name}: 切换应用到 {new_app_name} 失败: {e}")
             raise
 
+    def _restart_session(self, driver, device_name: str, app_name: str):
+        """退出旧会话并创建新会话；调用方必须改用返回的 driver"""
+        if self.manager is not None:
+            # 管理器退出登记的旧会话，新会话替换登记并带上 element_manager
+            if self.manager.get_driver(device_name) is not driver:
+                self._quit_quietly(driver, device_name)
+            new_driver = self.manager.create_driver(device_name, app_name)
+            if new_driver is None:
+                raise RuntimeError(f"{device_name}: 重建 {app_name} 会话失败")
+            return new_driver
+
+        from ai_mate_tests.utils.element_manager import ElementManager
+
+        self._quit_quietly(driver, device_name)
+        new_driver = self.get_driver(device_name, app_name)
+        new_driver.element_manager = ElementManager(new_driver.config_loader, device_name)
+        return new_driver
+
+    def _quit_quietly(self, driver, device_name: str):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"{device_name}: 退出旧driver时出错: {e}")
+        self._created_drivers.pop(device_name, None)
+
+    def _apply_app_profile(self, driver, app_name: str, app_config: dict):
+        """在会话内应用目标应用的配置（权限授予）"""
+        permissions = app_config.get("grant_permissions")
+        if not permissions:
+            return
+
+        try:
+            driver.execute_script("mobile: changePermissions", {
+                "permissions": permissions,
+                "appPackage": app_config["app_package"],
+                "action": "grant",
+            })
+        except Exception as e:
+            # 授权失败不影响切换，交给应用自身处理
+            logger.debug(f"为 {app_name} 授予权限失败: {e}")
+
+    def _wait_for_app_activity(self, driver, app_config: dict):
+        """等待目标应用的Activity获得焦点"""
+        patterns = [p.strip() for p in app_config.get("app_wait_activity", "").split(",") if p.strip()]
+        package = app_config["app_package"]
+        timeout = app_config.get("app_wait_duration", 30000) / 1000
+
+        result = self.readiness.wait_activity_focused(driver, patterns, package, timeout)
+        if not result.ok:
+            raise TimeoutError(f"等待 {package} 启动超时 ({result.elapsed:.1f}s)")
+
+    def _record_switch(self, device_name, old_app_name, new_app_name, mode, elapsed):
+        """记录应用切换耗时"""
+        self.switch_timings.append({
+            'device_name': device_name,
+            'from_app': old_app_name,
+            'to_app': new_app_name,
+            'mode': mode,
+            'elapsed': elapsed,
+        })
+        get_metrics_store().record(f"app_switch.{mode}", elapsed, device_name)
+
+    def get_switch_timings(self, device_name: str = None):
+        """获取应用切换耗时记录"""
+        if device_name is None:
+            return list(self.switch_timings)
+        return [t for t in self.switch_timings if t['device_name'] == device_name]
+
     def restart_driver(self, device_name: str, app_name: str = None):
         if device_name in self._created_drivers:
             try:
@@ -247,18 +281,36 @@ class DriverFactory:
         logger.info("所有driver退出完成")
 
 
-# 创建全局实例
-driver_factory = DriverFactory()
+# 全局实例延迟到首次使用时创建
+_driver_factory = None
+_driver_factory_lock = threading.Lock()
+
+
+def get_driver_factory() -> DriverFactory:
+    """获取全局 DriverFactory 实例"""
+    global _driver_factory
+    if _driver_factory is None:
+        with _driver_factory_lock:
+            if _driver_factory is None:
+                _driver_factory = DriverFactory()
+    return _driver_factory
+
+
+def __getattr__(name):
+    # 兼容 from ai_mate_tests.utils.driver_factory import driver_factory
+    if name == "driver_factory":
+        return get_driver_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # 兼容原有接口的函数
 def get_driver(device_name="device1", app_name="ai_mate"):
-    return driver_factory.get_driver(device_name, app_name)
+    return get_driver_factory().get_driver(device_name, app_name)
 
 
 def switch_app(driver, new_app_name: str):
-    return driver_factory.switch_application(driver, new_app_name)
+    return get_driver_factory().switch_application(driver, new_app_name)
 
 
 def restart_driver(device_name: str, app_name: str = None):
-    return driver_factory.restart_driver(device_name, app_name)
\ No newline at end of file
+    return get_driver_factory().restart_driver(device_name, app_name)
\ No newline at end of file
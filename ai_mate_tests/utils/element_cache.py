@@ -0,0 +1,216 @@
+# utils/element_cache.py
+"""
+WebElement 句柄缓存
+
+同一界面上重复操作同一配置元素时复用已解析的句柄，省去 find_element 往返。
+只用于 click/get_text/get_cached_element 这类句柄失效时可以重新查找并重试的操作；
+查找、等待和存在性检查（find_element、is_displayed）始终询问服务端，
+否则节点消失（或应用重启后停留在同一 Activity）时仍会命中旧句柄。
+失效条件：
+  - 使用句柄时服务端返回 stale element（由 CachedElement 透明地重新查找并重试）
+  - 当前 Activity / 包名变化（距上次确认超过 navigation_ttl 时才查询一次）
+  - 会话变化（driver 重建）
+  - 显式 invalidate()（切换应用、返回等导航操作）
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+_stale_exception = None
+
+
+def _stale_error():
+    """StaleElementReferenceException（首次使用时才导入 Selenium）"""
+    global _stale_exception
+    if _stale_exception is None:
+        from selenium.common.exceptions import StaleElementReferenceException
+        _stale_exception = StaleElementReferenceException
+    return _stale_exception
+
+
+def cache_enabled_by_default() -> bool:
+    """环境变量 AI_MATE_ELEMENT_CACHE=0 可关闭缓存"""
+    return os.environ.get("AI_MATE_ELEMENT_CACHE", "1") not in ("0", "false", "no")
+
+
+class _Entry(NamedTuple):
+    element: object
+    session_id: Optional[str]
+
+
+class CachedElement:
+    """
+    缓存元素代理：对页面对象表现为普通 WebElement，
+    遇到 stale 错误时重新查找一次并重试原操作
+    """
+
+    def __init__(self, cache: "ElementCache", driver, element_key: str, element, resolve: Callable):
+        self._cache = cache
+        self._driver = driver
+        self._element_key = element_key
+        self._element = element
+        self._resolve = resolve
+
+    def _call(self, action: Callable):
+        try:
+            return action(self._element)
+        except _stale_error():
+            self._element = self._cache.refresh(self._driver, self._element_key, self._resolve)
+            return action(self._element)
+
+    def click(self):
+        return self._call(lambda e: e.click())
+
+    def clear(self):
+        return self._call(lambda e: e.clear())
+
+    def send_keys(self, *value):
+        return self._call(lambda e: e.send_keys(*value))
+
+    def get_attribute(self, name):
+        return self._call(lambda e: e.get_attribute(name))
+
+    def is_displayed(self):
+        return self._call(lambda e: e.is_displayed())
+
+    def is_enabled(self):
+        return self._call(lambda e: e.is_enabled())
+
+    def is_selected(self):
+        return self._call(lambda e: e.is_selected())
+
+    @property
+    def text(self):
+        return self._call(lambda e: e.text)
+
+    @property
+    def rect(self):
+        return self._call(lambda e: e.rect)
+
+    @property
+    def id(self):
+        return self._element.id
+
+    @property
+    def wrapped_element(self):
+        return self._element
+
+    def __getattr__(self, name):
+        # 其余属性和方法直接转发，不做 stale 重试
+        return getattr(self._element, name)
+
+    def __eq__(self, other):
+        other = other.wrapped_element if isinstance(other, CachedElement) else other
+        return self._element == other
+
+    def __hash__(self):
+        return hash(self._element)
+
+    def __repr__(self):
+        return f"<CachedElement {self._element_key} {self._element!r}>"
+
+
+class ElementCache:
+    """
+    单台设备的元素句柄缓存，键为元素配置键名
+
+    :param navigation_ttl: 命中缓存时，距上次确认当前 Activity 超过该秒数才重新查询
+    """
+
+    def __init__(self, device_name: str, navigation_ttl: float = 2.0, enabled: Optional[bool] = None):
+        self.device_name = device_name
+        self.navigation_ttl = navigation_ttl
+        self.enabled = cache_enabled_by_default() if enabled is None else enabled
+        self._entries: Dict[str, _Entry] = {}
+        self._token: Optional[Tuple[str, str]] = None
+        self._token_checked_at = 0.0
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'invalidations': 0, 'navigation_checks': 0}
+
+    # ========== 查询 ==========
+
+    def get(self, driver, element_key: str, resolve: Callable):
+        """
+        返回缓存元素代理；未命中时调用 resolve() 查找并缓存
+        :param resolve: 无参函数，返回新查找的 WebElement
+        """
+        if not self.enabled:
+            return resolve()
+
+        with self._lock:
+            session_id = getattr(driver, 'session_id', None)
+            entry = self._entries.get(element_key)
+            if entry is not None and entry.session_id == session_id and self._screen_unchanged(driver):
+                self.stats['hits'] += 1
+                return CachedElement(self, driver, element_key, entry.element, resolve)
+
+            self.stats['misses'] += 1
+            element = resolve()
+            self._store(driver, element_key, element)
+            return CachedElement(self, driver, element_key, element, resolve)
+
+    def refresh(self, driver, element_key: str, resolve: Callable):
+        """句柄已失效：重新查找并替换缓存"""
+        with self._lock:
+            self.stats['stale'] += 1
+            # 元素失效通常意味着界面已变化，其余句柄也不再可信
+            self._entries.clear()
+            self._token_checked_at = 0.0
+            element = resolve()
+            self._store(driver, element_key, element)
+            return element
+
+    def _store(self, driver, element_key: str, element):
+        if not self._entries:
+            # 刚查找到的元素一定属于当前界面；Activity 令牌留到 TTL 过期时再确认，避免每次未命中多两次往返
+            self._token_checked_at = time.monotonic()
+        self._entries[element_key] = _Entry(element, getattr(driver, 'session_id', None))
+
+    # ========== 导航检测 ==========
+
+    @staticmethod
+    def _current_token(driver) -> Optional[Tuple[str, str]]:
+        try:
+            return driver.current_package, driver.current_activity
+        except Exception:
+            return None
+
+    def _screen_unchanged(self, driver) -> bool:
+        """Activity/包名未变化；在 navigation_ttl 内直接认为未变化，令牌未知时按已变化处理"""
+        now = time.monotonic()
+        if now - self._token_checked_at < self.navigation_ttl:
+            return True
+
+        self.stats['navigation_checks'] += 1
+        token = self._current_token(driver)
+        self._token_checked_at = now
+        if token is None or token != self._token:
+            self._entries.clear()
+            self._token = token
+            self.stats['invalidations'] += 1
+            return False
+        return True
+
+    def invalidate(self, element_key: Optional[str] = None):
+        """清除指定元素或全部缓存（导航操作后调用）"""
+        with self._lock:
+            if element_key is None:
+                self._entries.clear()
+                self._token = None
+                self._token_checked_at = 0.0
+            else:
+                self._entries.pop(element_key, None)
+            self.stats['invalidations'] += 1
+
+    # ========== 统计 ==========
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'device_name': self.device_name,
+                **self.stats,
+                'size': len(self._entries),
+                'hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+            }
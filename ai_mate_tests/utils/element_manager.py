@@ -1,51 +1,75 @@
 # utils/element_manager.py
-from typing import List
-from appium.webdriver import WebElement
-from appium.webdriver.common.appiumby import AppiumBy
-from appium.webdriver.webdriver import WebDriver
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-from ai_mate_tests.utils.config_loader import ConfigLoader
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from ai_mate_tests.utils.config_loader import BY_MAPPING, ConfigLoader
+from ai_mate_tests.utils.element_cache import ElementCache
+from ai_mate_tests.utils.gestures import GestureBuilder
+from ai_mate_tests.utils.locator_stats import LocatorStats, get_locator_stats
+from ai_mate_tests.utils.metrics_store import get_metrics_store
+
+if TYPE_CHECKING:
+    from appium.webdriver import WebElement
+    from appium.webdriver.webdriver import WebDriver
 
 
 class ElementManager:
-    def __init__(self, config_loader: ConfigLoader, device_name: str):
+    def __init__(self, config_loader: ConfigLoader, device_name: str, cache: Optional[ElementCache] = None,
+                 locator_stats: Optional[LocatorStats] = None):
         self.config_loader = config_loader
         self.device_name = device_name
+        # 按配置键名缓存已解析的元素句柄，页面对象无感知
+        self.cache = cache or ElementCache(device_name)
+        # 元素键名 -> [(by, value), ...]，按配置顺序
+        self._strategies: Dict[str, List[Tuple[str, str]]] = {}
+        self._locator_stats = locator_stats
+        # 配置热加载后丢弃按旧配置解析的定位和元素句柄，会话保持不变
+        config_loader.add_reload_listener(self._on_config_reload)
+        # 每条设备操作持有该锁，后台弹窗拦截器检查和关闭弹窗时也持有，两者不会交错；
+        # 显式等待只在每次查找时持有，等待期间拦截器仍可关闭挡住元素的弹窗
+        self.action_lock = threading.RLock()
 
     # 实例方法 - 需要使用实例属性
     def click(self, driver: WebDriver, element_key: str) -> None:
         """点击元素 - 对应BasePage的click方法"""
-        by, locator = self._get_locator(element_key)
-        driver.find_element(by, locator).click()
+        start = time.monotonic()
+        with self.action_lock:
+            self._cached(driver, element_key).click()
+        get_metrics_store().record(f"step.click.{element_key}", time.monotonic() - start, self.device_name)
 
     # 静态方法 - 不依赖实例状态
     @staticmethod
     def click_by_xpath(driver: WebDriver, xpath: str) -> None:
         """通过xpath点击 - 对应BasePage的click_by_xpath方法"""
-        driver.find_element(AppiumBy.XPATH, xpath).click()
+        driver.find_element(BY_MAPPING['xpath'], xpath).click()
 
     @staticmethod
     def click_by_accessibility_id(driver: WebDriver, acc_id: str) -> None:
         """通过accessibility_id点击 - 对应BasePage的click_by_accessibility_id方法"""
-        driver.find_element(AppiumBy.ACCESSIBILITY_ID, acc_id).click()
+        driver.find_element(BY_MAPPING['accessibility_id'], acc_id).click()
 
     @staticmethod
     def click_by_text(driver: WebDriver, text: str) -> None:
         """通过文本点击 - 对应BasePage的click_by_text方法"""
-        driver.find_element(AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().text("{text}")').click()
+        driver.find_element(BY_MAPPING['android_uiautomator'], f'new UiSelector().text("{text}")').click()
 
-    @staticmethod
-    def tap_coordinate(driver: WebDriver, x: int, y: int) -> None:
+    def tap_coordinate(self, driver: WebDriver, x: int, y: int) -> None:
         """点击坐标"""
-        driver.tap([(x, y)])
+        self.gestures(driver).tap(x, y).perform()
+
+    def gestures(self, driver: WebDriver, tap_gap_ms: int = 100) -> GestureBuilder:
+        """手势构建器：排队的点击/滑动在 perform() 时合并为一个 W3C actions 请求"""
+        return GestureBuilder(self, driver, tap_gap_ms=tap_gap_ms)
 
     # 实例方法 - 需要使用实例属性
     def is_displayed(self, driver: WebDriver, element_key: str) -> bool:
         """检查元素是否显示 - 对应BasePage的is_displayed方法"""
+        # 存在性检查必须询问服务端：缓存的句柄在节点消失后仍可能命中
         try:
-            by, locator = self._get_locator(element_key)
-            return driver.find_element(by, locator).is_displayed()
+            with self.action_lock:
+                return self._locate(driver, element_key).is_displayed()
         except Exception:
             return False
 
@@ -58,10 +82,17 @@ class ElementManager:
         :param timeout: 等待时间（秒）
         :return: 找到的WebElement
         """
-        by, locator = self._get_locator(element_key)
-        return WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((by, locator))
-        )
+        # 查找/等待始终询问服务端，调用方常用它判断元素是否存在
+        return self._locate(driver, element_key, timeout)
+
+    def get_cached_element(self, driver: WebDriver, element_key: str, timeout: int = 5) -> WebElement:
+        """
+        缓存的元素句柄，用于同一界面上反复操作的元素（如蓝牙开关）；
+        句柄失效时重新查找并重试原操作。判断元素是否存在请用 find_element / is_displayed
+
+        :param timeout: 未命中缓存时的等待时间（秒）
+        """
+        return self._cached(driver, element_key, timeout)
 
     def find_elements(self, driver: WebDriver, element_key: str, timeout: int = 5) -> List[WebElement]:
         """
@@ -72,33 +103,106 @@ class ElementManager:
         :param timeout: 等待时间（秒）
         :return: 找到的WebElement列表
         """
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
         by, locator = self._get_locator(element_key)
-        return WebDriverWait(driver, timeout).until(
-            EC.presence_of_all_elements_located((by, locator))
-        )
+        return WebDriverWait(driver, timeout).until(self._locked(EC.presence_of_all_elements_located((by, locator))))
 
     def input_text(self, driver: WebDriver, element_key: str, text: str) -> None:
         """输入文本"""
         element = self.find_element(driver, element_key)
-        element.clear()
-        element.send_keys(text)
+        with self.action_lock:
+            element.clear()
+            element.send_keys(text)
 
     def get_text(self, driver: WebDriver, element_key: str) -> str:
         """获取元素文本"""
-        element = self.find_element(driver, element_key)
-        return element.text
+        element = self._cached(driver, element_key, timeout=5)
+        with self.action_lock:
+            return element.text
+
+    def _cached(self, driver: WebDriver, element_key: str, timeout: Optional[float] = None):
+        """缓存的元素句柄，只用于可重试的操作：句柄失效时 CachedElement 重新查找并重试原操作"""
+        return self.cache.get(driver, element_key, lambda: self._locate(driver, element_key, timeout))
 
     def _get_locator(self, element_key: str) -> tuple[str, str]:
-        """内部方法：获取定位器"""
-        locator_config = self.config_loader.get_element_locator(self.device_name, element_key)
-        result = ConfigLoader.convert_locator_to_appium_format(locator_config)
-        # 类型安全转换
-        if isinstance(result, tuple) and len(result) == 2:
-            return result[0], result[1]
-        elif isinstance(result, list) and len(result) == 2:
-            return result[0], result[1]
-        else:
-            raise ValueError(f"Invalid locator format: {result}")
+        """内部方法：获取定位器（配置了多个策略时返回当前排名第一的策略）"""
+        strategies = self._get_strategies(element_key)
+        if len(strategies) == 1:
+            return strategies[0]
+        return self.locator_stats.order(self.device_name, element_key, strategies)[0]
+
+    # ========== 多策略定位 ==========
+
+    @property
+    def locator_stats(self) -> LocatorStats:
+        if self._locator_stats is None:
+            self._locator_stats = get_locator_stats(getattr(self.config_loader, 'config_path', None))
+        return self._locator_stats
+
+    def _get_strategies(self, element_key: str) -> List[Tuple[str, str]]:
+        """元素的全部定位策略（Appium 格式，按配置顺序）"""
+        # 热加载会整体替换 _strategies，先取出引用，旧配置的结果不会写入新字典
+        cached = self._strategies
+        strategies = cached.get(element_key)
+        if strategies is None:
+            strategies = []
+            for locator_config in self.config_loader.get_element_strategies(self.device_name, element_key):
+                by, value = ConfigLoader.convert_locator_to_appium_format(locator_config)
+                strategies.append((by, value))
+            cached[element_key] = strategies
+        return strategies
+
+    def _locate(self, driver: WebDriver, element_key: str, timeout: Optional[float] = None) -> WebElement:
+        """
+        查找元素；只有一个策略时与原有逻辑一致，
+        多个策略时按统计排序依次尝试，并记录每个策略的结果和耗时
+        :param timeout: 显式等待时间（秒），None 表示只查找一轮
+        """
+        strategies = self._get_strategies(element_key)
+        if timeout is None:
+            with self.action_lock:
+                if len(strategies) == 1:
+                    return driver.find_element(*strategies[0])
+                return self._try_strategies(driver, element_key, strategies, raise_missing=True)
+
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        if len(strategies) == 1:
+            return WebDriverWait(driver, timeout).until(self._locked(EC.presence_of_element_located(strategies[0])))
+        return WebDriverWait(driver, timeout).until(
+            self._locked(lambda d: self._try_strategies(d, element_key, strategies)))
+
+    def _locked(self, condition):
+        """WebDriverWait 条件：每次查找时持有 action_lock，两次查找之间释放"""
+        def locked_condition(driver):
+            with self.action_lock:
+                return condition(driver)
+        return locked_condition
+
+    def _try_strategies(self, driver: WebDriver, element_key: str, strategies: List[Tuple[str, str]],
+                        raise_missing: bool = False):
+        """按排序尝试每个策略一次；都找不到时返回 False（供 WebDriverWait 继续轮询）"""
+        from selenium.common.exceptions import NoSuchElementException
+
+        stats = self.locator_stats
+        error = None
+        for strategy in stats.order(self.device_name, element_key, strategies):
+            start = time.monotonic()
+            try:
+                element = driver.find_element(*strategy)
+            except NoSuchElementException as e:
+                stats.record(self.device_name, element_key, strategy, False, time.monotonic() - start)
+                error = e
+                continue
+            stats.record(self.device_name, element_key, strategy, True, time.monotonic() - start)
+            return element
+
+        if raise_missing:
+            raise error
+        return False
 
     def _get_locator_by_page(self, page: str, element_key: str) -> tuple[str, str]:
         """内部方法：按页面获取定位器"""
@@ -120,7 +224,8 @@ class ElementManager:
         for text_config in success_texts:
             try:
                 by, value = ConfigLoader.convert_locator_to_appium_format(text_config)
-                element = driver.find_element(by, value)
+                with self.action_lock:
+                    element = driver.find_element(by, value)
                 if element:
                     found_elements.append(element)
             except Exception:
@@ -134,4 +239,18 @@ class ElementManager:
         if coords:
             self.tap_coordinate(driver, coords['x'], coords['y'])
             return True
-        return False
\ No newline at end of file
+        return False
+
+    def _on_config_reload(self, config_loader: ConfigLoader) -> None:
+        self._strategies = {}
+        self.cache.invalidate()
+
+    # ========== 元素缓存 ==========
+
+    def invalidate_cache(self, element_key: Optional[str] = None) -> None:
+        """导航（切换应用、返回等）后清除缓存的元素句柄"""
+        self.cache.invalidate(element_key)
+
+    def cache_stats(self) -> Dict[str, float]:
+        """缓存命中统计"""
+        return self.cache.get_stats()
@@ -0,0 +1,167 @@
+# utils/gestures.py
+"""
+W3C actions 手势构建器
+
+把点击、滑动、停顿等操作排入同一个 pointer 输入源，flush 时作为一个 actions 请求发送，
+多步操作只需一次往返。
+
+    element_manager.gestures(driver) \\
+        .tap_config_coords() \\
+        .swipe(540, 1800, 540, 600) \\
+        .tap_element("bluetooth_option") \\
+        .perform()
+
+注意：tap_element 的元素在 perform() 时才向服务端查找（不使用元素缓存），整个序列一次发送，
+因此只能引用发送前已在当前界面上的元素；会导致跳转或界面重绘的点击之后要点击的元素，
+应在该点击执行后再单独查找和点击（不能合并进同一序列）。
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from ai_mate_tests.utils.element_manager import ElementManager
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+# Selenium 中 W3C actions 命令的名称（Command.W3C_ACTIONS）
+W3C_ACTIONS_COMMAND = "actions"
+
+
+class _ElementOrigin(NamedTuple):
+    """排队时的元素占位，perform() 时解析为元素 ID"""
+    element_key: str
+
+
+class GestureBuilder:
+    """
+    :param tap_gap_ms: 相邻两次点击之间的停顿，给界面响应留时间（在设备端执行，不增加往返）
+    """
+
+    def __init__(self, element_manager: "ElementManager", driver, pointer_id: str = "finger1",
+                 tap_gap_ms: int = 100):
+        self.element_manager = element_manager
+        self.driver = driver
+        self.pointer_id = pointer_id
+        self.tap_gap_ms = tap_gap_ms
+        self._actions: List[Dict] = []
+        self._gestures = 0
+
+    def __len__(self):
+        return self._gestures
+
+    # ========== 基础动作 ==========
+
+    def _separate(self):
+        if self._gestures and self.tap_gap_ms:
+            self._actions.append({"type": "pause", "duration": self.tap_gap_ms})
+        self._gestures += 1
+
+    def _move(self, x: int, y: int, duration_ms: int = 0, origin="viewport"):
+        self._actions.append({"type": "pointerMove", "duration": duration_ms,
+                              "x": int(x), "y": int(y), "origin": origin})
+
+    def _press(self, hold_ms: int):
+        self._actions.append({"type": "pointerDown", "button": 0})
+        if hold_ms:
+            self._actions.append({"type": "pause", "duration": hold_ms})
+        self._actions.append({"type": "pointerUp", "button": 0})
+
+    # ========== 手势 ==========
+
+    def tap(self, x: int, y: int, duration_ms: int = 100) -> "GestureBuilder":
+        """点击坐标"""
+        self._separate()
+        self._move(x, y)
+        self._press(duration_ms)
+        return self
+
+    def tap_sequence(self, points: Iterable[Tuple[int, int]], duration_ms: int = 100) -> "GestureBuilder":
+        """依次点击多个坐标"""
+        for x, y in points:
+            self.tap(x, y, duration_ms)
+        return self
+
+    def tap_element(self, element_key: str, offset_x: int = 0, offset_y: int = 0,
+                    duration_ms: int = 100) -> "GestureBuilder":
+        """点击配置元素的中心（元素在 perform() 时解析）"""
+        self._separate()
+        self._move(offset_x, offset_y, origin=_ElementOrigin(element_key))
+        self._press(duration_ms)
+        return self
+
+    def tap_config_coords(self, duration_ms: int = 100) -> "GestureBuilder":
+        """点击配置中的弹窗关闭坐标（popup_close_coords），未配置时不添加"""
+        coords = self.element_manager.config_loader.get_popup_close_coords(self.element_manager.device_name)
+        if coords:
+            self.tap(coords['x'], coords['y'], duration_ms)
+        return self
+
+    def swipe(self, start_x: int, start_y: int, end_x: int, end_y: int,
+              duration_ms: int = 800) -> "GestureBuilder":
+        """滑动"""
+        self._separate()
+        self._move(start_x, start_y)
+        self._actions.append({"type": "pointerDown", "button": 0})
+        self._move(end_x, end_y, duration_ms)
+        self._actions.append({"type": "pointerUp", "button": 0})
+        return self
+
+    def pause(self, duration_ms: int) -> "GestureBuilder":
+        """显式停顿"""
+        self._actions.append({"type": "pause", "duration": int(duration_ms)})
+        return self
+
+    # ========== 发送 ==========
+
+    def _resolve(self, origin) -> Dict[str, str]:
+        # 不经过元素缓存，每次都向服务端查找当前界面上的元素
+        element_id = self.element_manager.find_element(self.driver, origin.element_key).id
+        return {ELEMENT_KEY: element_id, "ELEMENT": element_id}
+
+    def payload(self) -> Optional[Dict]:
+        """W3C actions 请求体（此时解析 tap_element 的元素）；没有排队的动作时返回 None"""
+        if not self._actions:
+            return None
+        actions = []
+        for action in self._actions:
+            if isinstance(action.get("origin"), _ElementOrigin):
+                action = dict(action, origin=self._resolve(action["origin"]))
+            actions.append(action)
+        return {"actions": [{
+            "type": "pointer",
+            "id": self.pointer_id,
+            "parameters": {"pointerType": "touch"},
+            "actions": actions,
+        }]}
+
+    def perform(self) -> int:
+        """发送所有排队动作（一次请求）并清空队列，返回手势数量"""
+        from selenium.common.exceptions import StaleElementReferenceException
+
+        try:
+            # 解析元素和发送之间不让后台弹窗拦截器插入点击
+            with self.element_manager.action_lock:
+                payload = self.payload()
+                if payload is not None:
+                    try:
+                        self.driver.execute(W3C_ACTIONS_COMMAND, payload)
+                    except StaleElementReferenceException:
+                        # 查找与发送之间界面刷新：清除缓存的句柄，重新查找后重试一次
+                        self.element_manager.invalidate_cache()
+                        self.driver.execute(W3C_ACTIONS_COMMAND, self.payload())
+            return self._gestures
+        finally:
+            self._actions = []
+            self._gestures = 0
+
+    flush = perform
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # 构建过程中出错时丢弃队列，不发送半截序列
+        if exc_type is None:
+            self.perform()
+        else:
+            self._actions = []
+            self._gestures = 0
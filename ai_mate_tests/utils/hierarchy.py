@@ -0,0 +1,297 @@
+# utils/hierarchy.py
+"""
+UI 层级（page source / uiautomator dump）的解析与本地定位
+
+支持与 config.yaml 相同的定位方式，在不访问设备的情况下对层级快照求值：
+xpath（常用子集）、accessibility id、class name、id、-android uiautomator（UiSelector 常用方法）
+"""
+import re
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+# uiautomator dump 与 Appium page source 共有的属性
+NODE_ATTRIBUTES = [
+    'index', 'package', 'class', 'text', 'resource-id', 'content-desc', 'checkable', 'checked',
+    'clickable', 'enabled', 'focusable', 'focused', 'scrollable', 'long-clickable', 'password',
+    'selected', 'bounds',
+]
+
+# Appium getAttribute 使用的名称 -> 层级属性名
+ATTRIBUTE_ALIASES = {
+    'contentDescription': 'content-desc',
+    'content-desc': 'content-desc',
+    'name': 'content-desc',
+    'resourceId': 'resource-id',
+    'resource-id': 'resource-id',
+    'className': 'class',
+    'class': 'class',
+    'longClickable': 'long-clickable',
+}
+
+_BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+def parse_hierarchy(xml_text: str) -> ET.Element:
+    """
+    解析层级 XML，统一为 Appium page source 格式（标签名即控件类名）
+    uiautomator dump 的 <node class="..."> 会被转换为 <android.widget.Xxx ...>
+    """
+    root = ET.fromstring(xml_text.encode('utf-8') if isinstance(xml_text, str) else xml_text)
+    for element in root.iter():
+        if element.tag == 'node' and element.get('class'):
+            element.tag = element.get('class')
+    return root
+
+
+def to_source(root: ET.Element) -> str:
+    """序列化为 page source 字符串"""
+    return "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>" + ET.tostring(root, encoding='unicode')
+
+
+def parse_bounds(bounds: str) -> Optional[Tuple[int, int, int, int]]:
+    """"[x1,y1][x2,y2]" -> (x1, y1, x2, y2)"""
+    match = _BOUNDS_RE.match(bounds or "")
+    if not match:
+        return None
+    return tuple(int(v) for v in match.groups())
+
+
+def element_at(root: ET.Element, x: int, y: int) -> Optional[ET.Element]:
+    """坐标命中的最深层节点"""
+    hit = None
+    for element in root.iter():
+        bounds = parse_bounds(element.get('bounds'))
+        if bounds and bounds[0] <= x < bounds[2] and bounds[1] <= y < bounds[3]:
+            hit = element
+    return hit
+
+
+def get_attribute(element: ET.Element, name: str) -> Optional[str]:
+    """按 Appium 属性名读取节点属性"""
+    return element.get(ATTRIBUTE_ALIASES.get(name, name))
+
+
+# ========== XPath 子集 ==========
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+      (?P<string>"[^"]*"|'[^']*')
+    | (?P<number>\d+)
+    | (?P<op>!=|=|\(|\)|,|@)
+    | (?P<name>[A-Za-z_][\w.\-]*(?:\(\))?)
+    )""", re.VERBOSE)
+
+
+class _Predicate:
+    """谓词表达式的递归下降解析，支持 and/or、=、!=、contains()、starts-with()、text()、位置"""
+
+    def __init__(self, text: str):
+        self.tokens = []
+        pos = 0
+        while pos < len(text):
+            match = _TOKEN_RE.match(text, pos)
+            if not match or match.end() == pos:
+                if text[pos:].strip() == "":
+                    break
+                raise ValueError(f"不支持的 xpath 谓词: {text}")
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind)))
+            pos = match.end()
+        self.pos = 0
+        self.expr = self._parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"不支持的 xpath 谓词: {text}")
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self, value=None):
+        token = self._peek()
+        if value is not None and token[1] != value:
+            raise ValueError(f"xpath 谓词期望 {value}，实际 {token[1]}")
+        self.pos += 1
+        return token
+
+    def _parse_or(self):
+        left = self._parse_and()
+        while self._peek() == ('name', 'or'):
+            self._take()
+            right = self._parse_and()
+            left = (lambda a, b: lambda e, p: a(e, p) or b(e, p))(left, right)
+        return left
+
+    def _parse_and(self):
+        left = self._parse_cmp()
+        while self._peek() == ('name', 'and'):
+            self._take()
+            right = self._parse_cmp()
+            left = (lambda a, b: lambda e, p: a(e, p) and b(e, p))(left, right)
+        return left
+
+    def _parse_cmp(self):
+        left = self._parse_value()
+        if self._peek()[1] in ('=', '!='):
+            op = self._take()[1]
+            right = self._parse_value()
+            if op == '=':
+                return lambda e, p: _equals(left(e, p), right(e, p))
+            return lambda e, p: not _equals(left(e, p), right(e, p))
+        return left
+
+    def _parse_value(self):
+        kind, value = self._take()
+        if kind == 'string':
+            literal = value[1:-1]
+            return lambda e, p: literal
+        if kind == 'number':
+            number = int(value)
+            return lambda e, p: number
+        if value == '@':
+            attr = self._take()[1]
+            return lambda e, p: e.get(attr)
+        if value == '(':
+            inner = self._parse_or()
+            self._take(')')
+            return inner
+        if value == 'text()':
+            return lambda e, p: e.get('text')
+        if value == 'last()':
+            raise ValueError("不支持 last()")
+        if value in ('contains', 'starts-with'):
+            self._take('(')
+            first = self._parse_value()
+            self._take(',')
+            second = self._parse_value()
+            self._take(')')
+            if value == 'contains':
+                return lambda e, p: (second(e, p) or '') in (first(e, p) or '')
+            return lambda e, p: (first(e, p) or '').startswith(second(e, p) or '')
+        if value == 'not':
+            self._take('(')
+            inner = self._parse_or()
+            self._take(')')
+            return lambda e, p: not inner(e, p)
+        raise ValueError(f"不支持的 xpath 片段: {value}")
+
+    def __call__(self, element, position):
+        result = self.expr(element, position)
+        # 谓词结果为数字时表示位置，如 ImageView[2]
+        if isinstance(result, int) and not isinstance(result, bool):
+            return result == position
+        return bool(result)
+
+
+def _equals(left, right) -> bool:
+    """XPath 比较：一侧为数字时按数字比较"""
+    if isinstance(left, int) != isinstance(right, int):
+        try:
+            return int(left) == int(right)
+        except (TypeError, ValueError):
+            return False
+    return left == right
+
+
+_STEP_RE = re.compile(r"(//|/)?([^/\[]+)((?:\[(?:[^\[\]\"']|\"[^\"]*\"|'[^']*')*\])*)")
+_PRED_RE = re.compile(r"\[((?:[^\[\]\"']|\"[^\"]*\"|'[^']*')*)\]")
+
+
+@lru_cache(maxsize=256)
+def _compile_xpath(xpath: str):
+    steps = []
+    pos = 0
+    xpath = xpath.strip()
+    while pos < len(xpath):
+        match = _STEP_RE.match(xpath, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"不支持的 xpath: {xpath}")
+        axis = 'descendant' if match.group(1) == '//' else 'child'
+        name = match.group(2).strip()
+        predicates = [_Predicate(p) for p in _PRED_RE.findall(match.group(3) or "")]
+        steps.append((axis, name, predicates))
+        pos = match.end()
+    return steps
+
+
+def _xpath_find(document: ET.Element, xpath: str) -> List[ET.Element]:
+    steps = _compile_xpath(xpath)
+    order = {id(e): i for i, e in enumerate(document.iter())}
+    contexts = [document]
+
+    for axis, name, predicates in steps:
+        if name == '.':
+            continue
+        results = {}
+        for context in contexts:
+            parents = context.iter() if axis == 'descendant' else [context]
+            for parent in parents:
+                matched = [c for c in parent if name == '*' or c.tag == name]
+                for predicate in predicates:
+                    matched = [c for i, c in enumerate(matched, 1) if predicate(c, i)]
+                for element in matched:
+                    results[id(element)] = element
+        contexts = sorted(results.values(), key=lambda e: order[id(e)])
+    return contexts
+
+
+# ========== UiSelector 子集 ==========
+
+_UISELECTOR_RE = re.compile(r"\.(\w+)\(\s*(?:\"((?:[^\"\\]|\\.)*)\"|(true|false|\d+))?\s*\)")
+
+_UISELECTOR_METHODS = {
+    'text': lambda e, v: e.get('text') == v,
+    'textContains': lambda e, v: v in (e.get('text') or ''),
+    'textStartsWith': lambda e, v: (e.get('text') or '').startswith(v),
+    'textMatches': lambda e, v: re.fullmatch(v, e.get('text') or '') is not None,
+    'description': lambda e, v: e.get('content-desc') == v,
+    'descriptionContains': lambda e, v: v in (e.get('content-desc') or ''),
+    'descriptionStartsWith': lambda e, v: (e.get('content-desc') or '').startswith(v),
+    'resourceId': lambda e, v: e.get('resource-id') == v,
+    'resourceIdMatches': lambda e, v: re.fullmatch(v, e.get('resource-id') or '') is not None,
+    'className': lambda e, v: e.get('class', e.tag) == v,
+    'checked': lambda e, v: e.get('checked') == v,
+    'clickable': lambda e, v: e.get('clickable') == v,
+    'enabled': lambda e, v: e.get('enabled') == v,
+    'selected': lambda e, v: e.get('selected') == v,
+}
+
+
+def _uiselector_find(root: ET.Element, selector: str) -> List[ET.Element]:
+    conditions: List[Callable] = []
+    instance = None
+    for method, text_arg, literal_arg in _UISELECTOR_RE.findall(selector):
+        if method == 'UiSelector':
+            continue
+        value = text_arg if text_arg or not literal_arg else literal_arg
+        if method == 'instance':
+            instance = int(value)
+            continue
+        if method not in _UISELECTOR_METHODS:
+            raise ValueError(f"不支持的 UiSelector 方法: {method}")
+        conditions.append((lambda f, v: lambda e: f(e, v))(_UISELECTOR_METHODS[method], value))
+
+    matched = [e for e in root.iter() if e.get('bounds') is not None and all(c(e) for c in conditions)]
+    if instance is not None:
+        return matched[instance:instance + 1]
+    return matched
+
+
+def find_all(root: ET.Element, by: str, value: str) -> List[ET.Element]:
+    """
+    在层级快照中查找元素
+    :param root: parse_hierarchy 的返回值
+    :param by: Appium 定位方式（'xpath'、'accessibility id'、'class name'、'id'、'-android uiautomator'）
+    """
+    if by == 'xpath':
+        document = ET.Element('#document')
+        document.append(root)
+        return _xpath_find(document, value)
+    if by == 'accessibility id':
+        return [e for e in root.iter() if e.get('content-desc') == value]
+    if by == 'class name':
+        return [e for e in root.iter() if e.get('class', e.tag) == value and e.get('bounds') is not None]
+    if by == 'id':
+        return [e for e in root.iter() if e.get('resource-id') == value]
+    if by == '-android uiautomator':
+        return _uiselector_find(root, value)
+    raise ValueError(f"不支持的定位方式: {by}")
@@ -0,0 +1,324 @@
+# utils/hierarchy_archive.py
+"""
+页面结构（page source）归档（SQLite）
+
+失败时和流程检查点保存的界面结构按内容去重、压缩后存入同一个数据库，
+索引记录设备、时间、Activity、包名、原因和标签，可按条件快速查询、对比两次快照：
+  - 内容相同（sha256）的快照只存一份
+  - 关键帧用内置字典的 zlib 压缩；同一设备同一 Activity 的后续快照只记录相对最近关键帧
+    的节点级差量再压缩（只依赖一层，解压不需要回溯链条），差量收益不大时存为新关键帧
+
+    archive = get_hierarchy_archive()
+    capture = archive.capture(driver, reason="failure", label="蓝牙稳定性")
+    print(archive.diff(previous.id, capture.id))
+
+  - 环境变量 AI_MATE_HIERARCHY_DB 指定数据库路径，默认 ai_mate_tests/hierarchy.db
+"""
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Dict, List, NamedTuple, Optional
+
+from ai_mate_tests.utils.hierarchy import NODE_ATTRIBUTES, parse_hierarchy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hierarchy.db")
+
+# 关键帧压缩用的预置字典：page source 中反复出现的声明、属性和常见控件类名
+_DICTIONARY = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy index=\"0\" class=\"hierarchy\" "
+    "rotation=\"0\" width=\"1080\" height=\"2436\">"
+    + "".join(f' {name}="false"' for name in NODE_ATTRIBUTES)
+    + " <android.widget.FrameLayout <android.widget.LinearLayout <android.widget.RelativeLayout"
+      " <android.widget.TextView <android.widget.ImageView <android.widget.Button <android.widget.Switch"
+      " <android.view.ViewGroup <android.view.View <androidx.recyclerview.widget.RecyclerView"
+      " text=\"\" resource-id=\"\" content-desc=\"\" package=\"com.android.settings\" checkable=\"true\""
+      " clickable=\"true\" enabled=\"true\" focusable=\"true\" displayed=\"true\" bounds=\"[0,0][1080,2436]\" />"
+).encode('utf-8')
+
+# 差量结果小于关键帧压缩结果的该比例时才使用差量
+DELTA_RATIO = 0.6
+# diff 时每个节点输出的属性
+DIFF_ATTRIBUTES = ['text', 'resource-id', 'content-desc', 'checked', 'selected', 'enabled', 'bounds']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    base TEXT,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    device_name TEXT,
+    activity TEXT,
+    package TEXT,
+    reason TEXT,
+    label TEXT,
+    sha TEXT NOT NULL REFERENCES blobs (sha)
+);
+CREATE INDEX IF NOT EXISTS idx_captures_device ON captures (device_name, ts);
+CREATE INDEX IF NOT EXISTS idx_captures_activity ON captures (activity, ts);
+"""
+
+
+class Capture(NamedTuple):
+    """一次归档的索引记录"""
+    id: int
+    ts: float
+    device_name: Optional[str]
+    activity: Optional[str]
+    package: Optional[str]
+    reason: Optional[str]
+    label: Optional[str]
+    sha: str
+
+    def describe(self) -> str:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.ts))
+        return f"#{self.id} {when} {self.device_name or '-'} {self.activity or self.package or '-'} " \
+               f"[{self.reason or '-'}] {self.label or ''}".rstrip()
+
+
+_CAPTURE_COLUMNS = "id, ts, device_name, activity, package, reason, label, sha"
+
+
+def _compress(data: bytes, dictionary: bytes) -> bytes:
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(data: bytes, dictionary: bytes) -> bytes:
+    decompressor = zlib.decompressobj(15, dictionary)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def _tokens(text: str) -> List[str]:
+    """按标签切分（每个 '>' 之后断开），拼接后与原文完全一致"""
+    return re.split(r'(?<=>)', text)
+
+
+def _make_delta(base: str, text: str) -> bytes:
+    """差量：[起, 止] 表示复用关键帧的第 起~止 段，字符串为新增内容"""
+    base_tokens, tokens = _tokens(base), _tokens(text)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_tokens, tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(tokens[j1:j2]))
+    return _compress(json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), _DICTIONARY)
+
+
+def _apply_delta(base: str, delta: bytes) -> str:
+    base_tokens = _tokens(base)
+    return "".join(op if isinstance(op, str) else "".join(base_tokens[op[0]:op[1]])
+                   for op in json.loads(_decompress(delta, _DICTIONARY)))
+
+
+def _foreground_package(xml_text: str) -> Optional[str]:
+    """page source 中第一个 package 属性即前台应用（不解析整棵树）"""
+    start = xml_text.find(' package="')
+    if start < 0:
+        return None
+    start += len(' package="')
+    return xml_text[start:xml_text.find('"', start)] or None
+
+
+def flatten(xml_text: str) -> List[str]:
+    """每个节点一行（缩进表示层级），只保留用于比较的属性"""
+    lines = []
+
+    def _walk(element, depth):
+        attributes = " ".join(f'{name}="{element.get(name)}"' for name in DIFF_ATTRIBUTES
+                              if element.get(name) not in (None, "", "false"))
+        lines.append(f"{'  ' * depth}{element.tag} {attributes}".rstrip())
+        for child in element:
+            _walk(child, depth + 1)
+
+    _walk(parse_hierarchy(xml_text), 0)
+    return lines
+
+
+class HierarchyArchive:
+    """
+    :param path: SQLite 数据库路径；同一文件可被多个进程（xdist worker）同时写入
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("AI_MATE_HIERARCHY_DB") or DEFAULT_DB_PATH
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        # sqlite3 只在第一次读写时导入
+        if self._connection is None:
+            import sqlite3
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # ========== 写入 ==========
+
+    def add(self, xml_text: str, device_name: Optional[str] = None, activity: Optional[str] = None,
+            package: Optional[str] = None, reason: str = "checkpoint", label: Optional[str] = None,
+            ts: Optional[float] = None) -> Capture:
+        """归档一份 page source，返回索引记录"""
+        data = xml_text.encode('utf-8')
+        sha = hashlib.sha256(data).hexdigest()
+        package = package or _foreground_package(xml_text)
+        ts = time.time() if ts is None else ts
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                if connection.execute("SELECT 1 FROM blobs WHERE sha = ?", (sha,)).fetchone() is None:
+                    codec, base, stored = self._encode(connection, data, device_name, activity or package)
+                    connection.execute("INSERT OR IGNORE INTO blobs (sha, codec, base, size, data) VALUES (?, ?, ?, ?, ?)",
+                                       (sha, codec, base, len(data), stored))
+                cursor = connection.execute(
+                    "INSERT INTO captures (ts, device_name, activity, package, reason, label, sha) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", (ts, device_name, activity, package, reason, label, sha))
+        return Capture(cursor.lastrowid, ts, device_name, activity, package, reason, label, sha)
+
+    def _encode(self, connection, data: bytes, device_name, screen):
+        """
+        返回 (codec, base, 压缩数据)：以同一设备同一界面最近的关键帧为字典做差量，
+        收益不足时作为新关键帧
+        """
+        keyframe = _compress(data, _DICTIONARY)
+        row = connection.execute(
+            "SELECT b.sha, b.data FROM captures c JOIN blobs b ON b.sha = c.sha "
+            "WHERE c.device_name IS ? AND COALESCE(c.activity, c.package) IS ? AND b.codec = 'zdict' "
+            "ORDER BY c.id DESC LIMIT 1", (device_name, screen)).fetchone()
+        if row is not None:
+            base_sha, base_data = row
+            delta = _make_delta(_decompress(base_data, _DICTIONARY).decode('utf-8'), data.decode('utf-8'))
+            if len(delta) < len(keyframe) * DELTA_RATIO:
+                return 'delta', base_sha, delta
+        return 'zdict', None, keyframe
+
+    def capture(self, driver, reason: str = "checkpoint", label: Optional[str] = None,
+                device_name: Optional[str] = None) -> Optional[Capture]:
+        """从 driver 获取 page source 并归档；会话已失效时返回 None"""
+        try:
+            xml_text = driver.page_source
+        except Exception as e:
+            logger.warning(f"⚠️ 获取界面结构失败，未归档: {e}")
+            return None
+        try:
+            activity = driver.current_activity
+        except Exception:
+            activity = None
+        return self.add(xml_text, device_name or getattr(driver, 'device_name', None), activity,
+                        reason=reason, label=label)
+
+    # ========== 查询 ==========
+
+    def get(self, capture_id: int) -> str:
+        """读取一次快照的 page source"""
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT b.codec, b.base, b.data FROM captures c JOIN blobs b ON b.sha = c.sha WHERE c.id = ?",
+                (capture_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"归档中没有快照 #{capture_id}")
+            codec, base, data = row
+            if codec == 'delta':
+                base_data = connection.execute("SELECT data FROM blobs WHERE sha = ?", (base,)).fetchone()[0]
+                return _apply_delta(_decompress(base_data, _DICTIONARY).decode('utf-8'), data)
+            return _decompress(data, _DICTIONARY).decode('utf-8')
+
+    def find(self, device_name: Optional[str] = None, activity: Optional[str] = None,
+             reason: Optional[str] = None, label: Optional[str] = None, since: Optional[float] = None,
+             until: Optional[float] = None, limit: Optional[int] = 100) -> List[Capture]:
+        """按条件查询快照（最新的在前）；activity 同时匹配包名，可用 % 通配"""
+        clauses, params = [], []
+        for column, value in (('device_name', device_name), ('reason', reason), ('label', label)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if activity is not None:
+            clauses.append("(activity LIKE ? OR package LIKE ?)")
+            params.extend([activity, activity])
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts <= ?")
+            params.append(until)
+        sql = f"SELECT {_CAPTURE_COLUMNS} FROM captures"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [Capture(*row) for row in self._connect().execute(sql, params)]
+
+    def latest(self, device_name: Optional[str] = None) -> Optional[Capture]:
+        captures = self.find(device_name=device_name, limit=1)
+        return captures[0] if captures else None
+
+    def diff(self, a: int, b: int, context: int = 3) -> str:
+        """两次快照的节点级 unified diff（每个节点一行，只比较主要属性）"""
+        captures = {capture.id: capture for capture in self._by_ids([a, b])}
+        for capture_id in (a, b):
+            if capture_id not in captures:
+                raise KeyError(f"归档中没有快照 #{capture_id}")
+        if captures[a].sha == captures[b].sha:
+            return ""
+        return "\n".join(difflib.unified_diff(
+            flatten(self.get(a)), flatten(self.get(b)),
+            fromfile=captures[a].describe(), tofile=captures[b].describe(), n=context, lineterm=""))
+
+    def _by_ids(self, ids: List[int]) -> List[Capture]:
+        placeholders = ", ".join("?" for _ in ids)
+        with self._lock:
+            return [Capture(*row) for row in self._connect().execute(
+                f"SELECT {_CAPTURE_COLUMNS} FROM captures WHERE id IN ({placeholders})", ids)]
+
+    def stats(self) -> Dict[str, int]:
+        """快照数、去重后的内容数、原始大小与实际存储大小（字节）"""
+        with self._lock:
+            connection = self._connect()
+            captures, raw = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(b.size), 0) FROM captures c JOIN blobs b ON b.sha = c.sha").fetchone()
+            blobs, keyframes, stored = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(codec = 'zdict'), 0), COALESCE(SUM(LENGTH(data)), 0) "
+                "FROM blobs").fetchone()
+        return {'captures': captures, 'blobs': blobs, 'keyframes': keyframes,
+                'raw_bytes': raw, 'stored_bytes': stored}
+
+
+_default_archive: Optional[HierarchyArchive] = None
+_default_archive_lock = threading.Lock()
+
+
+def get_hierarchy_archive() -> HierarchyArchive:
+    """进程内共享的归档（默认路径）"""
+    global _default_archive
+    if _default_archive is None:
+        with _default_archive_lock:
+            if _default_archive is None:
+                _default_archive = HierarchyArchive()
+    return _default_archive
@@ -0,0 +1,247 @@
+# utils/incremental_selection.py
+"""
+增量用例选择（pytest 插件）
+
+每个 (用例, 设备) 组合通过后记录其输入的指纹：
+  - 被测应用和 AI Mate 应用（com.transsion.xsound）的 versionCode
+  - 系统版本（ro.build.fingerprint，包含固件版本）
+  - 用例运行期间读取过的 config.yaml 配置段的摘要（元素、页面、设备、应用、驱动选项）
+  - 用例文件的摘要
+再次运行时，上次通过且指纹完全相同的组合跳过：部分设备跳过时只在其余设备上执行，
+全部设备都跳过时整个用例标记为 skipped。--force-full-run 强制全部执行（仍然更新记录）。
+
+  - 环境变量 AI_MATE_SELECTION_DB 指定记录库路径，默认 ai_mate_tests/selection.db
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from ai_mate_tests.utils.config_loader import start_access_tracking, stop_access_tracking
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "selection.db")
+PLUGIN_NAME = "incremental_selection"
+
+_VERSION_CODE = re.compile(r"versionCode=(\d+)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    test_id TEXT NOT NULL,
+    device_name TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (test_id, device_name)
+);
+"""
+
+
+@dataclass
+class Fingerprint:
+    """一个 (用例, 设备) 组合的输入"""
+    app_versions: Dict[str, Optional[str]] = field(default_factory=dict)  # 包名 -> versionCode
+    os_build: Optional[str] = None
+    test_file: Optional[str] = None
+    sections: Dict[str, str] = field(default_factory=dict)  # 配置段 -> 摘要
+
+    def changes(self, previous: "Fingerprint") -> List[str]:
+        """与上次相比变化的输入（用于输出重新执行的原因）"""
+        changed = []
+        for package in sorted(set(self.app_versions) | set(previous.app_versions)):
+            if self.app_versions.get(package) != previous.app_versions.get(package):
+                changed.append(f"{package} {previous.app_versions.get(package)} -> {self.app_versions.get(package)}")
+        if self.os_build != previous.os_build:
+            changed.append("系统版本")
+        if self.test_file != previous.test_file:
+            changed.append("用例文件")
+        changed.extend(f"配置 {section}" for section in sorted(previous.sections)
+                       if self.sections.get(section) != previous.sections[section])
+        return changed
+
+
+class SelectionStore:
+    """(用例, 设备) 的最近一次结果和指纹（SQLite，xdist 多个 worker 可同时写入）"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("AI_MATE_SELECTION_DB") or DEFAULT_DB_PATH
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            import sqlite3
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def get(self, test_id: str, device_name: str) -> Optional[Tuple[str, Fingerprint]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT outcome, fingerprint FROM results WHERE test_id = ? AND device_name = ?",
+                (test_id, device_name)).fetchone()
+        if row is None:
+            return None
+        return row[0], Fingerprint(**json.loads(row[1]))
+
+    def put(self, test_id: str, device_name: str, outcome: str, fingerprint: Fingerprint):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                                   (test_id, device_name, outcome,
+                                    json.dumps(asdict(fingerprint), sort_keys=True), time.time()))
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def read_device_build(udid: str, packages: List[str]) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+    """一次 adb shell 读取系统版本和各应用的 versionCode（未安装为 None）"""
+    from ai_mate_tests.utils.adb_channel import get_channel
+
+    command = "getprop ro.build.fingerprint" + "".join(
+        f"; echo '#{package}'; dumpsys package {package} | grep -m 1 versionCode" for package in packages)
+    versions: Dict[str, Optional[str]] = {package: None for package in packages}
+    try:
+        output = get_channel(udid).run(command, timeout=10).output
+    except Exception as e:
+        logger.warning(f"⚠️ {udid} 读取版本信息失败: {e}")
+        return None, versions
+
+    lines = output.splitlines()
+    os_build = lines[0].strip() if lines else None
+    package = None
+    for line in lines[1:]:
+        if line.startswith("#") and line[1:].strip() in versions:
+            package = line[1:].strip()
+        elif package is not None:
+            match = _VERSION_CODE.search(line)
+            if match:
+                versions[package] = match.group(1)
+    return os_build or None, versions
+
+
+class IncrementalSelection:
+    """
+    :param config_loader_getter: 返回当前 ConfigLoader 的函数（需要时才创建驱动管理器）
+    :param force_full_run: True 时不跳过任何组合
+    """
+
+    def __init__(self, config_loader_getter, force_full_run: bool = False, store: Optional[SelectionStore] = None):
+        self.config_loader_getter = config_loader_getter
+        self.force_full_run = force_full_run
+        self.store = store or SelectionStore()
+        self.skipped: List[Tuple[str, str]] = []
+        self.recorded = 0
+        self._builds: Dict[Tuple[str, Tuple[str, ...]], Tuple[Optional[str], Dict[str, Optional[str]]]] = {}
+        self._file_digests: Dict[str, str] = {}
+
+    # ---------- 指纹 ----------
+
+    def _packages(self, item) -> List[str]:
+        config_loader = self.config_loader_getter()
+        marker = item.get_closest_marker("app_type")
+        app_names = ["ai_mate"] + ([marker.args[0]] if marker else [])
+        packages = [config_loader.config.get('app_configs', {}).get(name, {}).get('app_package') for name in app_names]
+        return sorted({package for package in packages if package})
+
+    def _build(self, udid: str, packages: List[str]):
+        # 一次运行内系统和应用版本不变，每台设备只读取一次
+        key = (udid, tuple(packages))
+        if key not in self._builds:
+            self._builds[key] = read_device_build(udid, packages)
+        return self._builds[key]
+
+    def _file_digest(self, path: str) -> Optional[str]:
+        if path not in self._file_digests:
+            try:
+                with open(path, 'rb') as f:
+                    self._file_digests[path] = hashlib.sha1(f.read()).hexdigest()[:16]
+            except OSError:
+                return None
+        return self._file_digests[path]
+
+    def fingerprint(self, item, device_name: str, sections) -> Fingerprint:
+        config_loader = self.config_loader_getter()
+        udid = config_loader.get_device_config(device_name).get('udid')
+        os_build, app_versions = self._build(udid, self._packages(item))
+        return Fingerprint(
+            app_versions=app_versions,
+            os_build=os_build,
+            test_file=self._file_digest(str(item.fspath)),
+            sections={section: config_loader.section_digest(device_name, section) for section in sorted(sections)},
+        )
+
+    # ---------- 选择 ----------
+
+    def up_to_date(self, item, device_names: List[str]) -> List[str]:
+        """上次通过且输入未变化、本次可以跳过的设备"""
+        if self.force_full_run:
+            return []
+        skipped = []
+        for device_name in device_names:
+            stored = self.store.get(item.nodeid, device_name)
+            if stored is None or stored[0] != "passed":
+                continue
+            previous = stored[1]
+            # 版本读取失败时无法确认未变化，按变化处理
+            current = self.fingerprint(item, device_name, previous.sections)
+            changes = current.changes(previous) if current.os_build else ["版本信息读取失败"]
+            if changes:
+                print(f"🔁 {device_name} 输入有变化，重新执行: {', '.join(changes)}")
+                continue
+            skipped.append(device_name)
+            self.skipped.append((item.nodeid, device_name))
+        if skipped:
+            print(f"⏭️ 上次已通过且输入未变化，跳过: {', '.join(skipped)}（--force-full-run 强制执行）")
+        return skipped
+
+    def _record(self, item, outcome: str, accessed):
+        drivers = item.funcargs.get('parallel_drivers') if hasattr(item, 'funcargs') else None
+        for device_name in drivers or {}:
+            sections = {section for owner, section in accessed if owner in (None, device_name)}
+            try:
+                self.store.put(item.nodeid, device_name, outcome, self.fingerprint(item, device_name, sections))
+                self.recorded += 1
+            except Exception as e:
+                logger.warning(f"⚠️ 记录 {item.nodeid} [{device_name}] 指纹失败: {e}")
+
+    # ---------- pytest 钩子 ----------
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_setup(self, item):
+        # 会话创建（能力配置、弹窗定位）在 setup 阶段，记录从这里开始
+        start_access_tracking()
+        yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        report = outcome.get_result()
+        if report.when == "call":
+            self._record(item, "passed" if report.passed else report.outcome, stop_access_tracking())
+        elif report.when == "setup" and not report.passed:
+            stop_access_tracking()
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.skipped or self.recorded:
+            terminalreporter.write_line(
+                f"⏭️ 增量选择: 跳过 {len(self.skipped)} 个 (用例, 设备) 组合，记录 {self.recorded} 个"
+                + ("（强制全部执行）" if self.force_full_run else ""))
+
+    def pytest_unconfigure(self, config):
+        self.store.close()
@@ -0,0 +1,131 @@
+# utils/locator_stats.py
+"""
+定位策略统计
+
+记录每台设备上每个元素各定位策略的成功/失败次数和平均耗时，据此对策略排序：
+期望耗时 = 平均耗时 / 成功率，期望耗时最小的策略最先尝试；
+从未尝试过的策略排在最前（保持配置顺序），保证每个策略至少被评估一次。
+
+统计保存在 JSON 文件中，跨运行累积：
+  - 环境变量 AI_MATE_LOCATOR_STATS 指定路径
+  - 默认与配置文件同目录的 locator_stats.json
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATS_VERSION = 1
+
+# 平均耗时的指数滑动系数，越大越偏向最近的结果（固件升级后能较快适应）
+LATENCY_ALPHA = 0.3
+
+Strategy = Tuple[str, str]
+
+
+def strategy_key(by: str, value: str) -> str:
+    return f"{by}={value}"
+
+
+def default_stats_path(config_path: Optional[str] = None) -> str:
+    if os.environ.get("AI_MATE_LOCATOR_STATS"):
+        return os.environ["AI_MATE_LOCATOR_STATS"]
+    if config_path is None:
+        config_path = os.path.join(os.path.dirname(__file__), "config.yaml")
+    return os.path.join(os.path.dirname(os.path.abspath(config_path)), "locator_stats.json")
+
+
+class LocatorStats:
+    """
+    :param path: 统计文件路径
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # 设备名 -> 元素键名 -> 策略键 -> {successes, failures, latency}
+        self._stats: Dict[str, Dict[str, Dict[str, Dict[str, float]]]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    # ========== 持久化 ==========
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 定位统计文件无法读取，重新统计: {self.path} ({e})")
+            return
+        if data.get('version') == STATS_VERSION:
+            with self._lock:
+                self._stats = data.get('devices', {})
+
+    def save(self):
+        """写入统计文件（先写临时文件再替换，避免中断时留下半个文件）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'version': STATS_VERSION, 'devices': self._stats}
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logger.warning(f"⚠️ 定位统计保存失败: {e}")
+
+    # ========== 统计 ==========
+
+    def record(self, device_name: str, element_key: str, strategy: Strategy, found: bool, latency: float):
+        """记录一次查找结果"""
+        with self._lock:
+            entry = self._stats.setdefault(device_name, {}).setdefault(element_key, {}).setdefault(
+                strategy_key(*strategy), {'successes': 0, 'failures': 0, 'latency': latency})
+            entry['successes' if found else 'failures'] += 1
+            entry['latency'] += LATENCY_ALPHA * (latency - entry['latency'])
+            self._dirty = True
+
+    def expected_cost(self, device_name: str, element_key: str, strategy: Strategy) -> Optional[float]:
+        """期望耗时（秒）；从未尝试过时返回 None"""
+        entry = self._stats.get(device_name, {}).get(element_key, {}).get(strategy_key(*strategy))
+        if entry is None:
+            return None
+        attempts = entry['successes'] + entry['failures']
+        success_rate = (entry['successes'] + 1) / (attempts + 2)
+        return entry['latency'] / success_rate
+
+    def order(self, device_name: str, element_key: str, strategies: List[Strategy]) -> List[Strategy]:
+        """按期望耗时排序；未尝试过的策略在前，相同情况下保持配置顺序"""
+        with self._lock:
+            costs = [self.expected_cost(device_name, element_key, s) for s in strategies]
+        ranked = sorted(range(len(strategies)),
+                        key=lambda i: (costs[i] is not None, costs[i] or 0.0, i))
+        return [strategies[i] for i in ranked]
+
+    def get_element_stats(self, device_name: str, element_key: str) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._stats.get(device_name, {}).get(element_key, {}).items()}
+
+
+# 全局实例延迟到首次使用时创建，进程退出时保存
+_locator_stats: Optional[LocatorStats] = None
+_locator_stats_lock = threading.Lock()
+
+
+def get_locator_stats(config_path: Optional[str] = None) -> LocatorStats:
+    """获取全局 LocatorStats 实例"""
+    global _locator_stats
+    if _locator_stats is None:
+        with _locator_stats_lock:
+            if _locator_stats is None:
+                _locator_stats = LocatorStats(default_stats_path(config_path))
+                atexit.register(_locator_stats.save)
+    return _locator_stats
@@ -0,0 +1,204 @@
+# utils/log_capture.py
+"""
+长时间运行的日志采集（logcat / 眼镜串口），按大小或手动切换分段
+
+文件命名与 logging.handlers.RotatingFileHandler 一致：当前分段为 name.log，
+切换后依次为 name.log.1（最近）... name.log.<backups>，更早的分段被删除，
+磁盘占用上限约为 max_bytes * (backups + 1)。采集进程或串口断开后自动重连。
+
+    with LogcatCapture(udid, "soak/device1/logcat.log") as logcat:
+        ...
+        logcat.rotate(f"会话 {n}")   # 会话重建时切换分段，日志与会话一一对应
+"""
+import datetime
+import logging
+import os
+import subprocess
+import threading
+from typing import Iterator, Optional
+
+from ai_mate_tests.utils.adb_channel import get_adb_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUPS = 10
+
+
+class RotatingWriter:
+    """线程安全的逐行写入，超过 max_bytes 时切换分段"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 追加打开：中断后恢复运行时接着写当前分段
+        self._file = open(path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+    def write_line(self, line: str):
+        data = line.rstrip('\n') + '\n'
+        size = len(data.encode('utf-8'))
+        with self._lock:
+            if self._file is None:
+                return
+            if self._size and self._size + size > self.max_bytes:
+                self._rotate_locked()
+            self._file.write(data)
+            self._file.flush()
+            self._size += size
+
+    def rotate(self, marker: Optional[str] = None):
+        """切换到新分段；marker 写在新分段第一行，便于和会话/迭代对应"""
+        with self._lock:
+            if self._file is None:
+                return
+            if self._size:
+                self._rotate_locked()
+            if marker:
+                data = f"# {datetime.datetime.now().isoformat(timespec='seconds')} {marker}\n"
+                self._file.write(data)
+                self._file.flush()
+                self._size += len(data.encode('utf-8'))
+
+    def _rotate_locked(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._size = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class LineCapture:
+    """后台线程读取行并写入 RotatingWriter；子类实现 _read_lines"""
+
+    name = "capture"
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS,
+                 reconnect_delay: float = 2.0):
+        self.writer = RotatingWriter(path, max_bytes, backups)
+        self.reconnect_delay = reconnect_delay
+        self.lines = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "LineCapture":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                for line in self._read_lines():
+                    if self._stop.is_set():
+                        break
+                    if line:
+                        self.writer.write_line(line)
+                        self.lines += 1
+            except Exception as e:
+                logger.warning(f"⚠️ {self.name} 采集中断: {e}")
+            # 进程退出或设备断开：等待后重连
+            self._stop.wait(self.reconnect_delay)
+
+    def _read_lines(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def _close_source(self):
+        """停止时中断阻塞的读取"""
+
+    def rotate(self, marker: Optional[str] = None):
+        self.writer.rotate(marker)
+
+    def mark(self, text: str):
+        """写入一行标记（不切换分段）"""
+        self.writer.write_line(f"# {datetime.datetime.now().isoformat(timespec='seconds')} {text}")
+
+    def stop(self):
+        self._stop.set()
+        self._close_source()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.writer.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class LogcatCapture(LineCapture):
+    """adb logcat（threadtime 格式），只采集启动之后的新日志"""
+
+    def __init__(self, udid: str, path: str, **kwargs):
+        self.udid = udid
+        self.name = f"logcat-{udid}"
+        self._process: Optional[subprocess.Popen] = None
+        super().__init__(path, **kwargs)
+
+    def _read_lines(self) -> Iterator[str]:
+        self._process = subprocess.Popen(
+            [get_adb_path(), '-s', self.udid, 'logcat', '-v', 'threadtime', '-T', '1'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="ignore",
+        )
+        try:
+            for line in self._process.stdout:
+                yield line.rstrip('\n')
+        finally:
+            self._close_source()
+
+    def _close_source(self):
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait(timeout=5)
+
+
+class SerialCapture(LineCapture):
+    """眼镜串口日志（与 logs/cg02_log.py 相同的波特率和时间戳格式），需要 pyserial"""
+
+    def __init__(self, port: str, path: str, baudrate: int = 2000000, **kwargs):
+        self.port = port
+        self.baudrate = baudrate
+        self.name = f"serial-{port}"
+        self._serial = None
+        super().__init__(path, **kwargs)
+
+    def _read_lines(self) -> Iterator[str]:
+        import serial
+
+        self._serial = serial.Serial(self.port, baudrate=self.baudrate, timeout=1)
+        try:
+            while not self._stop.is_set():
+                line = self._serial.readline().decode(errors="ignore").strip()
+                if line:
+                    yield f"{datetime.datetime.now().strftime('[%H:%M:%S]')} {line}"
+        finally:
+            self._close_source()
+
+    def _close_source(self):
+        port, self._serial = self._serial, None
+        if port is not None:
+            try:
+                port.close()
+            except Exception:
+                pass
@@ -0,0 +1,210 @@
+# utils/metrics_report.py
+"""
+运行指标比较与趋势图
+
+把本次运行的每个 (指标, 设备) 与之前若干次运行组成的滚动基线比较：
+  - 两侧样本都不少于 2 个时用 Welch t 检验（单侧，检验是否变慢）
+  - 本次只有 1 个样本（如会话创建）时用基线的预测区间检验
+只有统计显著且增幅超过 min_change 时才判定为回归，避免把正常抖动当成变慢。
+"""
+import math
+import statistics
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from ai_mate_tests.utils.metrics_store import MetricsStore
+
+Key = Tuple[str, Optional[str]]  # (指标名, 设备名)
+
+
+class Comparison(NamedTuple):
+    name: str
+    device_name: Optional[str]
+    baseline_mean: float
+    current_mean: float
+    change: float      # 相对变化，0.1 表示慢 10%
+    p_value: float
+    baseline_n: int
+    current_n: int
+    regression: bool
+
+
+# ========== 统计 ==========
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """不完全 Beta 函数的连分式展开（Lentz 算法）"""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 201):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-12:
+            break
+    return h
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """正则化不完全 Beta 函数 I_x(a, b)"""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log(1.0 - x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+
+def t_sf(t: float, df: float) -> float:
+    """t 分布的单侧尾概率 P(T > t)"""
+    tail = 0.5 * _betainc(df / 2.0, 0.5, df / (df + t * t))
+    return tail if t > 0 else 1.0 - tail
+
+
+def welch_t_test(baseline: Sequence[float], current: Sequence[float]) -> float:
+    """单侧 Welch t 检验：current 均值大于 baseline 均值的 p 值"""
+    n1, n2 = len(baseline), len(current)
+    m1, m2 = statistics.fmean(baseline), statistics.fmean(current)
+    v1, v2 = statistics.variance(baseline) / n1, statistics.variance(current) / n2
+    if v1 + v2 == 0:
+        return 0.0 if m2 > m1 else 1.0
+    t = (m2 - m1) / math.sqrt(v1 + v2)
+    df = (v1 + v2) ** 2 / (v1 ** 2 / (n1 - 1) + v2 ** 2 / (n2 - 1))
+    return t_sf(t, df)
+
+
+def prediction_test(baseline: Sequence[float], value: float) -> float:
+    """单个新样本大于基线分布的 p 值（预测区间）"""
+    n = len(baseline)
+    mean, stdev = statistics.fmean(baseline), statistics.stdev(baseline)
+    if stdev == 0:
+        return 0.0 if value > mean else 1.0
+    t = (value - mean) / (stdev * math.sqrt(1 + 1 / n))
+    return t_sf(t, n - 1)
+
+
+# ========== 比较 ==========
+
+def _group(samples) -> Dict[Key, List[float]]:
+    groups = defaultdict(list)
+    for sample in samples:
+        groups[(sample.name, sample.device_name)].append(sample.value)
+    return groups
+
+
+def compare_runs(store: MetricsStore, run_id: Optional[str] = None, window: int = 10,
+                 alpha: float = 0.05, min_change: float = 0.05) -> List[Comparison]:
+    """
+    比较指定运行（默认最近一次）与之前 window 次运行
+    :param alpha: 显著性水平
+    :param min_change: 判定回归所需的最小相对增幅
+    """
+    run_ids = store.run_ids()
+    if run_id is None:
+        if not run_ids:
+            return []
+        run_id = run_ids[-1]
+    if run_id not in run_ids:
+        raise ValueError(f"运行 {run_id} 不存在")
+    baseline_ids = run_ids[max(0, run_ids.index(run_id) - window):run_ids.index(run_id)]
+
+    current = _group(store.samples([run_id]))
+    baseline = _group(store.samples(baseline_ids))
+
+    results = []
+    for key in sorted(current, key=lambda k: (k[0], k[1] or "")):
+        before, after = baseline.get(key, []), current[key]
+        if len(before) < 2:
+            continue
+        if len(after) >= 2:
+            p_value = welch_t_test(before, after)
+        else:
+            p_value = prediction_test(before, after[0])
+        baseline_mean, current_mean = statistics.fmean(before), statistics.fmean(after)
+        change = (current_mean - baseline_mean) / baseline_mean if baseline_mean else 0.0
+        results.append(Comparison(key[0], key[1], baseline_mean, current_mean, change, p_value,
+                                  len(before), len(after), p_value < alpha and change >= min_change))
+    return results
+
+
+def format_comparisons(comparisons: List[Comparison]) -> str:
+    lines = []
+    for c in comparisons:
+        flag = "❌" if c.regression else "  "
+        lines.append(f"{flag} {c.name:<28} {c.device_name or '-':<10} "
+                     f"{c.baseline_mean * 1000:9.1f} ms -> {c.current_mean * 1000:9.1f} ms "
+                     f"({c.change:+.1%}, p={c.p_value:.3f}, n={c.baseline_n}/{c.current_n})")
+    return "\n".join(lines)
+
+
+# ========== 趋势图 ==========
+
+_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f"]
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def render_trend_svg(store: MetricsStore, names: Optional[List[str]] = None, runs: int = 20,
+                     width: int = 640, chart_height: int = 160) -> str:
+    """
+    最近 runs 次运行中每个指标的均值趋势，每个指标一张折线图，每台设备一条线
+    :param names: 只绘制这些指标，默认全部
+    """
+    run_ids = store.run_ids(limit=runs)
+    per_run: Dict[str, Dict[Optional[str], Dict[int, List[float]]]] = defaultdict(
+        lambda: defaultdict(lambda: defaultdict(list)))
+    index = {run_id: i for i, run_id in enumerate(run_ids)}
+    for sample in store.samples(run_ids):
+        if names is None or sample.name in names:
+            per_run[sample.name][sample.device_name][index[sample.run_id]].append(sample.value)
+
+    margin_left, margin_top, gap = 60, 24, 30
+    total_height = max(1, len(per_run)) * (chart_height + gap)
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{total_height}" '
+             f'font-family="sans-serif" font-size="11">']
+    plot_width = width - margin_left - 20
+    step = plot_width / max(1, len(run_ids) - 1)
+
+    for chart, name in enumerate(sorted(per_run)):
+        top = chart * (chart_height + gap) + margin_top
+        plot_height = chart_height - margin_top
+        devices = per_run[name]
+        peak = max(statistics.fmean(v) for points in devices.values() for v in points.values()) or 1.0
+
+        parts.append(f'<text x="{margin_left}" y="{top - 8}" font-weight="bold">{_escape(name)}</text>')
+        parts.append(f'<line x1="{margin_left}" y1="{top + plot_height}" x2="{margin_left + plot_width}" '
+                     f'y2="{top + plot_height}" stroke="#999"/>')
+        parts.append(f'<text x="4" y="{top + 10}">{peak * 1000:.0f} ms</text>')
+        parts.append(f'<text x="4" y="{top + plot_height}">0</text>')
+
+        for color_index, device_name in enumerate(sorted(devices, key=lambda d: d or "")):
+            color = _COLORS[color_index % len(_COLORS)]
+            points = sorted(devices[device_name].items())
+            coords = " ".join(
+                f"{margin_left + i * step:.1f},{top + plot_height - statistics.fmean(values) / peak * plot_height:.1f}"
+                for i, values in points)
+            parts.append(f'<polyline fill="none" stroke="{color}" stroke-width="1.5" points="{coords}"/>')
+            legend_x = margin_left + plot_width - 90
+            parts.append(f'<text x="{legend_x}" y="{top + 12 * (color_index + 1)}" fill="{color}">'
+                         f'{_escape(device_name or "-")}</text>')
+
+    parts.append("</svg>")
+    return "\n".join(parts)
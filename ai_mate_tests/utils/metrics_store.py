@@ -0,0 +1,222 @@
+# utils/metrics_store.py
+"""
+运行耗时指标库（SQLite）
+
+测试过程中记录会话创建、步骤、配对、蓝牙开关/重连、流程等耗时，
+每条记录带上设备、系统版本、AI Mate 应用版本、眼镜固件版本和 git 版本，
+供 utils/metrics_report 与历史运行比较、生成趋势图。
+
+记录只写入内存缓冲（多线程安全），flush() 时批量写库：
+    record_metric("pairing", 12.3, device_name="device1")
+    with metric_timer("flow.pairing", "device1"):
+        ...
+
+  - 环境变量 AI_MATE_METRICS_DB 指定数据库路径，默认 ai_mate_tests/metrics.db
+  - 环境变量 AI_MATE_GLASSES_FIRMWARE 指定本次运行的眼镜固件版本
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "metrics.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    git_rev TEXT,
+    firmware TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    name TEXT NOT NULL,
+    device_name TEXT,
+    os_version TEXT,
+    app_version TEXT,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_key ON metrics (name, device_name, run_id);
+"""
+
+
+class Sample(NamedTuple):
+    run_id: str
+    ts: float
+    name: str
+    device_name: Optional[str]
+    os_version: Optional[str]
+    app_version: Optional[str]
+    value: float
+
+
+def _git_revision() -> Optional[str]:
+    import subprocess
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _default_run_id() -> str:
+    # xdist 各 worker 共享同一个 testrunuid，保证一次运行只对应一个 run_id
+    return os.environ.get("PYTEST_XDIST_TESTRUNUID") or time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+
+
+def _package_version(udid: str, package: str) -> Optional[str]:
+    """通过常驻 adb shell 通道读取应用版本号"""
+    from ai_mate_tests.utils.adb_channel import get_channel
+    try:
+        result = get_channel(udid).run(f"dumpsys package {package} | grep -m 1 versionName", timeout=5)
+    except Exception as e:
+        logger.debug(f"{udid} 读取 {package} 版本失败: {e}")
+        return None
+    _, _, version = result.output.strip().partition("versionName=")
+    return version.strip() or None
+
+
+class MetricsStore:
+    """
+    :param path: SQLite 数据库路径
+    :param run_id: 本次运行标识，默认由时间和进程号生成（xdist 下使用 testrunuid）
+    """
+
+    def __init__(self, path: str = None, run_id: str = None):
+        self.path = path or os.environ.get("AI_MATE_METRICS_DB") or DEFAULT_DB_PATH
+        self.run_id = run_id or _default_run_id()
+        self.started_at = time.time()
+        self.firmware = os.environ.get("AI_MATE_GLASSES_FIRMWARE")
+
+        self._buffer: List[tuple] = []
+        # 设备名 -> {'os_version', 'udid', 'package', 'app_version'}
+        self._devices: Dict[str, Dict[str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    # ========== 记录 ==========
+
+    def tag_device(self, device_name: str, udid: str = None, os_version: str = None, package: str = None):
+        """登记设备标签；应用版本在 flush 时才通过 adb 读取（每台设备一次）"""
+        with self._lock:
+            tags = self._devices.setdefault(device_name, {})
+            for key, value in (('udid', udid), ('os_version', os_version), ('package', package)):
+                if value:
+                    tags[key] = value
+
+    def record(self, name: str, value: float, device_name: Optional[str] = None):
+        """记录一个耗时（秒）"""
+        with self._lock:
+            self._buffer.append((time.time(), name, device_name, float(value)))
+
+    @contextmanager
+    def timer(self, name: str, device_name: Optional[str] = None):
+        """记录代码块耗时；代码块抛出异常时不记录，失败的耗时不参与比较"""
+        start = time.monotonic()
+        yield
+        self.record(name, time.monotonic() - start, device_name)
+
+    # ========== 写库 ==========
+
+    def _connect(self):
+        # sqlite3 只在写库/查询时导入，记录指标的模块保持轻量
+        import sqlite3
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def _resolve_app_versions(self):
+        for tags in self._devices.values():
+            if 'app_version' not in tags and tags.get('udid') and tags.get('package'):
+                tags['app_version'] = _package_version(tags['udid'], tags['package'])
+
+    def flush(self) -> int:
+        """把缓冲写入数据库，返回写入条数"""
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+            if not pending:
+                return 0
+            self._resolve_app_versions()
+            devices = {name: dict(tags) for name, tags in self._devices.items()}
+
+        import sqlite3
+
+        rows = []
+        for ts, name, device_name, value in pending:
+            tags = devices.get(device_name, {})
+            rows.append((self.run_id, ts, name, device_name, tags.get('os_version'), tags.get('app_version'), value))
+
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT OR IGNORE INTO runs (run_id, started_at, git_rev, firmware) VALUES (?, ?, ?, ?)",
+                    (self.run_id, self.started_at, _git_revision(), self.firmware))
+                connection.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            connection.close()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 指标写入失败 {self.path}: {e}")
+            return 0
+        return len(rows)
+
+    # ========== 查询 ==========
+
+    def run_ids(self, limit: Optional[int] = None) -> List[str]:
+        """按开始时间排序的运行列表（最早的在前）"""
+        if not os.path.exists(self.path):
+            return []
+        with self._connect() as connection:
+            rows = connection.execute("SELECT run_id FROM runs ORDER BY started_at DESC"
+                                      + (" LIMIT ?" if limit else ""), (limit,) if limit else ()).fetchall()
+        connection.close()
+        return [row[0] for row in reversed(rows)]
+
+    def samples(self, run_ids: List[str], name: Optional[str] = None) -> List[Sample]:
+        if not run_ids or not os.path.exists(self.path):
+            return []
+        query = f"SELECT * FROM metrics WHERE run_id IN ({','.join('?' * len(run_ids))})"
+        params = list(run_ids)
+        if name is not None:
+            query += " AND name = ?"
+            params.append(name)
+        with self._connect() as connection:
+            rows = connection.execute(query, params).fetchall()
+        connection.close()
+        return [Sample(*row) for row in rows]
+
+
+# 全局实例延迟到首次记录时创建，进程退出时写库
+_metrics_store: Optional[MetricsStore] = None
+_metrics_store_lock = threading.Lock()
+
+
+def get_metrics_store() -> MetricsStore:
+    """获取全局 MetricsStore 实例"""
+    global _metrics_store
+    if _metrics_store is None:
+        with _metrics_store_lock:
+            if _metrics_store is None:
+                _metrics_store = MetricsStore()
+                atexit.register(_metrics_store.flush)
+    return _metrics_store
+
+
+def record_metric(name: str, value: float, device_name: Optional[str] = None):
+    get_metrics_store().record(name, value, device_name)
+
+
+def metric_timer(name: str, device_name: Optional[str] = None):
+    return get_metrics_store().timer(name, device_name)
+
+
+def flush_metrics() -> Optional[MetricsStore]:
+    """写入本进程记录的指标；从未记录过时返回 None"""
+    if _metrics_store is None:
+        return None
+    _metrics_store.flush()
+    return _metrics_store
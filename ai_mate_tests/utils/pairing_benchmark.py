@@ -0,0 +1,191 @@
+# utils/pairing_benchmark.py
+"""
+眼镜配对端到端耗时
+
+一轮配对按阶段打点（均为距本轮开始的秒数）：
+  scan_visible     扫描结果中出现眼镜（device_item）
+  item_tapped      点击 device_item 完成
+  pair_tapped      点击 pair_button 完成
+  bonded           系统蓝牙绑定完成（logcat 中的 BOND_BONDED）
+  success_visible  success_texts 出现
+
+每台设备重复 N 轮（每轮之间通过系统设置取消配对），按设备和眼镜固件统计各阶段分位数。
+"""
+import logging
+import re
+import subprocess
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from ai_mate_tests.utils.adb_channel import get_adb_path
+
+logger = logging.getLogger(__name__)
+
+PHASES = ["scan_visible", "item_tapped", "pair_tapped", "bonded", "success_visible"]
+
+# 各 Android 版本蓝牙栈记录绑定完成的日志（BondStateMachine / btif / 广播）
+BOND_PATTERN = re.compile(r"BOND_BONDED|bond state.*(->|to)\s*12|newState[:=]\s*12|bondState[:=]\s*12",
+                          re.IGNORECASE)
+
+
+class PairingCycle(NamedTuple):
+    """一轮配对的结果"""
+    device_name: str
+    firmware: str
+    cycle: int
+    phases: Dict[str, Optional[float]]  # 阶段 -> 距本轮开始的秒数，未观测到为 None
+    ok: bool
+    error: str = ""
+
+
+class BondWatcher:
+    """
+    读取设备 logcat，记录第一次出现绑定完成日志的时间（本机 monotonic 时间）
+    只读取启动之后的新日志；adb 不可用时 bonded_at 始终为 None
+    """
+
+    def __init__(self, udid: str):
+        self.udid = udid
+        self.bonded_at: Optional[float] = None
+        self.line: Optional[str] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._event = threading.Event()
+
+    def start(self) -> "BondWatcher":
+        try:
+            self._process = subprocess.Popen(
+                [get_adb_path(), '-s', self.udid, 'logcat', '-T', '1', '-v', 'brief'],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+                errors="ignore",
+            )
+        except OSError as e:
+            logger.warning(f"⚠️ {self.udid} 无法读取 logcat，不记录绑定完成时间: {e}")
+            return self
+        threading.Thread(target=self._read_loop, name=f"bond-watcher-{self.udid}", daemon=True).start()
+        return self
+
+    def _read_loop(self):
+        lines = iter(self._process.stdout)
+        # -T 1 会先输出一行启动前的旧日志，跳过
+        next(lines, None)
+        for line in lines:
+            if BOND_PATTERN.search(line):
+                self.bonded_at = time.monotonic()
+                self.line = line.strip()
+                self._event.set()
+                break
+
+    def wait(self, timeout: float) -> Optional[float]:
+        self._event.wait(timeout)
+        return self.bonded_at
+
+    def stop(self):
+        process, self._process = self._process, None
+        if process is not None:
+            process.kill()
+            process.wait(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def reset_pairing(driver_factory, driver):
+    """
+    通过系统设置取消配对，再回到 AI Mate 扫描界面
+    :return: 当前driver（切换应用时重建了会话则为新的driver）
+    """
+    from ai_mate_tests.pages.device_page import DevicePage
+    from ai_mate_tests.pages.settings_page import SettingsPage
+
+    driver = driver_factory.switch_application(driver, "settings")
+    SettingsPage(driver).unpair_device()
+    driver = driver_factory.switch_application(driver, "ai_mate")
+    DevicePage(driver).open_scan()
+    return driver
+
+
+def measure_pairing(device_page, udid: str, scan_timeout: float = 30,
+                    success_timeout: float = 60) -> Dict[str, Optional[float]]:
+    """
+    在扫描界面执行一轮配对并按阶段打点
+    :param device_page: DevicePage
+    :param udid: 设备序列号（读取 logcat）
+    :return: 阶段 -> 距本轮开始的秒数；配对未成功时 success_visible 为 None
+    """
+    phases: Dict[str, Optional[float]] = dict.fromkeys(PHASES)
+    with BondWatcher(udid) as watcher:
+        start = time.monotonic()
+        device_page.wait_scan_result(timeout=scan_timeout)
+        phases['scan_visible'] = time.monotonic() - start
+
+        device_page.search_device()
+        phases['item_tapped'] = time.monotonic() - start
+
+        # 不用 pair_device()：其后的界面稳定等待会计入 pair_tapped，并推迟成功文案的首次轮询
+        device_page.click_by_config("pair_button")
+        phases['pair_tapped'] = time.monotonic() - start
+
+        if device_page.is_paired_success(timeout=success_timeout):
+            phases['success_visible'] = time.monotonic() - start
+        # 绑定日志可能晚于应用界面更新，成功后再给一点时间
+        bonded_at = watcher.wait(timeout=2)
+        if bonded_at is not None:
+            phases['bonded'] = bonded_at - start
+    return phases
+
+
+# ========== 统计 ==========
+
+def percentile(values: List[float], q: float) -> float:
+    """线性插值分位数，q 取 0~100"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(cycles: List[PairingCycle], quantiles=(50, 90, 95)) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    按 "固件/设备" 统计各阶段分位数
+    :return: {"<firmware>/<device>": {phase: {"p50": .., "p90": .., "p95": .., "max": .., "n": ..}}}
+    """
+    groups: Dict[str, Dict[str, List[float]]] = {}
+    for cycle in cycles:
+        if not cycle.ok:
+            continue
+        phases = groups.setdefault(f"{cycle.firmware}/{cycle.device_name}", {})
+        for phase, value in cycle.phases.items():
+            if value is not None:
+                phases.setdefault(phase, []).append(value)
+
+    summary = {}
+    for group, phases in groups.items():
+        summary[group] = {}
+        for phase in PHASES:
+            values = phases.get(phase)
+            if not values:
+                continue
+            stats = {f"p{q}": percentile(values, q) for q in quantiles}
+            stats.update(max=max(values), n=len(values))
+            summary[group][phase] = stats
+    return summary
+
+
+def format_summary(summary: Dict[str, Dict[str, Dict[str, float]]]) -> str:
+    lines = []
+    for group in sorted(summary):
+        lines.append(f"📱 {group}")
+        for phase, stats in summary[group].items():
+            quantiles = "  ".join(f"{k} {v:7.2f}s" for k, v in stats.items() if k.startswith('p'))
+            lines.append(f"   {phase:<16} {quantiles}  max {stats['max']:7.2f}s  n={stats['n']}")
+    return "\n".join(lines)
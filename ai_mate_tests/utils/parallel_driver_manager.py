@@ -1,59 +1,70 @@
-from appium import webdriver
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
 import threading
 import subprocess
 
+from ai_mate_tests.utils.adb_channel import get_adb_path, get_channel
+from ai_mate_tests.utils.adb_client import AdbClient
+from ai_mate_tests.utils.device_lease import DeviceLease, lease_devices
 from ai_mate_tests.utils.driver_factory import DriverFactory
 from ai_mate_tests.utils.element_manager import ElementManager
+from ai_mate_tests.utils.session_health import SessionHealthMonitor
+
+if TYPE_CHECKING:
+    from appium import webdriver
 
 
 class ParallelDriverManager:
     def __init__(self):
         self.driver_factory = DriverFactory()
-        self.drivers: Dict[str, webdriver.Remote] = {}
+        self.driver_factory.manager = self
+        self.drivers: Dict[str, "webdriver.Remote"] = {}
         self.lock = threading.Lock()
+        self.health: Optional[SessionHealthMonitor] = None
+        # 设备名 -> 租约，xdist 多个 worker 不会同时使用同一台设备
+        self.leases: Dict[str, DeviceLease] = {}
 
     def detect_connected_devices(self) -> List[Dict]:
         """动态检测连接的设备"""
         try:
-            result = subprocess.run(
-                ['adb', 'devices'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            devices = []
-            lines = result.stdout.strip().split('\n')[1:]
-
-            for line in lines:
-                if line.strip() and 'device' in line:
-                    device_id = line.split('\t')[0]
-                    device_info = self.get_device_info(device_id)
-                    devices.append(device_info)
-
-            return devices
+            device_ids = self._list_device_ids()
+            return [self.get_device_info(device_id) for device_id in device_ids]
         except Exception as e:
             print(f"设备检测失败: {e}")
             return []
 
+    @staticmethod
+    def _list_device_ids() -> List[str]:
+        """列出在线设备：优先直连 adb server，不可用时回退到 adb devices 命令"""
+        try:
+            return [serial for serial, state in AdbClient().devices() if state == 'device']
+        except OSError as e:
+            print(f"⚠️ adb server 不可连接，改用 adb 命令: {e}")
+
+        result = subprocess.run(
+            [get_adb_path(), 'devices'],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+
+        device_ids = []
+        lines = result.stdout.strip().split('\n')[1:]
+        for line in lines:
+            if line.strip() and 'device' in line:
+                device_ids.append(line.split('\t')[0])
+        return device_ids
+
     @staticmethod
     def get_device_info(device_id: str) -> Dict:
         """获取设备详细信息"""
         try:
-            # 获取设备型号
-            model_result = subprocess.run(
-                ['adb', '-s', device_id, 'shell', 'getprop', 'ro.product.model'],
-                capture_output=True, text=True, timeout=5
-            )
-            model = model_result.stdout.strip().replace(' ', '_')
-
-            # 获取安卓版本
-            version_result = subprocess.run(
-                ['adb', '-s', device_id, 'shell', 'getprop', 'ro.build.version.release'],
-                capture_output=True, text=True, timeout=5
+            # 通过常驻 shell 通道一次获取设备型号和安卓版本
+            result = get_channel(device_id).run(
+                "getprop ro.product.model; getprop ro.build.version.release", timeout=5
             )
-            android_version = version_result.stdout.strip()
+            lines = result.output.splitlines() + ['', '']
+            model = lines[0].strip().replace(' ', '_')
+            android_version = lines[1].strip()
 
             return {
                 'device_id': device_id,
@@ -90,20 +101,48 @@ class ParallelDriverManager:
             print(f"查找设备配置失败: {e}")
             return None
 
-    def auto_create_drivers(self, app_name: str = "ai_mate") -> List[str]:
-        """自动检测设备并创建驱动 - 基于 UDID 匹配"""
+    def auto_create_drivers(self, app_name: str = "ai_mate", lease_timeout: Optional[float] = None,
+                            exclude: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        自动检测设备并创建驱动 - 基于 UDID 匹配
+        先租用全部匹配的设备：有设备正被其他进程（xdist worker）使用时等待其释放，
+        超时则跳过被占用的设备
+        :param exclude: 不使用的设备名（如增量选择中本次可跳过的设备）
+        """
+        exclude = set(exclude or ())
+        # 启动任何会话前统一报告一次配置问题
+        self.driver_factory.config_loader.report_config_errors()
+
         connected_devices = self.detect_connected_devices()
         created_drivers = []
 
         print(f"🔍 检测到 {len(connected_devices)} 台设备，开始 UDID 匹配...")
 
+        # 根据 UDID 在配置文件中查找对应的设备名称
+        configured = {}
         for device_info in connected_devices:
             udid = device_info['device_id']
-
-            # 根据 UDID 在配置文件中查找对应的设备名称
             configured_name = self.find_device_by_udid(udid)
+            if configured_name in exclude:
+                print(f"⏭️ 设备 {configured_name} 本次跳过")
+            elif configured_name:
+                configured[udid] = configured_name
+            else:
+                print(f"❌ 设备 {device_info['device_name']} (UDID: {udid}) 在配置文件中没有对应的配置")
 
-            if configured_name:
+        wanted = [udid for udid in configured if configured[udid] not in self.leases]
+        leases = lease_devices(wanted, timeout=lease_timeout, min_count=len(wanted))
+        if wanted and not leases:
+            # 等待超时：退而使用当前空闲的设备
+            leases = lease_devices(wanted, timeout=0)
+        for lease in leases:
+            self.leases[configured[lease.udid]] = lease
+        if len(self.leases) < len(configured):
+            busy = sorted(name for name in configured.values() if name not in self.leases)
+            print(f"🔒 {len(busy)} 台设备正被其他进程使用，本次跳过: {', '.join(busy)}")
+
+        for udid, configured_name in configured.items():
+            if configured_name in self.leases:
                 try:
                     driver = self.create_driver(configured_name, app_name)
                     if driver:
@@ -113,26 +152,25 @@ class ParallelDriverManager:
                         print(f"❌ 设备 {configured_name} 驱动创建失败")
                 except Exception as e:
                     print(f"⚠️ 为设备 {configured_name} 创建驱动失败: {e}")
-            else:
-                print(f"❌ 设备 {device_info['device_name']} (UDID: {udid}) 在配置文件中没有对应的配置")
 
         return created_drivers
 
     def create_driver(self, device_name: str, app_name: str = "ai_mate"):
         """创建驱动 - 使用原有逻辑"""
-        with self.lock:
-            if device_name in self.drivers:
-                self.quit_driver(device_name)
-
-            try:
-                driver = self.driver_factory.get_driver(device_name, app_name)
-                if driver:
-                    driver.element_manager = ElementManager(driver.config_loader, device_name)
-                    self.drivers[device_name] = driver
-                return driver
-            except Exception as e:
-                print(f"创建驱动失败: {e}")
-                return None
+        # 创建会话耗时较长，不持有锁，避免阻塞其他设备获取驱动
+        self.quit_driver(device_name)
+
+        try:
+            driver = self.driver_factory.get_driver(device_name, app_name)
+        except Exception as e:
+            print(f"创建驱动失败: {e}")
+            return None
+
+        if driver:
+            driver.element_manager = ElementManager(driver.config_loader, device_name)
+            with self.lock:
+                self.drivers[device_name] = driver
+        return driver
 
     def get_driver(self, device_name: str):
         """获取驱动"""
@@ -149,18 +187,50 @@ class ParallelDriverManager:
     def quit_driver(self, device_name: str):
         """退出驱动"""
         with self.lock:
-            if device_name in self.drivers:
-                try:
-                    self.drivers[device_name].quit()
-                except Exception as e:
-                    print(f"退出驱动失败: {e}")
-                del self.drivers[device_name]
+            driver = self.drivers.pop(device_name, None)
+        if driver is None:
+            return
+
+        element_manager = getattr(driver, 'element_manager', None)
+        if element_manager is not None:
+            stats = element_manager.cache_stats()
+            print(f"📦 {device_name} 元素缓存命中率 {stats['hit_rate']:.0%} "
+                  f"(命中 {stats['hits']}, 未命中 {stats['misses']}, 失效 {stats['stale']})")
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"退出驱动失败: {e}")
 
     def quit_all_drivers(self):
         """退出所有驱动"""
+        self.stop_health_monitor()
         with self.lock:
-            for device_name in list(self.drivers.keys()):
-                self.quit_driver(device_name)
+            device_names = list(self.drivers.keys())
+        for device_name in device_names:
+            self.quit_driver(device_name)
+        self.release_leases()
+
+    def release_leases(self):
+        """释放设备租约，等待中的其他进程可以使用这些设备"""
+        leases, self.leases = self.leases, {}
+        for lease in leases.values():
+            lease.release()
+
+    # ========== 会话健康 ==========
+
+    def start_health_monitor(self, device_names: Optional[List[str]] = None, **kwargs) -> SessionHealthMonitor:
+        """为已创建的驱动启动心跳监控，失效会话自动重建，反复失败的设备被隔离"""
+        if self.health is None:
+            self.health = SessionHealthMonitor(self, **kwargs)
+        return self.health.start(device_names)
+
+    def stop_health_monitor(self):
+        if self.health is not None:
+            self.health.stop()
+            self.health = None
+
+    def is_quarantined(self, device_name: str) -> bool:
+        return self.health is not None and self.health.is_quarantined(device_name)
 
     def get_detected_devices_info(self) -> List[Dict]:
         """获取检测到的设备详细信息"""
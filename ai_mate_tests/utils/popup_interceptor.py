@@ -0,0 +1,194 @@
+# utils/popup_interceptor.py
+"""
+后台弹窗拦截器
+
+每台设备一个后台线程：定期获取 page source 并计算哈希，只有界面发生变化时才在本地
+（utils/hierarchy）匹配配置的弹窗定位，命中后按配置坐标或元素中心点击关闭。
+主流程不再需要在每一步前阻塞等待 popup_button。
+
+  - 只识别显式配置的 popup_page.popup_dismiss；未配置时拦截器不启动（armed 为 False）。
+    popup_button 通常是宽泛的定位（如任意 Button），不能用来在后台自动点击
+  - 点击前向服务端重新查找一次，弹窗已经消失时不点击
+  - 检查和点击期间持有 ElementManager.action_lock，不会插在主流程的查找和点击之间
+
+    with PopupInterceptor(driver, driver.element_manager):
+        welcome.accept_all()
+"""
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+from ai_mate_tests.utils.config_loader import ConfigLoader
+from ai_mate_tests.utils.hierarchy import find_all, parse_hierarchy
+
+logger = logging.getLogger(__name__)
+
+
+class Dismissal(NamedTuple):
+    """一次弹窗关闭记录"""
+    timestamp: float
+    device_name: str
+    locator: str
+    x: int
+    y: int
+    latency: float  # 获取快照到点击完成的耗时（秒）
+
+
+def _foreground_package(root) -> Optional[str]:
+    """快照中第一个带包名的节点即前台窗口"""
+    for element in root.iter():
+        if element.get('package'):
+            return element.get('package')
+    return None
+
+
+class PopupInterceptor:
+    """
+    :param driver: 设备 driver
+    :param element_manager: 设备的 ElementManager（提供配置与手势）
+    :param poll_interval: 检查界面变化的间隔（秒）
+    :param locators: 弹窗定位列表，默认读取 config_loader.get_popup_dismiss_locators
+    :param packages: 只在这些包名的界面上拦截，默认为 driver 当前应用的包名；
+                     系统权限框、蓝牙配对框等其他包的对话框属于正常流程，不会被关闭
+    """
+
+    def __init__(self, driver, element_manager, poll_interval: float = 0.5,
+                 locators: Optional[List[Dict]] = None, packages: Optional[List[str]] = None):
+        self.driver = driver
+        self.element_manager = element_manager
+        self.device_name = element_manager.device_name
+        self.poll_interval = poll_interval
+
+        config_loader = element_manager.config_loader
+        self._explicit_locators = locators
+        self._load_config(config_loader)
+        # 配置热加载后使用新的弹窗定位和关闭坐标
+        config_loader.add_reload_listener(self._load_config)
+        if packages is None:
+            app_package = config_loader.get_app_config(getattr(driver, 'app_name', None)).get('app_package')
+            packages = [app_package] if app_package else []
+        self.packages = set(packages)
+
+        self.dismissals: List[Dismissal] = []
+        self.stats = {'polls': 0, 'changes': 0, 'errors': 0}
+        self._last_hash: Optional[str] = None
+        # 与主流程（ElementManager 的各项操作）共用同一把锁访问 driver
+        self._lock = element_manager.action_lock
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load_config(self, config_loader: ConfigLoader):
+        locators = []
+        for locator in (self._explicit_locators if self._explicit_locators is not None
+                        else config_loader.get_popup_dismiss_locators(self.device_name)):
+            by, value = ConfigLoader.convert_locator_to_appium_format(locator)
+            locators.append((by, value, locator.get('tap', 'element')))
+        self.locators = locators
+        self.close_coords = config_loader.get_popup_close_coords(self.device_name)
+
+    @property
+    def armed(self) -> bool:
+        """配置了 popup_dismiss，拦截器会启动"""
+        return bool(self.locators)
+
+    # ========== 生命周期 ==========
+
+    def start(self) -> "PopupInterceptor":
+        """启动前先同步检查一次，已经存在的弹窗在主流程开始前关闭"""
+        if not self.armed:
+            logger.warning(f"⚠️ {self.device_name} 未配置 popup_page.popup_dismiss，拦截器不启动")
+            return self
+        self.check_once()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"popup-interceptor-{self.device_name}",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, final_check: bool = True):
+        """停止后台线程；final_check 时再同步检查一次，覆盖最后一步操作后出现的弹窗"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=self.poll_interval + 5)
+            self._thread = None
+            if final_check:
+                self.check_once()
+        if self.dismissals:
+            logger.info(f"🧹 {self.device_name} 共关闭 {len(self.dismissals)} 个弹窗，"
+                        f"检查 {self.stats['polls']} 次，界面变化 {self.stats['changes']} 次")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # 主流程出错时不再做最后检查，尽快把异常交给测试
+        self.stop(final_check=exc_type is None)
+
+    @contextmanager
+    def paused(self):
+        """在不允许被打断的操作期间暂停拦截"""
+        with self._lock:
+            yield
+
+    # ========== 检查 ==========
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_once()
+            except Exception as e:
+                # 会话结束或网络抖动时不影响主流程
+                self.stats['errors'] += 1
+                logger.debug(f"{self.device_name} 弹窗检查失败: {e}")
+
+    def check_once(self) -> Optional[Dismissal]:
+        """获取一次快照；界面有变化时匹配并关闭弹窗"""
+        with self._lock:
+            dismissal = self._check()
+        if dismissal is not None:
+            # 弹窗关闭后界面变化，缓存的元素句柄不再可信（释放 action_lock 后再清除，避免与元素缓存的锁交叉）
+            self.element_manager.invalidate_cache()
+        return dismissal
+
+    def _check(self) -> Optional[Dismissal]:
+        snapshot_at = time.monotonic()
+        source = self.driver.page_source
+        self.stats['polls'] += 1
+
+        digest = hashlib.md5(source.encode('utf-8')).hexdigest()
+        if digest == self._last_hash:
+            return None
+        self._last_hash = digest
+        self.stats['changes'] += 1
+
+        root = parse_hierarchy(source)
+        if self.packages and _foreground_package(root) not in self.packages:
+            return None
+        for by, value, tap in self.locators:
+            if find_all(root, by, value):
+                return self._dismiss(by, value, tap, snapshot_at)
+        return None
+
+    def _dismiss(self, by: str, value: str, tap: str, snapshot_at: float) -> Optional[Dismissal]:
+        # 快照之后弹窗可能已被关闭或界面已切换：点击前向服务端重新确认，按当前位置点击
+        live = self.driver.find_elements(by, value)
+        if not live:
+            logger.debug(f"{self.device_name} 弹窗 {by}={value} 已消失，不点击")
+            return None
+        if tap == 'coords' and self.close_coords:
+            x, y = self.close_coords['x'], self.close_coords['y']
+        else:
+            rect = live[0].rect
+            x, y = rect['x'] + rect['width'] // 2, rect['y'] + rect['height'] // 2
+
+        self.element_manager.gestures(self.driver).tap(x, y).perform()
+        self._last_hash = None
+
+        locator = f"{by}={value}"
+        dismissal = Dismissal(time.time(), self.device_name, locator, x, y, time.monotonic() - snapshot_at)
+        self.dismissals.append(dismissal)
+        logger.info(f"🧹 {self.device_name} 关闭弹窗 {locator} @({x}, {y})")
+        return dismissal
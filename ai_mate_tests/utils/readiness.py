@@ -0,0 +1,165 @@
+# utils/readiness.py
+import fnmatch
+import hashlib
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional
+
+from ai_mate_tests.utils.adb_channel import get_channel
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WaitResult:
+    """一次就绪等待的结果"""
+    name: str
+    ok: bool
+    elapsed: float
+    attempts: int
+    detail: str = ""
+
+
+def poll_until(condition: Callable[[], bool], timeout: float, name: str = "condition",
+               initial_interval: float = 0.05, max_interval: float = 0.5,
+               backoff: float = 1.5) -> WaitResult:
+    """
+    自适应轮询：从短间隔开始，逐步放大到 max_interval，直到条件满足或超过截止时间
+    :param condition: 返回 True 表示就绪；抛出的异常视为未就绪
+    :param timeout: 截止时间（秒）
+    :param name: 等待名称，用于记录
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    interval = initial_interval
+    attempts = 0
+    detail = ""
+
+    while True:
+        attempts += 1
+        try:
+            if condition():
+                return WaitResult(name, True, time.monotonic() - start, attempts)
+        except Exception as e:
+            detail = str(e)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return WaitResult(name, False, time.monotonic() - start, attempts, detail)
+
+        time.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+def ui_fingerprint(source: str) -> str:
+    """界面指纹：按文档顺序的 (类名, resource-id, bounds) 的哈希，解析失败时退化为整段源码哈希"""
+    digest = hashlib.md5()
+    try:
+        root = ET.fromstring(source.encode('utf-8'))
+    except ET.ParseError:
+        digest.update(source.encode('utf-8'))
+        return digest.hexdigest()
+    for element in root.iter():
+        digest.update(f"{element.get('class', element.tag)}|{element.get('resource-id', '')}|"
+                      f"{element.get('bounds', '')};".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def activity_matches(package: str, activity: str, patterns: List[str]) -> bool:
+    """判断当前Activity是否匹配通配符列表（兼容 ".Settings" 这样的相对名称）"""
+    activity = activity or ""
+    if activity.startswith("."):
+        activity = f"{package}{activity}"
+    return any(fnmatch.fnmatch(activity, p) for p in patterns)
+
+
+class ReadinessProbe:
+    """基于具体条件的就绪探测，替代固定 sleep"""
+
+    MAX_TIMINGS = 5000
+
+    def __init__(self):
+        # 只保留最近的记录，长时间运行（soak）内存不增长
+        self.timings: Deque[WaitResult] = deque(maxlen=self.MAX_TIMINGS)
+        self._lock = threading.Lock()
+
+    def _record(self, result: WaitResult, device_name: str = "") -> WaitResult:
+        with self._lock:
+            self.timings.append(result)
+        status = "✅" if result.ok else "⚠️"
+        logger.info(
+            f"{status} {device_name} {result.name}: {result.elapsed:.2f}s ({result.attempts} 次探测)"
+        )
+        return result
+
+    def wait_process_gone(self, udid: str, package: str, timeout: float = 5) -> WaitResult:
+        """等待应用进程退出"""
+        channel = get_channel(udid)
+
+        def _gone():
+            return not channel.run(f"pidof {package}", timeout=5).output.strip()
+
+        result = poll_until(_gone, timeout, name=f"进程退出 {package}")
+        return self._record(result, udid)
+
+    def wait_activity_focused(self, driver, patterns: List[str], package: Optional[str] = None,
+                              timeout: float = 30) -> WaitResult:
+        """
+        等待期望的Activity获得焦点
+        :param patterns: Activity 通配符列表；为空时只比较包名
+        :param package: 期望的包名
+        """
+        def _focused():
+            current_package = driver.current_package
+            if patterns:
+                return activity_matches(current_package, driver.current_activity, patterns)
+            return current_package == package
+
+        result = poll_until(_focused, timeout, name=f"Activity就绪 {package or patterns}")
+        return self._record(result, getattr(driver, 'device_name', ''))
+
+    def wait_hierarchy_stable(self, driver, quiet_period: float = 0.5, timeout: float = 5,
+                              name: str = "界面稳定") -> WaitResult:
+        """
+        等待界面稳定：连续 quiet_period 秒内界面指纹（节点类名、ID、位置）不再变化
+        文本变化（时间、电量等）不影响指纹，动画和页面切换会改变 bounds 或节点结构
+        """
+        state = {'fingerprint': None, 'since': time.monotonic()}
+
+        def _stable():
+            fingerprint = ui_fingerprint(driver.page_source)
+            now = time.monotonic()
+            if fingerprint != state['fingerprint']:
+                state['fingerprint'] = fingerprint
+                state['since'] = now
+                return False
+            return now - state['since'] >= quiet_period
+
+        result = poll_until(_stable, timeout, name=name,
+                            initial_interval=0.1, max_interval=max(quiet_period / 2, 0.1))
+        return self._record(result, getattr(driver, 'device_name', ''))
+
+    def get_timings(self, name_prefix: str = None) -> List[WaitResult]:
+        """获取等待耗时记录"""
+        with self._lock:
+            if name_prefix is None:
+                return list(self.timings)
+            return [t for t in self.timings if t.name.startswith(name_prefix)]
+
+
+_default_probe: Optional[ReadinessProbe] = None
+_default_probe_lock = threading.Lock()
+
+
+def get_readiness_probe() -> ReadinessProbe:
+    """进程内共享的 ReadinessProbe，所有等待耗时记录在一处"""
+    global _default_probe
+    if _default_probe is None:
+        with _default_probe_lock:
+            if _default_probe is None:
+                _default_probe = ReadinessProbe()
+    return _default_probe
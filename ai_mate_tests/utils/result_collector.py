@@ -0,0 +1,168 @@
+# utils/result_collector.py
+"""
+多设备结果收集
+
+每台设备在线程池中独立执行同一函数，无论成功还是失败都完整记录：
+结果、异常、耗时、函数返回的分段耗时，以及失败时当场截取的截图和界面结构。
+所有设备执行完后再统一附加到 Allure，由测试根据汇总决定是否失败，
+单台设备出错不会中断其他设备结果的收集。
+
+设备由 SessionHealthMonitor 监控时，执行期间持有该设备（监控不会在用例中途重建会话）；
+因会话失效失败时等待监控重建，用新 driver 重试一次，并把 drivers 中的 driver 换成新会话。
+
+    collector = ResultCollector("蓝牙稳定性")
+    collector.run(parallel_drivers, _run_single_device_test)
+    collector.attach_to_allure()
+    if collector.failed:
+        pytest.fail(collector.failure_summary())
+"""
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ai_mate_tests.utils.session_health import monitor_for
+
+
+@dataclass
+class DeviceResult:
+    """单台设备的执行结果"""
+    device_name: str
+    success: bool = False
+    error: Optional[str] = None
+    traceback: Optional[str] = None
+    elapsed: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
+    retried: bool = False    # 会话重建后重试过
+    # (名称, 内容, 类型)，类型为 "png" / "xml" / "text"
+    artifacts: List[Tuple[str, object, str]] = field(default_factory=list)
+
+    def summary(self) -> str:
+        lines = [f"设备: {self.device_name}",
+                 f"结果: {'通过' if self.success else '失败'}",
+                 f"耗时: {self.elapsed:.2f}s"]
+        if self.retried:
+            lines.append("会话失效后已重建并重试")
+        for name, value in self.timings.items():
+            lines.append(f"  {name}: {value:.2f}s")
+        if self.error:
+            lines.append(f"错误: {self.error}")
+        if self.traceback:
+            lines.append(self.traceback)
+        return "\n".join(lines)
+
+
+class ResultCollector:
+    """
+    :param name: 测试名称，用于输出
+    :param capture_artifacts: 失败时是否截取截图和界面结构
+    """
+
+    def __init__(self, name: str, capture_artifacts: bool = True):
+        self.name = name
+        self.capture_artifacts = capture_artifacts
+        self.results: Dict[str, DeviceResult] = {}
+        self._recovered: Dict[str, object] = {}
+
+    # ========== 执行 ==========
+
+    def run(self, drivers: Dict[str, object], func: Callable, max_workers: Optional[int] = None
+            ) -> Dict[str, DeviceResult]:
+        """
+        所有设备并行执行 func(driver, device_name)
+        func 返回 dict 时作为分段耗时（秒）记录；抛出异常即视为该设备失败
+        会话重建后重试的设备，drivers 中的 driver 更新为新会话
+        """
+        if not drivers:
+            return self.results
+
+        with ThreadPoolExecutor(max_workers=max_workers or len(drivers)) as executor:
+            futures = {executor.submit(self._run_one, driver, device_name, func): device_name
+                       for device_name, driver in drivers.items()}
+            for future in as_completed(futures):
+                result = future.result()  # _run_one 不抛异常
+                self.results[result.device_name] = result
+        drivers.update(self._recovered)
+        return self.results
+
+    def _run_one(self, driver, device_name: str, func: Callable) -> DeviceResult:
+        result = DeviceResult(device_name)
+        monitor = monitor_for(device_name)
+        start = time.monotonic()
+        while True:
+            try:
+                with monitor.hold(device_name) if monitor else nullcontext():
+                    returned = func(driver, device_name)
+                if isinstance(returned, dict):
+                    result.timings.update(returned)
+                result.success = True
+                print(f"✅ {device_name} - {self.name}通过")
+            except Exception as e:
+                # 会话失效导致的失败：等监控重建后用新 driver 重试一次
+                recovered = None
+                if monitor is not None and not result.retried:
+                    recovered = monitor.recover_after_failure(device_name, driver, e)
+                if recovered is not None:
+                    print(f"🔁 {device_name} - 会话已重建，重试{self.name}")
+                    driver = self._recovered[device_name] = recovered
+                    result.retried = True
+                    continue
+                # 断言失败、会话失效等都只记录，不向上抛
+                result.error = f"{type(e).__name__}: {e}"
+                result.traceback = traceback.format_exc()
+                print(f"❌ {device_name} - {self.name}失败: {e}")
+                if self.capture_artifacts:
+                    self._capture(driver, result)
+            break
+        result.elapsed = time.monotonic() - start
+        return result
+
+    def _capture(self, driver, result: DeviceResult):
+        """失败当场截取截图和界面结构（会话已失效时跳过），界面结构同时存入归档"""
+        try:
+            result.artifacts.append((f"{result.device_name}_截图", driver.get_screenshot_as_png(), "png"))
+        except Exception as e:
+            print(f"⚠️ 截图失败: {result.device_name} - {e}")
+        try:
+            page_source = driver.page_source
+        except Exception:
+            return
+        result.artifacts.append((f"{result.device_name}_界面结构", page_source, "xml"))
+        try:
+            from ai_mate_tests.utils.hierarchy_archive import get_hierarchy_archive
+            capture = get_hierarchy_archive().add(page_source, result.device_name, reason="failure", label=self.name)
+            result.artifacts.append((f"{result.device_name}_界面结构归档", f"快照 {capture.describe()}", "text"))
+        except Exception as e:
+            print(f"⚠️ 界面结构归档失败: {result.device_name} - {e}")
+
+    # ========== 汇总 ==========
+
+    @property
+    def failed(self) -> List[str]:
+        return sorted(name for name, result in self.results.items() if not result.success)
+
+    @property
+    def passed(self) -> List[str]:
+        return sorted(name for name, result in self.results.items() if result.success)
+
+    def failure_summary(self) -> str:
+        details = "; ".join(f"{name}: {self.results[name].error}" for name in self.failed)
+        return f"部分设备{self.name}失败 ({len(self.failed)}/{len(self.results)}): {details}"
+
+    def attach_to_allure(self):
+        """每台设备一个结果附件，失败设备附加截图和界面结构（需在测试主线程调用）"""
+        import allure
+
+        for device_name in sorted(self.results):
+            result = self.results[device_name]
+            suffix = "结果" if result.success else "错误"
+            allure.attach(result.summary(), name=f"{device_name}_{suffix}",
+                          attachment_type=allure.attachment_type.TEXT)
+            for name, content, kind in result.artifacts:
+                attachment_type = {
+                    'png': allure.attachment_type.PNG,
+                    'xml': allure.attachment_type.XML,
+                }.get(kind, allure.attachment_type.TEXT)
+                allure.attach(content, name=name, attachment_type=attachment_type)
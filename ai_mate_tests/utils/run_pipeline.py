@@ -0,0 +1,330 @@
+# utils/run_pipeline.py
+"""
+测试运行流水线：采集日志 → pytest → Allure 报告 → 打包，各阶段尽量重叠
+
+run_tests.ps1 只能在 Windows 上运行且严格串行（pytest 结束后才生成报告、再压缩），
+export_allure_report.py 重复了后两步。流水线把各阶段放到后台并行：
+  - logcat / 串口日志在 pytest 开始前启动后台采集，结束后停止
+  - pytest 运行期间每隔 report_interval 秒、有新结果时在后台重新生成报告，运行中即可查看；
+    结束时已是最新则不再生成
+  - pytest 结束后，日志写入压缩包与最终报告生成同时进行；报告生成后再写入压缩包
+  - 各阶段的开始时间和耗时汇总输出（带时间轴），并记录到指标库（pipeline.<阶段>）
+
+xdist 的多个 worker 通过设备租约（utils/device_lease）分配设备，不会同时使用同一台设备。
+"""
+import datetime
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ai_mate_tests.utils.log_capture import LineCapture, LogcatCapture, SerialCapture
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TESTSPLAN_DIR = os.path.join(PROJECT_ROOT, "ai_mate_tests", "testsplan")
+
+
+# ========== Allure 与打包 ==========
+
+def find_allure() -> Optional[str]:
+    """allure 命令行路径（Windows 上为 allure.bat），未安装时为 None"""
+    return shutil.which("allure")
+
+
+def generate_report(results_dir: str, report_dir: str, allure: Optional[str] = None, quiet: bool = False) -> bool:
+    """allure generate；失败或未安装 allure 时返回 False"""
+    allure = allure or find_allure()
+    if allure is None:
+        print("❌ 未找到 allure 命令，请确认 allure 已正确安装！")
+        return False
+    try:
+        subprocess.run([allure, "generate", results_dir, "-o", report_dir, "--clean"], check=True,
+                       stdout=subprocess.DEVNULL if quiet else None, stderr=subprocess.STDOUT if quiet else None)
+        return True
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"❌ 生成 Allure 报告失败: {e}")
+        return False
+
+
+def zip_directory(zf: zipfile.ZipFile, directory: str, prefix: str = "") -> int:
+    """把目录写入压缩包（路径以 prefix 开头），返回文件数"""
+    count = 0
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            zf.write(file_path, os.path.join(prefix, os.path.relpath(file_path, directory)))
+            count += 1
+    return count
+
+
+class BackgroundPackager:
+    """后台线程按顺序把目录写入同一个压缩包，调用方可以继续执行其他阶段"""
+
+    def __init__(self, zip_path: str):
+        self.zip_path = zip_path
+        self.files = 0
+        self._queue: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="packager", daemon=True)
+        self._error: Optional[BaseException] = None
+
+    def start(self) -> "BackgroundPackager":
+        self._thread.start()
+        return self
+
+    def add(self, directory: str, prefix: str = ""):
+        self._queue.put((directory, prefix))
+
+    def _run(self):
+        try:
+            with zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+                while True:
+                    item = self._queue.get()
+                    if item is None:
+                        return
+                    if os.path.isdir(item[0]):
+                        self.files += zip_directory(zf, *item)
+        except BaseException as e:
+            self._error = e
+
+    def finish(self) -> bool:
+        """等待写完；失败时返回 False"""
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            print(f"❌ 打包失败: {self._error}")
+            return False
+        return True
+
+
+# ========== 阶段计时 ==========
+
+class StageTimer:
+    """记录各阶段起止时间（相对流水线开始），阶段可以重叠"""
+
+    def __init__(self):
+        self.origin = time.monotonic()
+        self.stages: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.monotonic() - self.origin
+        try:
+            yield
+        finally:
+            self.add(name, start, time.monotonic() - self.origin)
+
+    def add(self, name: str, start: float, end: float):
+        with self._lock:
+            self.stages[name] = (start, end)
+
+    @property
+    def total(self) -> float:
+        return max((end for _, end in self.stages.values()), default=0.0)
+
+    def format(self, width: int = 40) -> str:
+        total = self.total or 1.0
+        lines = [f"{'阶段':<12}{'开始':>7}{'耗时':>8}  时间轴"]  # 中文占两列
+        for name, (start, end) in sorted(self.stages.items(), key=lambda item: item[1]):
+            left = int(start / total * width)
+            bar = " " * left + "█" * max(1, int(end / total * width) - left)
+            lines.append(f"{name:<14}{start:>8.1f}s{end - start:>9.1f}s  |{bar:<{width}}|")
+        lines.append(f"{'总计':<12}{'':>9}{self.total:>9.1f}s")
+        return "\n".join(lines)
+
+
+# ========== 流水线 ==========
+
+@dataclass
+class PipelineConfig:
+    """
+    :param pytest_args: 追加给 pytest 的参数（如 -k、-m、用例路径）
+    :param workers: xdist worker 数，None 表示不启用 xdist
+    :param report_interval: 运行期间重新生成报告的最短间隔（秒），0 表示只在结束后生成
+    :param serial_ports: {串口: 名称}
+    """
+    results_dir: str = os.path.join(PROJECT_ROOT, "allure-results")
+    report_dir: str = os.path.join(PROJECT_ROOT, "allure-report")
+    logs_dir: Optional[str] = None
+    zip_path: Optional[str] = None
+    pytest_args: List[str] = field(default_factory=list)
+    workers: Optional[str] = None
+    report_interval: float = 60.0
+    capture_logcat: bool = True
+    serial_ports: Dict[str, str] = field(default_factory=dict)
+    package: bool = True
+
+
+class ReportRefresher:
+    """pytest 运行期间在后台重新生成报告：距上次生成超过 interval 且有新结果时生成"""
+
+    def __init__(self, results_dir: str, report_dir: str, interval: float, allure: str):
+        self.results_dir = results_dir
+        self.report_dir = report_dir
+        self.interval = interval
+        self.allure = allure
+        self.generations = 0
+        self.busy_time = 0.0
+        self._seen = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="report-refresher", daemon=True)
+
+    def _result_count(self) -> int:
+        try:
+            return sum(1 for name in os.listdir(self.results_dir) if name.endswith("-result.json"))
+        except OSError:
+            return 0
+
+    def start(self) -> "ReportRefresher":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            count = self._result_count()
+            if count == self._seen:
+                continue
+            start = time.monotonic()
+            if generate_report(self.results_dir, self.report_dir, self.allure, quiet=True):
+                self._seen = count
+                self.generations += 1
+                print(f"📊 报告已更新（{count} 条结果）: {os.path.join(self.report_dir, 'index.html')}")
+            self.busy_time += time.monotonic() - start
+
+    @property
+    def up_to_date(self) -> bool:
+        """最近一次生成后没有新结果，结束后无需再生成"""
+        return self.generations > 0 and self._result_count() == self._seen
+
+    def stop(self):
+        """等待正在进行的生成结束，避免与最终生成同时写报告目录"""
+        self._stop.set()
+        self._thread.join()
+
+
+class RunPipeline:
+    def __init__(self, config: PipelineConfig):
+        self.config = config
+        self.timer = StageTimer()
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.logs_dir = config.logs_dir or os.path.join(PROJECT_ROOT, "run_logs", stamp)
+        self.zip_path = config.zip_path or os.path.join(PROJECT_ROOT, f"allure-report-{stamp}.zip")
+        self._captures: List[LineCapture] = []
+
+    def pytest_command(self) -> List[str]:
+        command = [sys.executable, "-m", "pytest", TESTSPLAN_DIR,
+                   "-c", os.path.join(TESTSPLAN_DIR, "pytest.ini"),
+                   f"--alluredir={self.config.results_dir}", "--clean-alluredir"]
+        if self.config.workers:
+            command += ["-n", str(self.config.workers)]
+        return command + list(self.config.pytest_args)
+
+    def run(self) -> int:
+        allure = find_allure()
+        if allure is None:
+            print("⚠️ 未找到 allure 命令，只运行测试并打包 allure-results")
+
+        with self.timer.stage("capture_start"):
+            self._start_captures()
+
+        refresher = None
+        if allure and self.config.report_interval > 0:
+            refresher = ReportRefresher(self.config.results_dir, self.config.report_dir,
+                                        self.config.report_interval, allure).start()
+        try:
+            with self.timer.stage("pytest"):
+                print(f"▶️ 开始运行测试: {' '.join(self.pytest_command())}")
+                returncode = subprocess.call(self.pytest_command(), cwd=PROJECT_ROOT)
+        finally:
+            if refresher is not None:
+                refresher.stop()
+            with self.timer.stage("capture_stop"):
+                self._stop_captures()
+
+        # 日志写入压缩包与最终报告生成同时进行
+        packager = None
+        if self.config.package:
+            packager = BackgroundPackager(self.zip_path).start()
+            package_start = time.monotonic() - self.timer.origin
+            packager.add(self.logs_dir, "logs")
+
+        report_ok = False
+        if refresher is not None and refresher.up_to_date:
+            print("📊 运行期间生成的报告已包含全部结果")
+            report_ok = True
+        elif allure:
+            with self.timer.stage("report"):
+                print("📊 生成 Allure 报告...")
+                report_ok = generate_report(self.config.results_dir, self.config.report_dir, allure)
+
+        if packager is not None:
+            if report_ok:
+                packager.add(self.config.report_dir)
+            else:
+                packager.add(self.config.results_dir, "allure-results")
+            packaged = packager.finish()
+            self.timer.add("package", package_start, time.monotonic() - self.timer.origin)
+            if packaged:
+                print(f"📦 已打包 {packager.files} 个文件: {self.zip_path}")
+
+        self._report_timings(refresher)
+        if report_ok:
+            print(f"报告路径：{os.path.join(self.config.report_dir, 'index.html')}")
+        if returncode == 0 and allure and not report_ok:
+            return 1
+        return returncode
+
+    # ---------- 日志采集 ----------
+
+    def _start_captures(self):
+        if self.config.capture_logcat:
+            for udid in self._connected_udids():
+                safe_name = udid.replace(":", "_")
+                self._captures.append(LogcatCapture(udid, os.path.join(self.logs_dir, f"logcat_{safe_name}.log")))
+        for port, name in self.config.serial_ports.items():
+            self._captures.append(SerialCapture(port, os.path.join(self.logs_dir, f"serial_{name}.log")))
+        for capture in self._captures:
+            capture.start()
+        if self._captures:
+            print(f"📝 后台采集 {len(self._captures)} 路日志: {self.logs_dir}")
+
+    def _stop_captures(self):
+        captures, self._captures = self._captures, []
+        for capture in captures:
+            capture.stop()
+
+    @staticmethod
+    def _connected_udids() -> List[str]:
+        from ai_mate_tests.utils.adb_client import AdbClient
+        try:
+            return [serial for serial, state in AdbClient().devices() if state == 'device']
+        except OSError as e:
+            print(f"⚠️ adb server 不可连接，不采集 logcat: {e}")
+            return []
+
+    # ---------- 汇总 ----------
+
+    def _report_timings(self, refresher: Optional[ReportRefresher]):
+        print("\n⏱️ 各阶段耗时")
+        print(self.timer.format())
+        if refresher is not None and refresher.generations:
+            print(f"（运行期间后台生成报告 {refresher.generations} 次，共 {refresher.busy_time:.1f}s）")
+        pytest_time = self.timer.stages["pytest"]
+        overhead = self.timer.total - (pytest_time[1] - pytest_time[0])
+        print(f"端到端 {self.timer.total:.1f}s，pytest 之外 {overhead:.1f}s")
+
+        from ai_mate_tests.utils.metrics_store import flush_metrics, record_metric
+        for name, (start, end) in self.timer.stages.items():
+            record_metric(f"pipeline.{name}", end - start)
+        record_metric("pipeline.overhead", overhead)
+        flush_metrics()
@@ -0,0 +1,319 @@
+# utils/session_health.py
+"""
+Appium 会话健康监控
+
+每台设备一个后台线程，在 newCommandTimeout 之内用开销最小的命令（GET timeouts，
+服务端不访问设备）做心跳，既防止空闲会话被服务端回收，也能及时发现已经失效的会话：
+  - 会话失效后按指数退避重建，重建成功后 ParallelDriverManager 中的 driver 被替换
+  - 同一设备会话反复失效或多次重建失败时隔离（quarantine），不再重建，其余设备照常运行
+  - 用例通过 hold() 持有设备期间不重建（重建会强制停止应用，打断仍在使用旧 driver 的用例），
+    释放后再确认；用例因会话失效失败时，recover_after_failure() 等待重建并返回新 driver 供重试
+
+    manager.start_health_monitor()
+    ...
+    manager.stop_health_monitor()
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from ai_mate_tests.utils.parallel_driver_manager import ParallelDriverManager
+
+logger = logging.getLogger(__name__)
+
+# Selenium 中获取超时设置的命令名称（Command.GET_TIMEOUTS）
+HEARTBEAT_COMMAND = "getTimeouts"
+
+# 服务端返回这些错误时说明会话已不存在，无需等待下一次心跳确认
+_SESSION_LOST_MARKERS = (
+    "invalid session id",
+    "session is either terminated or not started",
+    "a session is either terminated",
+    "no such session",
+)
+
+
+# 设备名 -> 正在监控它的 SessionHealthMonitor（ResultCollector 据此持有设备和等待重建）
+_monitors: Dict[str, "SessionHealthMonitor"] = {}
+_monitors_lock = threading.Lock()
+
+
+def monitor_for(device_name: str) -> Optional["SessionHealthMonitor"]:
+    """正在监控该设备的 SessionHealthMonitor，没有时为 None"""
+    with _monitors_lock:
+        return _monitors.get(device_name)
+
+
+class HealthEvent(NamedTuple):
+    """一次健康状态变化记录"""
+    timestamp: float
+    device_name: str
+    event: str  # lost / recovered / recover_failed / quarantined
+    detail: str
+
+
+def _is_session_lost(error: Exception) -> bool:
+    """会话已被服务端删除，或者连接不上 Appium 服务"""
+    if type(error).__name__ in ("InvalidSessionIdException", "NoSuchDriverException"):
+        return True
+    if isinstance(error, (ConnectionError, OSError)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _SESSION_LOST_MARKERS)
+
+
+def _new_command_timeout(driver) -> Optional[float]:
+    capabilities = getattr(driver, 'capabilities', None) or {}
+    for key in ("newCommandTimeout", "appium:newCommandTimeout"):
+        if capabilities.get(key):
+            return float(capabilities[key])
+    return None
+
+
+class _DeviceState:
+    def __init__(self, device_name: str, app_name: str):
+        self.device_name = device_name
+        self.app_name = app_name
+        self.missed = 0          # 连续心跳失败次数
+        self.losses = 0          # 会话失效次数
+        self.recoveries = 0      # 成功重建次数
+        self.quarantined = False
+        self.last_ok: Optional[float] = None
+        self.holders = 0         # 正在使用该设备 driver 的用例数
+        self.wake = threading.Event()  # 提前结束心跳间隔的等待
+        self.thread: Optional[threading.Thread] = None
+
+
+class SessionHealthMonitor:
+    """
+    :param manager: ParallelDriverManager，重建和隔离都通过它替换 driver
+    :param interval: 心跳间隔（秒），默认取 newCommandTimeout 的三分之一（5~30 秒）
+    :param max_missed: 非致命错误连续出现该次数后按会话失效处理
+    :param max_losses: 会话失效达到该次数后隔离设备
+    :param max_recover_attempts: 单次失效后最多重建次数，全部失败则隔离设备
+    :param backoff: 重建失败后的初始等待（秒），每次翻倍，最多 max_backoff
+    :param recover_timeout: recover_after_failure 等待重建完成的最长时间（秒）
+    """
+
+    def __init__(self, manager: "ParallelDriverManager", interval: Optional[float] = None,
+                 max_missed: int = 2, max_losses: int = 3, max_recover_attempts: int = 3,
+                 backoff: float = 2.0, max_backoff: float = 60.0, recover_timeout: float = 120.0):
+        self.manager = manager
+        self.interval = interval
+        self.max_missed = max_missed
+        self.max_losses = max_losses
+        self.max_recover_attempts = max_recover_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.recover_timeout = recover_timeout
+
+        self.events: List[HealthEvent] = []
+        self._states: Dict[str, _DeviceState] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # ========== 生命周期 ==========
+
+    def watch(self, device_name: str, app_name: Optional[str] = None):
+        """开始监控一台设备（重复调用无副作用）"""
+        with self._lock:
+            state = self._states.get(device_name)
+            if state is not None and state.thread is not None and state.thread.is_alive():
+                return
+            if app_name is None:
+                driver = self.manager.get_driver(device_name)
+                app_name = getattr(driver, 'app_name', None) or "ai_mate"
+            state = _DeviceState(device_name, app_name)
+            state.thread = threading.Thread(target=self._run, args=(state,),
+                                            name=f"session-health-{device_name}", daemon=True)
+            self._states[device_name] = state
+        with _monitors_lock:
+            _monitors[device_name] = self
+        self._stop.clear()
+        state.thread.start()
+
+    def start(self, device_names: Optional[List[str]] = None) -> "SessionHealthMonitor":
+        for device_name in device_names if device_names is not None else list(self.manager.drivers):
+            self.watch(device_name)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            states = list(self._states.values())
+        with _monitors_lock:
+            for state in states:
+                if _monitors.get(state.device_name) is self:
+                    del _monitors[state.device_name]
+        for state in states:
+            state.wake.set()
+        for thread in [s.thread for s in states if s.thread is not None]:
+            thread.join(timeout=5)
+        if self.events:
+            logger.info(f"🩺 会话健康: {self.get_report()}")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ========== 用例持有设备 ==========
+
+    @contextmanager
+    def hold(self, device_name: str):
+        """用例使用设备 driver 期间持有：会话失效时不重建，释放后再确认"""
+        state = self._states.get(device_name)
+        if state is None:
+            yield
+            return
+        with self._lock:
+            state.holders += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                state.holders -= 1
+            # 持有期间发现的失效在释放后立即处理
+            state.wake.set()
+
+    def recover_after_failure(self, device_name: str, driver, error: Exception):
+        """
+        用例失败后调用（需已释放 hold）：失败由会话失效引起时等待重建，
+        返回新 driver 供重试一次；会话正常（用例本身失败）、设备被隔离或超时返回 None
+        """
+        state = self._states.get(device_name)
+        if state is None or state.quarantined or self._stop.is_set():
+            return None
+        if not _is_session_lost(error):
+            try:
+                driver.execute(HEARTBEAT_COMMAND)
+                return None
+            except Exception:
+                pass
+
+        logger.info(f"⏳ {device_name} 用例因会话失效失败，等待重建")
+        deadline = time.monotonic() + self.recover_timeout
+        while time.monotonic() < deadline:
+            current = self.manager.get_driver(device_name)
+            if current is not None and current is not driver:
+                return current
+            if state.quarantined:
+                return None
+            state.wake.set()
+            if self._stop.wait(0.5):
+                return None
+        logger.warning(f"⏰ {device_name} {self.recover_timeout:.0f}s 内未完成会话重建")
+        return None
+
+    # ========== 查询 ==========
+
+    def is_quarantined(self, device_name: str) -> bool:
+        state = self._states.get(device_name)
+        return state is not None and state.quarantined
+
+    def quarantined_devices(self) -> List[str]:
+        return [name for name, state in self._states.items() if state.quarantined]
+
+    def get_report(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                'app_name': state.app_name,
+                'losses': state.losses,
+                'recoveries': state.recoveries,
+                'quarantined': state.quarantined,
+                'last_ok': state.last_ok,
+            }
+            for name, state in self._states.items()
+        }
+
+    # ========== 心跳与恢复 ==========
+
+    def _interval_for(self, driver) -> float:
+        if self.interval is not None:
+            return self.interval
+        timeout = _new_command_timeout(driver)
+        if not timeout:
+            return 30.0
+        return min(max(timeout / 3, 5.0), 30.0)
+
+    def heartbeat(self, device_name: str) -> bool:
+        """对当前 driver 发送一次心跳；返回会话是否健康"""
+        state = self._states[device_name]
+        driver = self.manager.get_driver(device_name)
+        if driver is None:
+            return False
+        try:
+            driver.execute(HEARTBEAT_COMMAND)
+        except Exception as e:
+            state.missed += 1
+            lost = _is_session_lost(e) or state.missed >= self.max_missed
+            logger.warning(f"💔 {device_name} 心跳失败 ({state.missed}/{self.max_missed}): {e}")
+            if lost:
+                self._record(state, "lost", str(e))
+            return not lost
+        state.missed = 0
+        state.last_ok = time.time()
+        return True
+
+    def _sleep(self, state: _DeviceState, timeout: float) -> bool:
+        """等待心跳间隔（hold 释放或等待重建时提前结束）；返回是否已停止"""
+        state.wake.wait(timeout)
+        state.wake.clear()
+        return self._stop.is_set()
+
+    def _run(self, state: _DeviceState):
+        while not state.quarantined:
+            driver = self.manager.get_driver(state.device_name)
+            if self._sleep(state, self._interval_for(driver)):
+                return
+            if self.heartbeat(state.device_name):
+                continue
+            if state.holders:
+                # 用例仍在使用旧 driver：此时重建会强制停止应用，等用例释放设备后再确认
+                logger.warning(f"⏸️ {state.device_name} 正在执行用例，暂不重建会话")
+                while state.holders:
+                    if self._sleep(state, 1.0):
+                        return
+                if self.heartbeat(state.device_name):
+                    continue
+            state.losses += 1
+            if state.losses >= self.max_losses:
+                self._quarantine(state, f"会话已失效 {state.losses} 次")
+                return
+            if not self._recover(state):
+                return
+
+    def _recover(self, state: _DeviceState) -> bool:
+        """按指数退避重建会话；全部失败时隔离设备"""
+        delay = self.backoff
+        for attempt in range(1, self.max_recover_attempts + 1):
+            if self._stop.is_set():
+                return False
+            logger.info(f"🔧 {state.device_name} 第 {attempt} 次重建会话")
+            if self.manager.create_driver(state.device_name, state.app_name):
+                state.missed = 0
+                state.recoveries += 1
+                state.last_ok = time.time()
+                self._record(state, "recovered", f"第 {attempt} 次重建成功")
+                return True
+            self._record(state, "recover_failed", f"第 {attempt} 次重建失败")
+            if self._stop.wait(delay):
+                return False
+            delay = min(delay * 2, self.max_backoff)
+
+        self._quarantine(state, f"连续 {self.max_recover_attempts} 次重建失败")
+        return False
+
+    def _quarantine(self, state: _DeviceState, reason: str):
+        state.quarantined = True
+        self._record(state, "quarantined", reason)
+        logger.error(f"🚫 {state.device_name} 已隔离: {reason}")
+        self.manager.quit_driver(state.device_name)
+
+    def _record(self, state: _DeviceState, event: str, detail: str):
+        with self._lock:
+            self.events.append(HealthEvent(time.time(), state.device_name, event, detail))
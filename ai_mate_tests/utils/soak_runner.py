@@ -0,0 +1,409 @@
+# utils/soak_runner.py
+"""
+长时间稳定性（soak）运行：每台设备循环执行页面对象流程数小时
+
+  - 会话回收：每 recycle_every 轮重建一次 Appium 会话，避免服务端会话内存持续增长；
+    会话失效时立即重建。轮次之间停顿较长时发送心跳，不触发 newCommandTimeout
+  - 断点续跑：每轮结束后原子写入 checkpoint.json，中断后用同一输出目录恢复，
+    从下一轮继续，累计运行时长计入总时长
+  - 结果流式落盘：每轮一行追加到 results.jsonl，内存中只保留计数
+  - 日志分段：logcat 随会话回收切换分段，串口日志写入会话标记，二者都按大小滚动
+  - 界面结构归档：失败轮次和每 hierarchy_every 轮的界面结构去重压缩后存入 hierarchy.db，
+    结果行记录快照编号，可用 hierarchy_tool 查看和对比
+
+输出目录结构：
+    <output>/soak.json               运行参数（恢复时沿用）
+    <output>/<设备>/checkpoint.json   进度
+    <output>/<设备>/results.jsonl     每轮结果
+    <output>/<设备>/logcat.log[.N]    logcat 分段
+    <output>/serial/<名称>.log[.N]    串口日志分段
+    <output>/hierarchy.db            界面结构归档
+"""
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from ai_mate_tests.utils.hierarchy_archive import HierarchyArchive
+from ai_mate_tests.utils.log_capture import DEFAULT_BACKUPS, DEFAULT_MAX_BYTES, LogcatCapture, SerialCapture
+from ai_mate_tests.utils.session_health import HEARTBEAT_COMMAND
+
+logger = logging.getLogger(__name__)
+
+
+# ========== 流程 ==========
+
+class SoakContext(NamedTuple):
+    """传给流程函数的上下文"""
+    manager: object  # ParallelDriverManager
+    device_name: str
+    udid: str
+    iteration: int
+    session: int  # 本设备第几个会话
+
+
+class SoakFlow(NamedTuple):
+    """
+    :param app_name: 会话启动的应用
+    :param run: run(driver, context)，抛出异常即本轮失败；返回 dict 时作为分段耗时（秒）记录
+    """
+    app_name: str
+    run: Callable[[object, SoakContext], Optional[Dict[str, float]]]
+    description: str = ""
+
+
+def _bluetooth_flow(driver, context: SoakContext):
+    from ai_mate_tests.pages.settings_page import SettingsPage
+
+    page = SettingsPage(driver)
+    # 新会话从设置首页开始；同一会话内停留在蓝牙设置界面
+    if not page.is_displayed_by_config("bluetooth_switch"):
+        page.open_bluetooth_settings()
+    page.bluetooth_cycle(context.iteration)
+
+
+def _pairing_flow(driver, context: SoakContext):
+    from ai_mate_tests.pages.device_page import DevicePage
+    from ai_mate_tests.utils.pairing_benchmark import measure_pairing, reset_pairing
+
+    driver = reset_pairing(context.manager.driver_factory, driver)
+    phases = measure_pairing(DevicePage(driver), context.udid)
+    if phases['success_visible'] is None:
+        raise AssertionError("未出现配对成功界面")
+    return {phase: value for phase, value in phases.items() if value is not None}
+
+
+FLOWS: Dict[str, SoakFlow] = {
+    "bluetooth": SoakFlow("settings", _bluetooth_flow, "蓝牙开关 -> 断开 -> 重连"),
+    "pairing": SoakFlow("ai_mate", _pairing_flow, "取消配对 -> 扫描 -> 配对"),
+}
+
+
+# ========== 配置与进度 ==========
+
+@dataclass
+class SoakConfig:
+    """
+    :param duration: 总运行时长（秒），None 表示只按 iterations 停止
+    :param iterations: 每台设备的最大轮数，None 表示只按 duration 停止
+    :param recycle_every: 每多少轮重建一次会话
+    :param pause: 轮次之间的停顿（秒）
+    :param max_consecutive_failures: 连续失败达到该次数后停止该设备
+    :param serial_ports: {串口: 名称}，如 {"COM12": "left_leg"}
+    :param hierarchy_every: 每多少轮归档一次界面结构（失败轮次总会归档），0 表示只在失败时归档
+    """
+    flow: str = "bluetooth"
+    duration: Optional[float] = 8 * 3600
+    iterations: Optional[int] = None
+    recycle_every: int = 25
+    pause: float = 0.0
+    max_consecutive_failures: int = 10
+    capture_logcat: bool = True
+    serial_ports: Dict[str, str] = field(default_factory=dict)
+    log_max_bytes: int = DEFAULT_MAX_BYTES
+    log_backups: int = DEFAULT_BACKUPS
+    hierarchy_every: int = 50
+
+    def save(self, path: str):
+        _write_json(path, asdict(self))
+
+    @classmethod
+    def load(cls, path: str) -> "SoakConfig":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+
+@dataclass
+class Checkpoint:
+    """一台设备的进度；results_offset 是写完最后一轮后结果文件的大小"""
+    device_name: str
+    iteration: int = 0
+    passed: int = 0
+    failed: int = 0
+    consecutive_failures: int = 0
+    sessions: int = 0
+    elapsed: float = 0.0  # 累计运行时长（秒），恢复后继续累计
+    results_offset: int = 0
+    status: str = "running"  # running / done / aborted
+    last_error: Optional[str] = None
+    updated_at: float = 0.0
+
+    def save(self, path: str):
+        self.updated_at = time.time()
+        _write_json(path, asdict(self))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+def _write_json(path: str, data: Dict):
+    """先写临时文件再替换，中断时不会留下半个文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ========== 运行 ==========
+
+class SoakRunner:
+    """
+    :param manager: ParallelDriverManager，会话创建和回收都通过它完成
+    :param config: SoakConfig
+    :param output_dir: 输出目录；已有 checkpoint 时从断点继续
+    """
+
+    def __init__(self, manager, config: SoakConfig, output_dir: str):
+        if config.flow not in FLOWS:
+            raise ValueError(f"未知的 soak 流程: {config.flow}（可选: {', '.join(FLOWS)}）")
+        self.manager = manager
+        self.config = config
+        self.flow = FLOWS[config.flow]
+        self.output_dir = output_dir
+        self.checkpoints: Dict[str, Checkpoint] = {}
+        self._serial: List[SerialCapture] = []
+        self.hierarchy = HierarchyArchive(os.path.join(output_dir, "hierarchy.db"))
+        self._stop = threading.Event()
+
+    def _device_dir(self, device_name: str) -> str:
+        return os.path.join(self.output_dir, device_name)
+
+    def stop(self):
+        """请求所有设备在当前轮结束后停止（进度已保存，可恢复）"""
+        self._stop.set()
+
+    # ---------- 整体 ----------
+
+    def run(self, device_names: List[str]) -> Dict[str, Checkpoint]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.config.save(os.path.join(self.output_dir, "soak.json"))
+        self._start_serial()
+
+        threads = [threading.Thread(target=self._run_device_safe, args=(name,), name=f"soak-{name}", daemon=True)
+                   for name in device_names]
+        try:
+            for thread in threads:
+                thread.start()
+            # join 带超时，主线程仍能响应 Ctrl+C
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            print("🛑 收到中断，等待当前轮结束后保存进度...")
+            self.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            for capture in self._serial:
+                capture.stop()
+            self._serial = []
+            self.hierarchy.close()
+        return self.checkpoints
+
+    def _start_serial(self):
+        serial_dir = os.path.join(self.output_dir, "serial")
+        for port, name in self.config.serial_ports.items():
+            capture = SerialCapture(port, os.path.join(serial_dir, f"{name}.log"),
+                                    max_bytes=self.config.log_max_bytes, backups=self.config.log_backups)
+            self._serial.append(capture.start())
+            print(f"✅ 开始采集串口 {port} ({name})")
+
+    def _run_device_safe(self, device_name: str):
+        try:
+            self._run_device(device_name)
+        except Exception as e:
+            logger.error(f"❌ {device_name} soak 异常退出: {e}\n{traceback.format_exc()}")
+
+    # ---------- 单台设备 ----------
+
+    def _run_device(self, device_name: str):
+        device_dir = self._device_dir(device_name)
+        os.makedirs(device_dir, exist_ok=True)
+        checkpoint_path = os.path.join(device_dir, "checkpoint.json")
+        results_path = os.path.join(device_dir, "results.jsonl")
+
+        checkpoint = Checkpoint.load(checkpoint_path) or Checkpoint(device_name)
+        self.checkpoints[device_name] = checkpoint
+        if checkpoint.status != "running":
+            print(f"⏭️ {device_name} 已结束（{checkpoint.status}），跳过")
+            return
+        if checkpoint.iteration:
+            print(f"🔁 {device_name} 从第 {checkpoint.iteration + 1} 轮继续"
+                  f"（已运行 {checkpoint.elapsed / 3600:.2f}h，通过 {checkpoint.passed}，失败 {checkpoint.failed}）")
+
+        udid = self.manager.driver_factory.config_loader.get_device_config(device_name)['udid']
+        logcat = None
+        if self.config.capture_logcat:
+            logcat = LogcatCapture(udid, os.path.join(device_dir, "logcat.log"),
+                                   max_bytes=self.config.log_max_bytes, backups=self.config.log_backups).start()
+
+        results = open(results_path, 'a+', encoding='utf-8')
+        # 丢弃上次中断时写了结果但没来得及保存进度的那一轮
+        results.truncate(checkpoint.results_offset)
+        results.seek(checkpoint.results_offset)
+        try:
+            self._loop(device_name, udid, checkpoint, checkpoint_path, results, logcat)
+        finally:
+            results.close()
+            if logcat is not None:
+                logcat.stop()
+            self.manager.quit_driver(device_name)
+            self._flush_metrics()
+
+    def _budget_left(self, checkpoint: Checkpoint, resumed_elapsed: float, started: float) -> bool:
+        config = self.config
+        if config.iterations is not None and checkpoint.iteration >= config.iterations:
+            return False
+        if config.duration is not None and resumed_elapsed + (time.monotonic() - started) >= config.duration:
+            return False
+        return True
+
+    def _loop(self, device_name, udid, checkpoint: Checkpoint, checkpoint_path, results, logcat):
+        config = self.config
+        started = time.monotonic()
+        resumed_elapsed = checkpoint.elapsed
+        driver = None
+        session_iterations = 0
+
+        while not self._stop.is_set() and self._budget_left(checkpoint, resumed_elapsed, started):
+            if driver is None or session_iterations >= config.recycle_every:
+                driver = self._recycle(device_name, checkpoint, logcat)
+                session_iterations = 0
+                if driver is None:
+                    # 不计入轮次，但计入连续失败，设备离线时不会无限重试
+                    checkpoint.consecutive_failures += 1
+                    checkpoint.last_error = "会话创建失败"
+                    if checkpoint.consecutive_failures >= config.max_consecutive_failures:
+                        break
+                    self._stop.wait(30)
+                    continue
+
+            checkpoint.iteration += 1
+            session_iterations += 1
+            context = SoakContext(self.manager, device_name, udid, checkpoint.iteration, checkpoint.sessions)
+            record = self._run_iteration(driver, context)
+            # 流程中切换应用回退为重建会话时，以管理器登记的新会话为准
+            driver = self.manager.get_driver(device_name) or driver
+            if not record['ok'] or (config.hierarchy_every and checkpoint.iteration % config.hierarchy_every == 0):
+                record['hierarchy'] = self._archive_hierarchy(driver, context, record)
+
+            results.write(json.dumps(record, ensure_ascii=False) + "\n")
+            results.flush()
+            if record['ok']:
+                checkpoint.passed += 1
+                checkpoint.consecutive_failures = 0
+            else:
+                checkpoint.failed += 1
+                checkpoint.consecutive_failures += 1
+                checkpoint.last_error = record['error']
+                # 会话已失效：下一轮前重建
+                if not self._session_alive(driver):
+                    print(f"⚠️ {device_name} 会话已失效，重建会话")
+                    driver = None
+            checkpoint.results_offset = results.tell()
+            checkpoint.elapsed = resumed_elapsed + (time.monotonic() - started)
+            checkpoint.save(checkpoint_path)
+
+            if checkpoint.iteration % 10 == 0 or not record['ok']:
+                status = "✅" if record['ok'] else f"❌ {record['error']}"
+                print(f"{status} {device_name} 第 {checkpoint.iteration} 轮 "
+                      f"(通过 {checkpoint.passed} / 失败 {checkpoint.failed}，已运行 {checkpoint.elapsed / 3600:.2f}h)")
+            if checkpoint.consecutive_failures >= config.max_consecutive_failures:
+                break
+            if config.pause and driver is not None:
+                self._idle(driver, config.pause)
+
+        if checkpoint.consecutive_failures >= config.max_consecutive_failures:
+            checkpoint.status = "aborted"
+            print(f"🛑 {device_name} 连续失败 {checkpoint.consecutive_failures} 次，停止（{checkpoint.last_error}）")
+        elif not self._stop.is_set():
+            checkpoint.status = "done"
+        checkpoint.elapsed = resumed_elapsed + (time.monotonic() - started)
+        checkpoint.save(checkpoint_path)
+
+    def _run_iteration(self, driver, context: SoakContext) -> Dict:
+        start = time.monotonic()
+        record = {'iteration': context.iteration, 'session': context.session, 'ts': time.time(),
+                  'ok': False, 'elapsed': 0.0, 'error': None, 'timings': {}}
+        try:
+            timings = self.flow.run(driver, context)
+            if isinstance(timings, dict):
+                record['timings'] = {name: round(value, 3) for name, value in timings.items()}
+            record['ok'] = True
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+        record['elapsed'] = round(time.monotonic() - start, 3)
+        if record['ok']:
+            self._record_metric(f"soak.{self.config.flow}", record['elapsed'], context.device_name)
+        return record
+
+    def _archive_hierarchy(self, driver, context: SoakContext, record: Dict) -> Optional[int]:
+        """归档当前界面结构，返回快照编号（会话失效等取不到时为 None）"""
+        capture = self.hierarchy.capture(driver, reason="checkpoint" if record['ok'] else "failure",
+                                         label=f"{self.config.flow}#{context.iteration}",
+                                         device_name=context.device_name)
+        return capture.id if capture else None
+
+    def _recycle(self, device_name: str, checkpoint: Checkpoint, logcat):
+        """重建会话，日志切换到新分段；同时把累积的指标写库，缓冲不随运行时长增长"""
+        self._flush_metrics()
+        checkpoint.sessions += 1
+        marker = f"{device_name} 会话 {checkpoint.sessions}，从第 {checkpoint.iteration + 1} 轮开始"
+        if logcat is not None:
+            logcat.rotate(marker)
+        for capture in self._serial:
+            capture.mark(marker)
+        driver = self.manager.create_driver(device_name, self.flow.app_name)
+        if driver is None:
+            print(f"❌ {device_name} 第 {checkpoint.sessions} 个会话创建失败")
+        return driver
+
+    @staticmethod
+    def _session_alive(driver) -> bool:
+        try:
+            driver.execute(HEARTBEAT_COMMAND)
+            return True
+        except Exception:
+            return False
+
+    def _idle(self, driver, seconds: float, heartbeat_interval: float = 60):
+        """轮次间停顿；定期发送心跳，停顿超过 newCommandTimeout 时会话也不会被回收"""
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._stop.wait(min(remaining, heartbeat_interval))
+            if remaining > heartbeat_interval:
+                self._session_alive(driver)
+
+    @staticmethod
+    def _record_metric(name: str, value: float, device_name: str):
+        from ai_mate_tests.utils.metrics_store import record_metric
+        record_metric(name, value, device_name)
+
+    @staticmethod
+    def _flush_metrics():
+        from ai_mate_tests.utils.metrics_store import flush_metrics
+        flush_metrics()
+
+
+def format_checkpoints(checkpoints: Dict[str, Checkpoint]) -> str:
+    lines = []
+    for device_name in sorted(checkpoints):
+        cp = checkpoints[device_name]
+        total = cp.passed + cp.failed
+        rate = cp.passed / total if total else 0.0
+        lines.append(f"📱 {device_name:<12} {cp.status:<8} 轮次 {cp.iteration:<6} 通过率 {rate:6.1%} "
+                     f"会话 {cp.sessions:<4} 运行 {cp.elapsed / 3600:.2f}h"
+                     + (f"  最后错误: {cp.last_error}" if cp.failed else ""))
+    return "\n".join(lines)
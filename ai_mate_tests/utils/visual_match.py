@@ -0,0 +1,309 @@
+# utils/visual_match.py
+"""
+截图模板匹配（归一化互相关 NCC，NumPy 向量化）
+
+一次截图匹配多个参考模板，适合无障碍树取不到或不稳定的自定义控件（如配对成功页）：
+  1. 截图和模板灰度化，按 2x2 均值逐级缩小构成金字塔
+  2. 在最粗一级用 FFT 计算整幅 NCC 图（局部均值/方差由积分图得到），取若干候选峰值
+  3. 逐级放大，只在候选点附近的小窗口内用滑动窗口重新计算 NCC，直到原始分辨率
+置信度为原始分辨率下的 NCC（-1~1），region 可限制搜索区域。
+
+依赖 numpy 和 Pillow（只在匹配时导入）；离线验证见 benchmarks/bench_visual.py。
+
+    matcher = VisualMatcher(threshold=0.85)
+    result = matcher.match(driver.get_screenshot_as_png(), "visual_templates/对话翻译.png")
+    if result.found:
+        print(result.center, result.confidence)
+"""
+import io
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+DEFAULT_THRESHOLD = 0.85
+# 最粗一级模板短边不小于该像素数，否则细节丢失导致候选不可靠
+MIN_TEMPLATE_SIDE = 12
+MAX_PYRAMID_LEVELS = 4
+# 粗匹配保留的候选数，以及逐级细化时的搜索半径（像素）
+CANDIDATES = 5
+REFINE_RADIUS = 2
+# 窗口灰度标准差低于该值视为纯色：方差相减的舍入误差会让相关系数失真
+MIN_WINDOW_STD = 1.0
+
+# 区域：(x, y, w, h)，整数为像素；全部不大于 1 的小数为相对屏幕的比例
+Region = Tuple[float, float, float, float]
+
+
+class MatchResult(NamedTuple):
+    """匹配结果，坐标为截图原始分辨率的像素"""
+    found: bool
+    confidence: float
+    x: int
+    y: int
+    width: int
+    height: int
+    elapsed: float  # 匹配耗时（秒，不含截图）
+    template: str = ""
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        return self.x + self.width // 2, self.y + self.height // 2
+
+
+def _np():
+    import numpy
+    return numpy
+
+
+def to_gray(image):
+    """PNG 字节 / 文件路径 / 数组 -> float32 灰度数组"""
+    np = _np()
+    if isinstance(image, np.ndarray):
+        array = image.astype(np.float32, copy=False)
+        if array.ndim == 3:
+            # RGB(A) -> 灰度（ITU-R 601），忽略 alpha
+            array = array[..., :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        return array
+
+    from PIL import Image
+
+    source = io.BytesIO(image) if isinstance(image, (bytes, bytearray)) else image
+    with Image.open(source) as img:
+        return np.asarray(img.convert('L'), dtype=np.float32)
+
+
+def downsample(image):
+    """2x2 均值缩小一半（奇数边丢弃最后一行/列）"""
+    h, w = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    return image[:h, :w].reshape(h // 2, 2, w // 2, 2).mean(axis=(1, 3))
+
+
+def pyramid(image, levels: int) -> List:
+    """[原图, 1/2, 1/4, ...]，共 levels + 1 级"""
+    result = [image]
+    for _ in range(levels):
+        result.append(downsample(result[-1]))
+    return result
+
+
+def _integral(image):
+    np = _np()
+    padded = np.zeros((image.shape[0] + 1, image.shape[1] + 1), dtype=np.float64)
+    padded[1:, 1:] = image.cumsum(axis=0).cumsum(axis=1)
+    return padded
+
+
+def _window_sums(integral, h: int, w: int):
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+
+def ncc_map(image, template):
+    """
+    整幅 NCC 图：result[y, x] 为模板左上角放在 (x, y) 时的相关系数
+    分子 sum(I * (T - mean_T)) 用 FFT 计算，分母中图像窗口方差用积分图计算
+    """
+    np = _np()
+    H, W = image.shape
+    h, w = template.shape
+    n = h * w
+    t = template - template.mean()
+    t_norm = np.sqrt((t * t).sum())
+    if t_norm < np.sqrt(n) * MIN_WINDOW_STD:
+        # 缩小后的模板变成纯色（原图已在加载时检查）
+        return np.zeros((H - h + 1, W - w + 1))
+
+    # 循环相关在合法位置（模板不越界）上等于线性相关，无需补零
+    spectrum = np.fft.rfft2(image) * np.conj(np.fft.rfft2(t, s=image.shape))
+    numerator = np.fft.irfft2(spectrum, s=image.shape)[:H - h + 1, :W - w + 1]
+
+    sums = _window_sums(_integral(image), h, w)
+    squares = _window_sums(_integral(image * image), h, w)
+    variance = np.maximum(squares - sums * sums / n, 0)
+    # 纯色窗口没有纹理，相关系数记为 0
+    textured = variance > n * MIN_WINDOW_STD ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(textured, numerator / (np.sqrt(variance) * t_norm), 0.0)
+    return np.clip(scores, -1.0, 1.0)
+
+
+def ncc_local(image, template, y0: int, x0: int, radius: int) -> Tuple[float, int, int]:
+    """在 (x0, y0) 周围 radius 内逐点计算 NCC，返回 (最大值, y, x)"""
+    np = _np()
+    H, W = image.shape
+    h, w = template.shape
+    top, left = max(0, y0 - radius), max(0, x0 - radius)
+    bottom, right = min(H - h, y0 + radius), min(W - w, x0 + radius)
+    if bottom < top or right < left:
+        return -1.0, y0, x0
+
+    area = image[top:bottom + h, left:right + w]
+    windows = np.lib.stride_tricks.sliding_window_view(area, (h, w))  # (ny, nx, h, w)
+    t = template - template.mean()
+    means = windows.mean(axis=(2, 3), keepdims=True)
+    centered = windows - means
+    numerator = np.einsum('ijkl,kl->ij', centered, t)
+    variance = np.einsum('ijkl,ijkl->ij', centered, centered)
+    textured = variance > h * w * MIN_WINDOW_STD ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(textured, numerator / np.sqrt(variance * (t * t).sum()), 0.0)
+    iy, ix = np.unravel_index(int(np.argmax(scores)), scores.shape)
+    return float(scores[iy, ix]), top + int(iy), left + int(ix)
+
+
+def _peaks(scores, count: int, h: int, w: int) -> List[Tuple[int, int]]:
+    """取 count 个峰值，每取一个就屏蔽其周围半个模板大小的区域"""
+    np = _np()
+    scores = scores.copy()
+    peaks = []
+    for _ in range(count):
+        y, x = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        if scores[y, x] <= -1:
+            break
+        peaks.append((int(y), int(x)))
+        scores[max(0, y - h // 2):y + h // 2 + 1, max(0, x - w // 2):x + w // 2 + 1] = -2
+    return peaks
+
+
+class _Template(NamedTuple):
+    name: str
+    levels: List  # 模板金字塔
+
+
+class VisualMatcher:
+    """
+    :param threshold: 置信度不低于该值视为找到
+    :param max_levels: 金字塔最多缩小的级数（实际级数还受模板大小限制）
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, max_levels: int = MAX_PYRAMID_LEVELS):
+        self.threshold = threshold
+        self.max_levels = max_levels
+        self._templates: Dict[str, _Template] = {}
+        self._lock = threading.Lock()
+
+    def _levels_for(self, template) -> int:
+        levels = 0
+        side = min(template.shape)
+        while levels < self.max_levels and side // 2 >= MIN_TEMPLATE_SIDE:
+            side //= 2
+            levels += 1
+        return levels
+
+    def load_template(self, template) -> _Template:
+        """模板路径按文件缓存（含金字塔）；数组或字节每次重新计算"""
+        if isinstance(template, str):
+            key = os.path.abspath(template)
+            with self._lock:
+                cached = self._templates.get(key)
+            if cached is not None:
+                return cached
+        gray = to_gray(template)
+        if gray.std() < MIN_WINDOW_STD:
+            raise ValueError(f"模板是纯色图像，无法匹配: {template if isinstance(template, str) else '<image>'}")
+        loaded = _Template(template if isinstance(template, str) else "<image>",
+                           pyramid(gray, self._levels_for(gray)))
+        if isinstance(template, str):
+            with self._lock:
+                self._templates[key] = loaded
+        return loaded
+
+    @staticmethod
+    def _crop(image, region: Optional[Region]) -> Tuple[object, int, int]:
+        if region is None:
+            return image, 0, 0
+        H, W = image.shape
+        x, y, w, h = region
+        if all(0 <= v <= 1 for v in region) and any(isinstance(v, float) for v in region):
+            x, y, w, h = x * W, y * H, w * W, h * H
+        x, y = max(0, int(x)), max(0, int(y))
+        return image[y:min(H, y + int(h)), x:min(W, x + int(w))], x, y
+
+    def match(self, screenshot, template, region: Optional[Region] = None,
+              threshold: Optional[float] = None) -> MatchResult:
+        """在截图中匹配一个模板"""
+        return self.match_many(screenshot, [template], region, threshold)[0]
+
+    def match_many(self, screenshot, templates: Sequence, region: Optional[Region] = None,
+                   threshold: Optional[float] = None) -> List[MatchResult]:
+        """一次截图匹配多个模板（截图只解码、缩小一次）"""
+        threshold = self.threshold if threshold is None else threshold
+        image, offset_x, offset_y = self._crop(to_gray(screenshot), region)
+        loaded = [self.load_template(t) for t in templates]
+        max_levels = max((len(t.levels) - 1 for t in loaded), default=0)
+        image_levels = pyramid(image, max_levels)
+        return [self._match_one(image_levels, t, offset_x, offset_y, threshold) for t in loaded]
+
+    def _match_one(self, image_levels: List, template: _Template, offset_x: int, offset_y: int,
+                   threshold: float) -> MatchResult:
+        start = time.perf_counter()
+        full_h, full_w = template.levels[0].shape
+        if full_h > image_levels[0].shape[0] or full_w > image_levels[0].shape[1]:
+            # 模板比搜索区域大
+            return MatchResult(False, 0.0, 0, 0, full_w, full_h, time.perf_counter() - start, template.name)
+
+        level = len(template.levels) - 1
+        best = self._search(image_levels, template, level)
+        if best[0] < threshold and level > 1:
+            # 缩小过多时细节（文字笔画）丢失，真实位置可能不在候选中：在 1/2 分辨率上再搜索一次
+            best = max(best, self._search(image_levels, template, 1))
+
+        confidence, y, x = best
+        return MatchResult(confidence >= threshold, round(confidence, 4), x + offset_x, y + offset_y,
+                           full_w, full_h, time.perf_counter() - start, template.name)
+
+    @staticmethod
+    def _search(image_levels: List, template: _Template, level: int) -> Tuple[float, int, int]:
+        """在 level 级整幅计算 NCC 取候选，逐级细化到原始分辨率，返回 (置信度, y, x)"""
+        image, tmpl = image_levels[level], template.levels[level]
+        if tmpl.shape[0] > image.shape[0] or tmpl.shape[1] > image.shape[1]:
+            return -1.0, 0, 0
+        scores = ncc_map(image, tmpl)
+
+        best = (-1.0, 0, 0)
+        for y, x in _peaks(scores, CANDIDATES, *tmpl.shape):
+            score = float(scores[y, x])
+            for finer in range(level - 1, -1, -1):
+                score, y, x = ncc_local(image_levels[finer], template.levels[finer], y * 2, x * 2, REFINE_RADIUS)
+            if score > best[0]:
+                best = (score, y, x)
+        return best
+
+
+# ========== 模板目录 ==========
+
+def templates_dir() -> str:
+    """环境变量 AI_MATE_VISUAL_TEMPLATES 指定模板目录，默认 ai_mate_tests/visual_templates"""
+    return os.environ.get("AI_MATE_VISUAL_TEMPLATES") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "visual_templates")
+
+
+def resolve_template(name: str, device_name: Optional[str] = None) -> str:
+    """
+    模板名 -> 文件路径：优先 <目录>/<设备名>/<名称>.png（分辨率不同的设备单独截取），
+    其次 <目录>/<名称>.png；name 本身是已存在的文件路径时直接使用
+    """
+    if os.path.isfile(name):
+        return name
+    filename = name if name.lower().endswith('.png') else f"{name}.png"
+    candidates = [os.path.join(templates_dir(), device_name, filename)] if device_name else []
+    candidates.append(os.path.join(templates_dir(), filename))
+    for path in candidates:
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f"未找到视觉模板 {name}，查找过: {candidates}")
+
+
+_default_matcher: Optional[VisualMatcher] = None
+_default_matcher_lock = threading.Lock()
+
+
+def get_visual_matcher() -> VisualMatcher:
+    """进程内共享的 VisualMatcher，模板金字塔只计算一次"""
+    global _default_matcher
+    if _default_matcher is None:
+        with _default_matcher_lock:
+            if _default_matcher is None:
+                _default_matcher = VisualMatcher()
+    return _default_matcher
+
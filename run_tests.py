@@ -0,0 +1,62 @@
+"""
+一键执行测试流水线（跨平台，替代 run_tests.ps1）：
+后台采集 logcat/串口日志 → pytest → 生成 Allure 报告 → 打包，并输出各阶段耗时
+
+用法:
+    python run_tests.py
+    python run_tests.py --workers 2 --serial /dev/ttyUSB0:left_leg -- -k bluetooth
+    python run_tests.py --report-interval 0 --no-logcat
+    python run_tests.py --force-full-run
+
+"--" 之后的参数原样传给 pytest。
+"""
+import argparse
+import sys
+
+from ai_mate_tests.utils.run_pipeline import PipelineConfig, RunPipeline
+
+
+def _parse_serial(values):
+    ports = {}
+    for value in values or []:
+        port, _, name = value.partition(":")
+        ports[port] = name or port
+    return ports
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    pytest_args = []
+    if "--" in argv:
+        index = argv.index("--")
+        argv, pytest_args = argv[:index], argv[index + 1:]
+
+    parser = argparse.ArgumentParser(description="测试流水线：日志采集 + pytest + Allure 报告 + 打包")
+    parser.add_argument("--workers", default=None, help="xdist worker 数（如 2 或 auto），设备通过租约分配")
+    parser.add_argument("--report-interval", type=float, default=60,
+                        help="运行期间重新生成报告的最短间隔（秒），0 表示只在结束后生成")
+    parser.add_argument("--serial", action="append", metavar="PORT[:NAME]", help="采集眼镜串口日志，可重复")
+    parser.add_argument("--no-logcat", action="store_true", help="不采集 logcat")
+    parser.add_argument("--no-package", action="store_true", help="不打包 zip")
+    parser.add_argument("--force-full-run", action="store_true",
+                        help="不跳过上次已通过且输入未变化的 (用例, 设备) 组合")
+    parser.add_argument("--zip", default=None, help="压缩包路径，默认 allure-report-<时间>.zip")
+    args = parser.parse_args(argv)
+
+    if args.force_full_run:
+        pytest_args.append("--force-full-run")
+
+    config = PipelineConfig(
+        pytest_args=pytest_args,
+        workers=args.workers,
+        report_interval=args.report_interval,
+        capture_logcat=not args.no_logcat,
+        serial_ports=_parse_serial(args.serial),
+        package=not args.no_package,
+        zip_path=args.zip,
+    )
+    return RunPipeline(config).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())